@@ -18,7 +18,7 @@ from hybrid_chat import initialize_agent_system, chat as hybrid_chat, agent_syst
 # If you have a DB wrapper, import it. If not, pass None to initialize_agent_system
 try:
     from app.services.firebase import DB
-    db = DB()
+    db = DB().connect()  # fail here (no firebase_admin / credentials), not on the first chat
 except Exception:
     db = None
 
@@ -0,0 +1,107 @@
+"""
+Runtime settings (read from environment variables)
+"""
+import os
+
+from dotenv import load_dotenv
+
+
+# Load .env from the backend folder so settings work from any CWD
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+
+# Logging (app.utils.log): level, "console" or "json", records buffered
+# for the writer thread (dropped when full)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "console").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+# Per-user forecast cache shared by all agents
+FORECAST_CACHE_SIZE = int(os.getenv("FORECAST_CACHE_SIZE", 4096))
+
+# Chat system prompt: cached data sections (one per user/version)
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", 10000))
+
+# CSV upload: rows parsed per chunk while streaming the file
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", 50000))
+
+# Demo income history given to users without data (parsed once at startup)
+DEMO_DATA_PATH = os.getenv(
+    "DEMO_DATA_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "sample_income.csv")
+)
+
+# LLM (Groq) client: point LLM_BASE_URL at a local stub for testing
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+
+# Live AgentSystem instances: LRU size cap and idle eviction (seconds, 0 = off)
+AGENT_REGISTRY_MAX_SIZE = int(os.getenv("AGENT_REGISTRY_MAX_SIZE", 10000))
+AGENT_REGISTRY_IDLE_TTL = float(os.getenv("AGENT_REGISTRY_IDLE_TTL", 3600)) or None
+
+# Background crisis monitor (scheduler in services.scheduler)
+MONITOR_ENABLED = os.getenv("MONITOR_ENABLED", "1") == "1"
+MONITOR_NORMAL_INTERVAL = float(os.getenv("MONITOR_NORMAL_INTERVAL", 24 * 3600))
+MONITOR_CRISIS_INTERVAL = float(os.getenv("MONITOR_CRISIS_INTERVAL", 6 * 3600))
+MONITOR_JITTER = float(os.getenv("MONITOR_JITTER", 0.1))  # fraction of the interval
+MONITOR_BATCH_SIZE = int(os.getenv("MONITOR_BATCH_SIZE", 100))
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", 4))
+MONITOR_STARTUP_SPREAD = float(os.getenv("MONITOR_STARTUP_SPREAD", 60))  # seconds to spread stored users over
+
+# CPU-bound work off the event loop: pure kernels (forecasts) run in a
+# "process" (default) or "thread" pool, agent work in AGENT_THREADS threads.
+# Agent work (income pattern analysis, scenario analysis, what-if, crisis
+# scans) reads and updates per-user agent state and the DB, so it stays in
+# threads and shares one core under the GIL; only its NumPy calls release
+# it. Use app.router shards to spread agent work over cores.
+# At most COMPUTE_QUEUE_SIZE jobs queued or running (more -> HTTP 503).
+COMPUTE_EXECUTOR = os.getenv("COMPUTE_EXECUTOR", "process").lower()
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", os.cpu_count() or 1))
+AGENT_THREADS = int(os.getenv("AGENT_THREADS", 4))
+COMPUTE_QUEUE_SIZE = int(os.getenv("COMPUTE_QUEUE_SIZE", 64))
+COMPUTE_TIMEOUT = float(os.getenv("COMPUTE_TIMEOUT", 30))  # seconds per job
+
+# What-if actions: max actions combined at once (evaluates 2**N subsets)
+ACTION_MAX_COMBINED = int(os.getenv("ACTION_MAX_COMBINED", 12))
+
+# Intervention optimizer: DP units per deficit and latency budgets (ms)
+INTERVENTION_RESOLUTION = int(os.getenv("INTERVENTION_RESOLUTION", 200))
+INTERVENTION_BUDGET_MS = float(os.getenv("INTERVENTION_BUDGET_MS", 20))
+INTERVENTION_BATCH_BUDGET_MS = float(os.getenv("INTERVENTION_BATCH_BUDGET_MS", 2000))
+
+# Users analysed (and locked) per /api/agents/crisis-scan job
+CRISIS_SCAN_BATCH = int(os.getenv("CRISIS_SCAN_BATCH", 256))
+
+# Storage backend: "memory" (default, lost on restart), "sqlite", "firebase"
+# or "firebase_fake" (in-process fake Realtime Database, for local testing)
+DB_BACKEND = os.getenv("DB_BACKEND", "memory").lower()
+SQLITE_PATH = os.getenv(
+    "SQLITE_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "finmate.db")
+)
+
+# Firebase Realtime Database (DB_BACKEND=firebase); writes are batched
+FIREBASE_CREDENTIALS = os.getenv("FIREBASE_CREDENTIALS", "serviceAccountKey.json")
+FIREBASE_DATABASE_URL = os.getenv("FIREBASE_DATABASE_URL")
+FIREBASE_FLUSH_INTERVAL = float(os.getenv("FIREBASE_FLUSH_INTERVAL", 2.0))  # seconds
+FIREBASE_MAX_BATCH = int(os.getenv("FIREBASE_MAX_BATCH", 500))  # pending paths
+
+# Sharded serving (python -m app.router): worker count, worker ports and
+# virtual nodes per worker on the consistent-hash ring. SHARD_ID is set
+# by the router for each worker it starts.
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", os.cpu_count() or 1))
+SHARD_BASE_PORT = int(os.getenv("SHARD_BASE_PORT", 8100))
+SHARD_VNODES = int(os.getenv("SHARD_VNODES", 128))
+SHARD_ID = os.getenv("SHARD_ID")
+ROUTER_TIMEOUT = float(os.getenv("ROUTER_TIMEOUT", 120))
+ROUTER_ADMIN_TOKEN = os.getenv("ROUTER_ADMIN_TOKEN")
+
+# Opt-in profiling of single forecast / daily-check requests: send the token
+# as an X-Profile-Token header or ?profile=<token>. Unset disables it. The
+# call-tree report is returned in the response and, with PROFILE_DIR set,
+# also saved there (<request id>.prof for pstats/snakeviz, .json report).
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", 25))  # rows per table / children per node
+PROFILE_MIN_SHARE = float(os.getenv("PROFILE_MIN_SHARE", 0.01))  # prune tree nodes below this share
@@ -1,15 +1,39 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
-import io
-from typing import Optional, Dict, Any
+import numpy as np
+from typing import Optional, Dict, Any, List
 import asyncio
-from hybrid_chat import initialize_agent_system, chat as hybrid_chat, agent_systems
+import contextlib
+import json
+import time
+import uuid
+from datetime import datetime
+from hybrid_chat import initialize_agent_system, achat as hybrid_chat, achat_stream, agent_systems, prompt_cache
 
 # New imports: use your new modules
 from .models.forecast import generate_three_scenarios
 from .models.agent_system import AgentSystem
+from .models.crisis import run_batch_scenario_analysis
+from .models.income_agent import forecast_cache
+from .services.timeseries import INCOME, ordinals_to_strings, to_ordinals
+from .services.memory_db import InMemoryDB
+from .config import CRISIS_SCAN_BATCH, UPLOAD_CHUNK_ROWS
+from .services import llm
+from .services.registry import agent_registry
+from .services.scheduler import CrisisMonitorScheduler
+from .services.executor import compute, ExecutorBusy, ExecutorTimeout
+from .services.demo import demo_dataset
+from .utils import log as logs
+from .utils import metrics
+from .utils import profiling
+from .config import MONITOR_ENABLED
+from .config import DB_BACKEND, SQLITE_PATH
+from .config import SHARD_ID
+from .services.sqlite_db import SQLiteDB
+from .services.firebase import DB as FirebaseDB
+from .services.fake_rtdb import FakeRealtimeDatabase
 
 
 app = FastAPI(
@@ -18,6 +42,39 @@ app = FastAPI(
     version="2.0.0"
 )
 
+logs.configure_logging()
+log = logs.get_logger(__name__)
+
+HTTP_SECONDS = metrics.histogram(
+    "finmate_http_request_duration_seconds", "API request latency", ["method", "route", "status"]
+)
+UPLOAD_ROWS = metrics.counter("finmate_upload_rows_total", "Income rows accepted by CSV upload")
+
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """
+    Correlation id for every log line of a request (X-Request-ID, or a new one),
+    and its latency by route template
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = logs.request_id_var.set(request_id)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        logs.request_id_var.reset(token)
+        # Template, not the raw path, so label values stay bounded (unmatched -> "other")
+        route = request.scope.get("route")
+        HTTP_SECONDS.labels(
+            request.method, getattr(route, "path", "other"), str(status)
+        ).observe(time.perf_counter() - started)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -27,58 +84,155 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_crisis_monitor():
+    if MONITOR_ENABLED:
+        # Users persisted by an earlier run are otherwise only queued on their next request
+        seeded = crisis_monitor.seed(db.user_ids())
+        log.info("🛰️ Crisis monitor started", users_scheduled=seeded)
+        crisis_monitor.start()
+    compute.warm_up()
+    demo_dataset()
+
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    await crisis_monitor.stop()
+    await llm.aclose()
+    compute.shutdown()
+    # Persist live agent state, then flush/close the DB
+    agent_registry.clear()
+    if hasattr(db, "close"):
+        db.close()
+    logs.shutdown_logging()
+
+
 # In-memory storage (replace with Firebase / real DB later)
 user_data_store: Dict[str, Dict[str, Any]] = {}
 
 
-# -------------------------------------------------------------------
-# Simple in-memory "DB" wrapper that matches what agents expect
-# -------------------------------------------------------------------
-class InMemoryDB:
-    def __init__(self, store: Dict[str, Dict[str, Any]]):
-        self.store = store
+# Global DB instance shared by agent systems
+if DB_BACKEND == "sqlite":
+    db = SQLiteDB(SQLITE_PATH)
+elif DB_BACKEND == "firebase":
+    db = FirebaseDB()
+elif DB_BACKEND == "firebase_fake":
+    db = FirebaseDB(FakeRealtimeDatabase())
+else:
+    db = InMemoryDB(user_data_store)
 
-    def _ensure_user(self, user_id: str) -> Dict[str, Any]:
-        return self.store.setdefault(user_id, {})
 
-    def get_transactions(self, user_id: str, days: int = 60):
-        user = self._ensure_user(user_id)
-        # stored as list of {date, amount, type}
-        return user.get("transactions", [])
+def persist_evicted(user_id: str, system: AgentSystem):
+    """
+    on_evict: persist an evicted system's agent state (under its lock, so
+    after any agent call still running on it) for a rebuilt one to resume
+    """
+    with system.lock:
+        system.persist()
 
-    def get_balance(self, user_id: str) -> float:
-        user = self._ensure_user(user_id)
-        return float(user.get("balance", 0.0))
 
-    def get_upcoming_bills(self, user_id: str, days: int = 14):
-        user = self._ensure_user(user_id)
-        # list of {name, amount, due_date}
-        return user.get("bills", [])
+agent_registry.on_evict = persist_evicted
 
-    def get_avg_daily_expenses(self, user_id: str) -> float:
-        user = self._ensure_user(user_id)
-        return float(user.get("avg_expenses", 0.0))
 
-    def update_user_state(self, user_id: str, updates: dict):
-        user = self._ensure_user(user_id)
-        state = user.setdefault("state", {})
-        state.update(updates)
+def get_agent_system(user_id: str) -> AgentSystem:
+    """
+    Helper to fetch (or construct) the shared AgentSystem for a given user.
+    """
+    system, _ = agent_registry.get_or_create(user_id, lambda: AgentSystem.create(user_id, db))
+    return system
 
-    def save_crisis_alert(self, user_id: str, crisis_info: dict):
-        user = self._ensure_user(user_id)
-        alerts = user.setdefault("crisis_alerts", [])
-        alerts.append(crisis_info)
 
+# Background crisis monitoring for every user with data
+crisis_monitor = CrisisMonitorScheduler(get_agent_system)
 
-# Global DB instance shared by agent systems
-db = InMemoryDB(user_data_store)
+
+async def offload(stage: str, fn, *args, pure: bool = False, **kwargs):
+    """
+    Run CPU-bound work on the compute executor instead of the event loop
+    (queue full -> 503, timeout -> 504).
+    """
+    try:
+        profile = profiling.current()
+        if profile is None:
+            return await compute.run(stage, fn, *args, pure=pure, **kwargs)
+        # Profiled request: cProfile runs around the job in its worker
+        result, stats = await compute.run(stage, profiling.profile_call, fn, *args, pure=pure, **kwargs)
+        profile.add(stage, stats)
+        return result
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ExecutorTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
 
 
-def get_agent_system(user_id: str) -> AgentSystem:
+def start_profile(request: Request, label: str):
+    """
+    Opt-in cProfile of this request: X-Profile-Token header or ?profile=<token>
+    matching PROFILE_TOKEN (a wrong token -> 403)
+    """
+    token = request.headers.get("x-profile-token") or request.query_params.get("profile")
+    if token is None:
+        return None
+    if not profiling.requested(token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+    return profiling.begin(token, label)
+
+
+def attach_profile(response: dict, profile):
+    """Add the call-tree report of a profiled request to its response"""
+    if profile is not None:
+        response["profile"] = profile.finish(logs.request_id_var.get() or uuid.uuid4().hex[:16])
+    return response
+
+
+async def run_agent(system: AgentSystem, stage: str, fn, *args):
+    """offload() for agent methods, serialized per user."""
+    def locked():
+        with system.lock:
+            return fn(*args)
+    return await offload(stage, locked)
+
+
+async def load_agent_system(user_id: str) -> AgentSystem:
+    """
+    get_agent_system() for handlers: a system not built yet (its first DB
+    load may go over the network) is built on the executor, not the loop
+    """
+    system = agent_registry.get_built(user_id)
+    if system is None:
+        system = await offload("agent_build", get_agent_system, user_id)
+    return system
+
+
+def load_history(user_id: str):
+    """The user's income history for a forecast, seeding demo data if empty"""
+    if not len(db.get_transaction_arrays(user_id, days=None).dates):
+        # Load demo data for testing (parsed once, shared copy-on-write)
+        log.info("⚠️ No data, loading demo data", user_id=user_id)
+        db.seed_user(user_id, demo_dataset())
+    return db.get_income_history(user_id)
+
+
+async def chat_agent_system(user_id: str) -> AgentSystem:
+    """
+    The user's AgentSystem for chat; a first chat builds it and runs its
+    first daily check (under the user's lock) on the executor, not the loop
+    """
+    system = agent_registry.get_built(user_id)
+    if system is None:
+        system = await offload("chat_init", initialize_agent_system, user_id, db)
+    return system
+
+
+def scan_locked(systems):
     """
-    Helper to construct an AgentSystem for a given user.
+    run_batch_scenario_analysis holding every user's lock, taken in
+    user_id order so concurrent scans can't deadlock
     """
-    return AgentSystem(user_id=user_id, db=db)
+    with contextlib.ExitStack() as stack:
+        for system in sorted(systems, key=lambda s: s.user_id):
+            stack.enter_context(system.lock)
+        return run_batch_scenario_analysis([system.crisis_agent for system in systems])
 
 
 # -------------------------------------------------------------------
@@ -95,10 +249,23 @@ class ChatRequest(BaseModel):
     history: Optional[list] = None
 
 
-# (optional) you can re-add a simulate request later if needed
-# class SimulateRequest(BaseModel):
-#     user_id: str = "demo_user"
-#     action: dict
+class WhatIfRequest(BaseModel):
+    user_id: str = "demo_user"
+    decision_type: str
+    params: dict = {}
+
+
+class WhatIfBatchRequest(BaseModel):
+    user_id: str = "demo_user"
+    decisions: List[dict]
+
+
+class ShardUsersRequest(BaseModel):
+    user_ids: List[str]
+
+
+class ShardImportRequest(BaseModel):
+    users: Dict[str, dict]
 
 
 # -------------------------------------------------------------------
@@ -113,11 +280,67 @@ async def root():
             "/api/income/upload",
             "/api/forecast/generate",
             "/api/agents/daily-check",
+            "/api/agents/crisis-scan",
+            "/api/agents/what-if",
+            "/api/agents/what-if/batch",
+            "/api/chat",
+            "/api/chat/stream",
             "/api/health",
+            "/api/metrics",
         ],
     }
 
 
+def ingest_income_csv(fileobj, user_id: str):
+    """
+    Parse an income CSV in fixed-size chunks and merge it into the user's
+    history (runs on the compute executor, not the event loop).
+
+    Counts come from the merged history, so dates repeated within the file
+    or replacing earlier uploads are counted once, at their stored value.
+    """
+    import pandas as pd  # deferred: only uploads parse CSV
+
+    header = pd.read_csv(fileobj, nrows=0)
+    if "date" not in header.columns or "income" not in header.columns:
+        raise HTTPException(
+            status_code=400,
+            detail="CSV must have 'date' and 'income' columns",
+        )
+    fileobj.seek(0)
+
+    uploaded = []
+    reader = pd.read_csv(
+        fileobj,
+        usecols=["date", "income"],
+        dtype={"date": "string", "income": "float64"},
+        chunksize=UPLOAD_CHUNK_ROWS,
+    )
+    for chunk in reader:
+        # Clean data
+        dates = pd.to_datetime(chunk["date"]).to_numpy(dtype="datetime64[D]")
+        amounts = chunk["income"].to_numpy()
+        if not len(dates):
+            continue
+
+        # Merge into existing history (date order kept, duplicates by date replaced)
+        db.merge_transactions(user_id, dates, amounts, INCOME)
+        uploaded.append(to_ordinals(dates))
+
+    if not uploaded:
+        raise HTTPException(status_code=400, detail="CSV has no income rows")
+
+    history = db.get_transaction_arrays(user_id, days=None)
+    stored = (history.types == INCOME) & np.isin(history.dates, np.unique(np.concatenate(uploaded)))
+    stored_dates = history.dates[stored]
+    return {
+        "rows": int(stored.sum()),
+        "income_total": float(history.amounts[stored].sum()),
+        "date_range": " to ".join(ordinals_to_strings([stored_dates.min(), stored_dates.max()])),
+        "history_rows": len(history.dates),
+    }
+
+
 @app.post("/api/income/upload")
 async def upload_income(file: UploadFile = File(...)):
     """
@@ -125,102 +348,70 @@ async def upload_income(file: UploadFile = File(...)):
     Expected format: date,income
     """
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-
-        # Validate columns
-        if "date" not in df.columns or "income" not in df.columns:
-            raise HTTPException(
-                status_code=400,
-                detail="CSV must have 'date' and 'income' columns",
-            )
-
-        # Clean data
-        df["date"] = pd.to_datetime(df["date"])
-        df = df.sort_values("date")
+        user_id = "demo_user"  # you can pass this from frontend later
+        system = await load_agent_system(user_id)
+        ingested = await run_agent(system, "upload", ingest_income_csv, file.file, user_id)
+        rows = ingested["rows"]
+        UPLOAD_ROWS.inc(rows)
 
-        # Convert to list of dicts
-        income_data = df[["date", "income"]].to_dict("records")
-        income_data = [
-            {"date": str(row["date"].date()), "income": float(row["income"])}
-            for row in income_data
-        ]
+        # New data: re-check this user for crises right away
+        crisis_monitor.schedule(user_id, force=True)
 
-        # Store in memory (later: real DB)
-        user_id = "demo_user"  # you can pass this from frontend later
-        user = user_data_store.setdefault(user_id, {})
-        user["income_data"] = income_data
-        user["uploaded_at"] = pd.Timestamp.now().isoformat()
-
-        # Also save basic "transactions" so IncomeAgent can work
-        user["transactions"] = [
-            {
-                "date": rec["date"],
-                "amount": rec["income"],
-                "type": "income",
-            }
-            for rec in income_data
-        ]
+        avg_income = ingested["income_total"] / rows
+        db.update_profile(user_id, {"uploaded_at": datetime.now().isoformat()})
 
         # default dummy values for other DB fields used by agents
-        user.setdefault("balance", df["income"].mean() * 5)  # some starting buffer
-        user.setdefault("bills", [])         # you can fill this from UI later
-        user.setdefault("avg_expenses", 500) # tweak later
+        db.update_profile(user_id, {
+            "balance": avg_income * 5,  # some starting buffer
+            "bills": [],                # you can fill this from UI later
+            "avg_expenses": 500,        # tweak later
+        }, overwrite=False)
 
         return {
             "message": "Income data uploaded successfully",
-            "rows": len(income_data),
-            "date_range": f"{income_data[0]['date']} to {income_data[-1]['date']}",
-            "avg_income": f"₹{df['income'].mean():.0f}/day",
+            "rows": rows,
+            "history_rows": ingested["history_rows"],
+            "date_range": ingested["date_range"],
+            "avg_income": f"₹{avg_income:.0f}/day",
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/forecast/generate")
-async def generate_forecast(request: ForecastRequest):
+async def generate_forecast(request: ForecastRequest, http_request: Request):
     """
     Generate 3 financial futures using Prophet + basic agent insights.
     """
     try:
         user_id = request.user_id
         periods = request.periods or 90
+        profile = start_profile(http_request, "forecast")
 
         # Get user's income data OR load demo data
-        if user_id not in user_data_store or "income_data" not in user_data_store[user_id]:
-            # Load demo data for testing
-            print(f"⚠️  No data for {user_id}, loading demo data.")
-            demo_data = pd.read_csv("data/sample_income.csv")
-            demo_data["date"] = pd.to_datetime(demo_data["date"])
-            income_data = [
-                {"date": str(row["date"].date()), "income": float(row["income"])}
-                for _, row in demo_data.iterrows()
-            ]
-            user_data_store[user_id] = {
-                "income_data": income_data,
-                "transactions": [
-                    {"date": rec["date"], "amount": rec["income"], "type": "income"}
-                    for rec in income_data
-                ],
-                "balance": demo_data["income"].mean() * 5,
-                "bills": [],
-                "avg_expenses": 500,
-            }
-        else:
-            income_data = user_data_store[user_id]["income_data"]
+        income_data = await offload("load_history", load_history, user_id)
+        crisis_monitor.schedule(user_id, only_if_new=True)
 
-        print(f"\n🚀 Generating forecast for {user_id}.")
+        log.debug("🚀 Generating forecast", user_id=user_id, periods=periods)
 
-        # 1) Use Prophet-based forecasting
-        scenarios = generate_three_scenarios(income_data, periods=periods)
+        # 1) Use Prophet-based forecasting (pure: may run in another process)
+        scenarios = await offload(
+            "generate_three_scenarios", generate_three_scenarios, income_data, periods=periods, pure=True
+        )
 
         # 2) Let IncomeAgent analyze income pattern (uses our in-memory DB)
-        agent_system = get_agent_system(user_id)
-        income_pattern = agent_system.income_agent.analyze_income_pattern()
+        agent_system = await load_agent_system(user_id)
+        income_pattern = await run_agent(
+            agent_system, "analyze_income_pattern", agent_system.income_agent.analyze_income_pattern
+        )
 
         # 3) Run crisis analysis to get interventions/suggestions
-        crisis_info = agent_system.crisis_agent.run_scenario_analysis()
+        crisis_info = await run_agent(
+            agent_system, "run_scenario_analysis", agent_system.crisis_agent.run_scenario_analysis
+        )
         interventions = []
         if crisis_info and crisis_info.get('interventions'):
             interventions = crisis_info['interventions']
@@ -245,23 +436,25 @@ async def generate_forecast(request: ForecastRequest):
 
         # 4) Build activity list from recent income data
         activity = []
-        recent_income = income_data[-14:] if len(income_data) >= 14 else income_data
-        for rec in recent_income[-7:]:  # last 7 days
+        recent_dates = np.datetime_as_string(income_data["date"][-7:], unit="D")  # last 7 days
+        for date, amount in zip(recent_dates, income_data["income"][-7:]):
             activity.append({
-                "date": rec["date"],
-                "amount": rec["income"],
+                "date": str(date),
+                "amount": float(amount),
                 "type": "income",
             })
 
         # Store minimal stuff for later use
-        user_data_store[user_id]["scenarios"] = scenarios
-        user_data_store[user_id]["income_pattern"] = income_pattern
-        user_data_store[user_id]["suggestions"] = suggestions
-        user_data_store[user_id]["activity"] = activity
+        db.update_profile(user_id, {
+            "scenarios": scenarios,
+            "income_pattern": income_pattern,
+            "suggestions": suggestions,
+            "activity": activity,
+        })
 
-        print("✅ Forecast generated successfully!\n")
+        log.debug("✅ Forecast generated", user_id=user_id)
 
-        return {
+        return attach_profile({
             "scenarios": scenarios,
             "suggestions": suggestions,
             "activity": activity,
@@ -272,17 +465,19 @@ async def generate_forecast(request: ForecastRequest):
             },
             "metadata": {
                 "forecast_days": len(scenarios.get("dates", [])),
-                "generated_at": pd.Timestamp.now().isoformat(),
+                "generated_at": datetime.now().isoformat(),
             },
-        }
+        }, profile)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
+        log.exception("❌ Forecast failed", user_id=request.user_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/agents/daily-check")
-async def agents_daily_check(user_id: str = "demo_user"):
+async def agents_daily_check(request: Request, user_id: str = "demo_user"):
     """
     Run the full AgentSystem: income forecast + crisis check + savings suggestion.
 
@@ -293,21 +488,124 @@ async def agents_daily_check(user_id: str = "demo_user"):
     are implemented in your agent files.
     """
     try:
-        agent_system = get_agent_system(user_id)
-        result = agent_system.daily_check()
-        return result
+        profile = start_profile(request, "daily_check")
+        agent_system = await load_agent_system(user_id)
+        result = await run_agent(agent_system, "daily_check", agent_system.daily_check)
+        return attach_profile(result, profile)
+    except HTTPException:
+        raise
     except Exception as e:
         # If some internal agent method is still 'pass', you'll see it here.
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/agents/crisis-scan")
+async def agents_crisis_scan():
+    """
+    Fleet-wide crisis sweep: batch scenario analysis for every stored user.
+    """
+    try:
+        systems = [await load_agent_system(user_id) for user_id in db.user_ids()]
+        results = {}
+        for lo in range(0, len(systems), CRISIS_SCAN_BATCH):
+            results.update(await offload("crisis_scan", scan_locked, systems[lo:lo + CRISIS_SCAN_BATCH]))
+        return {
+            "users_scanned": len(results),
+            "crises_detected": sum(1 for info in results.values() if info),
+            "results": results,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/agents/what-if")
+async def agents_what_if(request: WhatIfRequest):
+    """
+    Butterfly effect: crisis risk before/after a single decision
+    (one_off_expense, recurring_cut, extra_shift).
+    """
+    try:
+        system = await load_agent_system(request.user_id)
+        return await run_agent(
+            system, "what_if", system.crisis_agent.simulate_decision, request.decision_type, request.params
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/agents/what-if/batch")
+async def agents_what_if_batch(request: WhatIfBatchRequest):
+    """
+    Score many decisions ({"type": ..., "params": {...}}) in one pass.
+    """
+    try:
+        system = await load_agent_system(request.user_id)
+        impacts = await run_agent(system, "what_if", system.crisis_agent.simulate_decisions, request.decisions)
+        return {"impacts": impacts}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "users_in_memory": len(user_data_store),
+        "shard_id": SHARD_ID,
+        "db_backend": DB_BACKEND,
+        "users_in_memory": len(db.user_ids()),
+        "db": db.stats() if hasattr(db, "stats") else None,
+        "forecast_cache": forecast_cache.stats(),
+        "agent_registry": agent_registry.stats(),
+        "crisis_monitor": crisis_monitor.stats(),
+        "compute": compute.stats(),
+        "logging": logs.stats(),
+    }
+
+
+def _cache_metrics():
+    """Counts the caches and background workers already keep, read at scrape time"""
+    caches = {
+        "forecast": forecast_cache.stats(),
+        "prompt": prompt_cache.stats(),
+        "agent_registry": agent_registry.stats(),
     }
+    monitor = crisis_monitor.stats()
+    return [
+        ("finmate_cache_hits_total", "counter", "Cache hits",
+         [({"cache": name}, s["hits"]) for name, s in caches.items()]),
+        ("finmate_cache_misses_total", "counter", "Cache misses",
+         [({"cache": name}, s["misses"]) for name, s in caches.items()]),
+        ("finmate_cache_entries", "gauge", "Entries currently cached",
+         [({"cache": name}, s["size"]) for name, s in caches.items()]),
+        ("finmate_monitor_checks_total", "counter", "Background crisis checks run",
+         [({}, monitor["checks_run"])]),
+        ("finmate_monitor_crises_total", "counter", "Crises found by the background monitor",
+         [({}, monitor["crises_detected"])]),
+        ("finmate_compute_in_flight", "gauge", "Compute jobs queued or running",
+         [({}, compute.stats()["in_flight"])]),
+        ("finmate_log_records_dropped_total", "counter", "Log records dropped on a full queue",
+         [({}, logs.stats()["dropped"])]),
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+
+@app.get("/api/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of request, stage and cache metrics"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.post("/api/chat")
@@ -322,10 +620,10 @@ async def chat_endpoint(request: ChatRequest):
         history = request.history or []
 
         # Initialize agent system if not already done
-        initialize_agent_system(user_id, db)
+        await chat_agent_system(user_id)
 
-        # Get response from hybrid chat (uses OpenAI)
-        result = hybrid_chat(user_id, message, history)
+        # Get response from hybrid chat (async Groq client, does not block the loop)
+        result = await hybrid_chat(user_id, message, history)
 
         if result.get('success'):
             return {
@@ -335,11 +633,95 @@ async def chat_endpoint(request: ChatRequest):
         else:
             raise HTTPException(status_code=500, detail=result.get('error', 'Unknown error'))
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Chat error: {e}")
+        log.exception("❌ Chat error", user_id=request.user_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Format one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Same as /api/chat, but tokens are sent as server-sent events as they are
+    generated. Ends with a `done` event carrying time-to-first-token and
+    total latency (ms), or an `error` event.
+    """
+    user_id = request.user_id
+    history = request.history or []
+    await chat_agent_system(user_id)
+
+    async def event_stream():
+        timing = {}
+        try:
+            async for delta in achat_stream(user_id, request.message, history, timing=timing):
+                yield _sse({"token": delta})
+            yield _sse(timing, event="done")
+        except Exception as e:
+            log.exception("❌ Chat stream error", user_id=user_id, error=str(e))
+            yield _sse({"error": str(e)}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# -------------------------------------------------------------------
+# Shard handoff (only on workers started by app.router)
+# -------------------------------------------------------------------
+if SHARD_ID is not None:
+
+    @app.get("/internal/shard/users")
+    async def shard_users():
+        return {"shard_id": SHARD_ID, "user_ids": db.user_ids()}
+
+    @app.post("/internal/shard/export")
+    async def shard_export(request: ShardUsersRequest):
+        """
+        Phase 1 of a handoff: persist live agent state, pause the users'
+        monitoring and return their snapshots. The users stay here until
+        /internal/shard/drop (import succeeded) or /internal/shard/restore.
+        """
+        users = {}
+        for user_id in request.user_ids:
+            crisis_monitor.unschedule(user_id)
+            agent_registry.evict(user_id)
+            users[user_id] = db.export_user(user_id)
+        return {"shard_id": SHARD_ID, "users": users}
+
+    @app.post("/internal/shard/import")
+    async def shard_import(request: ShardImportRequest):
+        """Take over users exported by another shard."""
+        for user_id, snapshot in request.users.items():
+            db.import_user(user_id, snapshot)
+            crisis_monitor.schedule(user_id, only_if_new=True)
+        return {"shard_id": SHARD_ID, "imported": len(request.users)}
+
+    @app.post("/internal/shard/drop")
+    async def shard_drop(request: ShardUsersRequest):
+        """Phase 2: forget users now owned by another shard."""
+        for user_id in request.user_ids:
+            crisis_monitor.unschedule(user_id)
+            agent_registry.evict(user_id)
+            db.drop_user(user_id)
+        return {"shard_id": SHARD_ID, "dropped": len(request.user_ids)}
+
+    @app.post("/internal/shard/restore")
+    async def shard_restore(request: ShardUsersRequest):
+        """Handoff aborted: keep serving exported users."""
+        for user_id in request.user_ids:
+            crisis_monitor.schedule(user_id, only_if_new=True)
+        return {"shard_id": SHARD_ID, "restored": len(request.user_ids)}
+
+
 if __name__ == "__main__":
     import uvicorn
 
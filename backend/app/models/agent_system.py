@@ -1,12 +1,25 @@
+import threading
+
+from ..utils.log import get_logger
 from .income_agent import IncomeAgent
 from .save_agent import SavingsAgent        
 from .crisis import CrisisAgent
+
+
+log = get_logger(__name__)
+
+
 class AgentSystem:
     """
     Coordinates all 3 agents
     """
     
     def __init__(self, user_id, db):
+        self.user_id = user_id
+        self.db = db
+        # Agent work runs in worker threads: one job per user at a time
+        self.lock = threading.RLock()
+        
         # Initialize agents
         self.income_agent = IncomeAgent(user_id, db)
         self.savings_agent = SavingsAgent(user_id, db, None, None)
@@ -16,11 +29,47 @@ class AgentSystem:
         self.savings_agent.income_agent = self.income_agent
         self.savings_agent.crisis_agent = self.crisis_agent
     
+    @classmethod
+    def create(cls, user_id, db):
+        """
+        Build a system and resume any agent state persisted for this user
+        """
+        system = cls(user_id, db)
+        get_state = getattr(db, 'get_user_state', None)
+        snapshot = (get_state(user_id) or {}).get('agents') if get_state else None
+        if snapshot:
+            system.restore_state(snapshot)
+        return system
+    
+    def persist(self):
+        """
+        Save agent state to the DB (used as the registry eviction hook)
+        """
+        self.db.update_user_state(self.user_id, {'agents': self.export_state()})
+    
+    def export_state(self):
+        """
+        Snapshot of all agent states (e.g. to persist before eviction)
+        """
+        return {
+            'income_agent': dict(self.income_agent.state),
+            'crisis_agent': dict(self.crisis_agent.state),
+            'savings_agent': dict(self.savings_agent.state)
+        }
+    
+    def restore_state(self, snapshot):
+        """
+        Resume from a snapshot produced by export_state()
+        """
+        self.income_agent.state.update(snapshot.get('income_agent', {}))
+        self.crisis_agent.state.update(snapshot.get('crisis_agent', {}))
+        self.savings_agent.state.update(snapshot.get('savings_agent', {}))
+    
     def daily_check(self):
         """
         Agents work together autonomously
         """
-        print("🚀 Agent System: Running daily check...")
+        log.debug("🚀 Agent System: running daily check", user_id=self.user_id)
         
         # Agent 1: Predict income
         income_forecast = self.income_agent.predict_scenarios(14)
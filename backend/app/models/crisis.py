@@ -1,8 +1,190 @@
 """
 Crisis detection and alert logic
 """
+import time
+
 import numpy as np
 
+from ..config import (
+    INTERVENTION_BATCH_BUDGET_MS,
+    MONITOR_CRISIS_INTERVAL,
+    MONITOR_NORMAL_INTERVAL,
+)
+from ..services.interventions import optimize_interventions, optimize_interventions_batch
+from .income_agent import predict_scenarios_batch
+from ..utils.log import get_logger
+from ..utils.metrics import counter, timed
+from ..utils.state import VersionedState
+
+
+log = get_logger(__name__)
+
+CRISES_DETECTED = counter(
+    "finmate_crises_detected_total", "Users entering a crisis (no active crisis before)", ["severity"]
+)
+
+
+SCENARIO_NAMES = ('pessimistic', 'base', 'optimistic')
+
+# Older decision names accepted by CrisisAgent.simulate_decision
+DECISION_ALIASES = {
+    'purchase': 'one_off_expense',
+    'reduce_expense': 'recurring_cut'
+}
+
+# Intervention candidate pool
+SHIFT_EARNINGS = 1500
+MAX_EXTRA_SHIFTS = 10
+FUND_FRACTIONS = (0.25, 0.5, 0.75, 1.0)
+EXPENSE_CUT_TIERS = ((0.1, 0.9), (0.2, 0.7), (0.3, 0.5), (0.4, 0.3))  # (share cut, feasibility)
+DELAY_FEASIBILITY = 0.5
+LATE_FEE_RATE = 0.02
+
+
+def simulate_balances(income, balance, daily_costs):
+    """
+    Cumulative balance trajectories for any stack of income streams
+
+    Args:
+        income: array (..., days) of daily income
+        balance: starting balance, broadcastable to income.shape[:-1]
+        daily_costs: expenses + bill share per day, broadcastable likewise
+
+    Returns:
+        array (..., days) with the balance at the end of each day
+    """
+    income = np.nan_to_num(np.asarray(income, dtype=float))
+    net = income - np.asarray(daily_costs, dtype=float)[..., None]
+    return np.asarray(balance, dtype=float)[..., None] + np.cumsum(net, axis=-1)
+
+
+def find_first_crisis(trajectories):
+    """
+    Locate the first negative-balance day of each trajectory
+
+    Returns:
+        (crisis, days_to_crisis, deficit) arrays shaped trajectories.shape[:-1];
+        days_to_crisis is 1-based and 0 where no crisis occurs
+    """
+    negative = trajectories < 0
+    crisis = negative.any(axis=-1)
+    first = negative.argmax(axis=-1)
+    at_first = np.take_along_axis(trajectories, first[..., None], axis=-1)[..., 0]
+
+    days_to_crisis = np.where(crisis, first + 1, 0)
+    deficit = np.where(crisis, -at_first, 0.0)
+    return crisis, days_to_crisis, deficit
+
+
+def analyze_scenarios_batch(income, balances, bills_totals, avg_expenses):
+    """
+    FLEET-WIDE: Simulate every user's scenarios in one array pass
+
+    Args:
+        income: array (users, scenarios, days) of predicted daily income
+        balances / bills_totals / avg_expenses: arrays (users,)
+
+    Returns:
+        dict of per-user arrays: probability, days_to_crisis (earliest),
+        deficit (at the earliest crisis) plus the per-scenario crisis mask
+    """
+    income = np.asarray(income, dtype=float)
+    days = income.shape[-1]
+
+    # Spread bills evenly across period as a simple heuristic
+    per_day_bills = np.asarray(bills_totals, dtype=float) / days if days else 0.0
+    daily_costs = np.asarray(avg_expenses, dtype=float) + per_day_bills
+
+    trajectories = simulate_balances(
+        income, np.asarray(balances, dtype=float)[:, None], daily_costs[:, None]
+    )
+    return summarize_trajectories(trajectories)
+
+
+def summarize_trajectories(trajectories):
+    """
+    Crisis summary of stacked scenario trajectories
+
+    Args:
+        trajectories: array (..., scenarios, days) of daily balances
+
+    Returns:
+        dict of arrays over the leading dims: probability, days_to_crisis
+        (earliest, 0 if none), deficit (at the earliest crisis) plus the
+        per-scenario crisis mask
+    """
+    days = trajectories.shape[-1]
+    crisis, days_to_crisis, deficit = find_first_crisis(trajectories)
+
+    # Earliest crisis across scenarios (first scenario wins ties)
+    masked_days = np.where(crisis, days_to_crisis, days + 1)
+    earliest_idx = masked_days.argmin(axis=-1)[..., None]
+
+    return {
+        'crisis': crisis,
+        'probability': crisis.mean(axis=-1),
+        'days_to_crisis': np.take_along_axis(days_to_crisis, earliest_idx, axis=-1)[..., 0],
+        'deficit': np.take_along_axis(deficit, earliest_idx, axis=-1)[..., 0],
+    }
+
+
+def run_batch_scenario_analysis(crisis_agents, days=14):
+    """
+    Batch version of CrisisAgent.run_scenario_analysis for many users
+
+    Args:
+        crisis_agents: iterable of CrisisAgent (one per user)
+        days: forecast horizon
+
+    Returns:
+        dict user_id -> crisis_info (same shape as run_scenario_analysis) or None
+    """
+    crisis_agents = list(crisis_agents)
+    if not crisis_agents:
+        return {}
+
+    # One vectorized forecast for every user (users, scenarios, days)
+    scenarios = predict_scenarios_batch([agent.income_agent for agent in crisis_agents], days)
+    income = np.stack([scenarios[name] for name in SCENARIO_NAMES], axis=1)
+
+    balances = np.empty(len(crisis_agents))
+    bills_totals = np.empty(len(crisis_agents))
+    avg_expenses = np.empty(len(crisis_agents))
+
+    for i, agent in enumerate(crisis_agents):
+        balances[i] = agent.db.get_balance(agent.user_id)
+        bills = agent.db.get_upcoming_bills(agent.user_id, days=days)
+        bills_totals[i] = sum(b.get('amount', 0) for b in (bills or []))
+        avg_expenses[i] = agent.db.get_avg_daily_expenses(agent.user_id) or 0.0
+
+    batch = analyze_scenarios_batch(income, balances, bills_totals, avg_expenses)
+
+    # Plan interventions for every user in crisis in one optimizer pass
+    in_crisis = [i for i in range(len(crisis_agents)) if batch['probability'][i] > 0]
+    deficits = [float(batch['deficit'][i]) for i in in_crisis]
+    horizons = [int(batch['days_to_crisis'][i]) for i in in_crisis]
+    pools = [
+        crisis_agents[i]._intervention_candidates(deficit, horizon)
+        for i, deficit, horizon in zip(in_crisis, deficits, horizons)
+    ]
+    plans = dict(zip(in_crisis, optimize_interventions_batch(
+        pools, deficits, horizons, INTERVENTION_BATCH_BUDGET_MS
+    )))
+
+    results = {}
+    for i, agent in enumerate(crisis_agents):
+        probability = float(batch['probability'][i])
+        if probability > 0:
+            results[agent.user_id] = agent._build_crisis_info(
+                probability,
+                int(batch['days_to_crisis'][i]),
+                float(batch['deficit'][i]),
+                plan=plans[i],
+            )
+        else:
+            results[agent.user_id] = None
+    return results
+
 
 # agents/crisis_agent.py
 class CrisisAgent:
@@ -17,36 +199,70 @@ class CrisisAgent:
         self.income_agent = income_agent  # Can talk to other agents
         self.savings_agent = savings_agent
         
-        self.state = {
+        # What-if engine: cached balance trajectories of the last analysis
+        self._trajectory_cache = None
+        
+        self.state = VersionedState({
             'active_crisis': None,
             'crisis_history': [],
             'monitoring': True
-        }
+        })
         
         self.thresholds = {
             'critical': 0.70,  # 70%+ crisis probability
             'high': 0.50,
             'medium': 0.30
         }
+        
+        # Seconds between checks (daily normally, every 6 hours during crisis)
+        self.check_intervals = {
+            'normal': MONITOR_NORMAL_INTERVAL,
+            'high': MONITOR_CRISIS_INTERVAL
+        }
     
-    def monitor_continuously(self):
+    def monitor_continuously(self, force=False):
         """
         PROACTIVE: Doesn't wait to be called, actively checks
+        (force: new data arrived, analyse even if the last check is recent)
         """
-        print(f"👁️ Crisis Agent: Monitoring user {self.user_id}")
+        log.debug("👁️ Crisis Agent: monitoring", user_id=self.user_id)
         
         # AUTONOMOUS: Decide when to run analysis
-        if self._should_run_analysis():
+        if self._should_run_analysis(force):
+            self.state['last_check'] = time.time()
             crisis_info = self.run_scenario_analysis()
             
-            if crisis_info and crisis_info['probability'] > self.thresholds['medium']:
+            if self.flags_crisis(crisis_info):
                 self._handle_crisis_detected(crisis_info)
+            elif self.state.get('active_crisis'):
+                self._handle_crisis_resolved()
+            
+            return crisis_info
+        
+        return None
+    
+    def flags_crisis(self, crisis_info):
+        """
+        DECISION: Is an analysis result serious enough to act on (alert, crisis mode)?
+        """
+        return bool(crisis_info) and crisis_info['probability'] > self.thresholds['medium']
     
+    def next_check_in(self):
+        """
+        Seconds until this agent wants its next analysis
+        """
+        last_check = self.state.get('last_check')
+        if last_check is None:
+            return 0.0
+        interval = self.check_intervals[self.state.get('monitoring_frequency', 'normal')]
+        return max(0.0, last_check + interval - time.time())
+    
+    @timed("run_scenario_analysis")
     def run_scenario_analysis(self):
         """
         INTELLIGENT: Multi-step analysis with decision-making
         """
-        print("🔍 Crisis Agent: Running scenario analysis...")
+        log.debug("🔍 Crisis Agent: running scenario analysis", user_id=self.user_id)
         
         # COMMUNICATION: Get data from Income Agent
         scenarios = self.income_agent.predict_scenarios(14)
@@ -59,7 +275,7 @@ class CrisisAgent:
         # INTELLIGENT ANALYSIS: Run multiple scenarios
         crisis_scenarios = []
         
-        for scenario_name in ['pessimistic', 'base', 'optimistic']:
+        for scenario_name in SCENARIO_NAMES:
             income_stream = scenarios[scenario_name]
             result = self._simulate_scenario(
                 income_stream, 
@@ -69,6 +285,15 @@ class CrisisAgent:
             )
             crisis_scenarios.append(result)
         
+        # MEMORY: Keep the trajectories so what-if questions skip resimulation
+        if all('trajectory' in s for s in crisis_scenarios):
+            self._trajectory_cache = {
+                'key': self._scenario_key(balance, bills, avg_expenses),
+                'trajectories': np.stack([s.pop('trajectory') for s in crisis_scenarios])
+            }
+        else:
+            self._trajectory_cache = None
+        
         # DECISION: Calculate probability
         crises_detected = sum(1 for s in crisis_scenarios if s['crisis'])
         probability = crises_detected / len(crisis_scenarios)
@@ -79,115 +304,268 @@ class CrisisAgent:
             earliest = min(crisis_days)
             deficit = next(s['deficit'] for s in crisis_scenarios if s['days_to_crisis'] == earliest)
             
-            crisis_info = {
-                'detected': True,
-                'probability': probability,
-                'days_to_crisis': earliest,
-                'deficit': deficit,
-                'severity': self._classify_severity(probability, earliest)
-            }
-            
-            # GOAL-ORIENTED: Generate solutions
-            crisis_info['interventions'] = self._generate_interventions(crisis_info)
-            
-            return crisis_info
+            return self._build_crisis_info(probability, earliest, deficit)
         
         return None
     
-    def _generate_interventions(self, crisis_info):
+    def _build_crisis_info(self, probability, days_to_crisis, deficit, plan=None):
+        """
+        Package a detected crisis with severity and interventions
+        (plan: precomputed intervention plan, e.g. from a batch run)
+        """
+        crisis_info = {
+            'detected': True,
+            'probability': probability,
+            'days_to_crisis': days_to_crisis,
+            'deficit': deficit,
+            'severity': self._classify_severity(probability, days_to_crisis)
+        }
+        
+        # GOAL-ORIENTED: Generate solutions
+        crisis_info['interventions'] = self._generate_interventions(crisis_info, plan)
+        
+        return crisis_info
+    
+    def _classify_severity(self, probability, days_to_crisis):
+        """
+        DECISION: Severity from probability and how soon the crisis hits
+        """
+        if probability >= self.thresholds['critical'] or days_to_crisis <= 3:
+            return 'CRITICAL'
+        if probability >= self.thresholds['high'] or days_to_crisis <= 7:
+            return 'HIGH'
+        if probability >= self.thresholds['medium']:
+            return 'MEDIUM'
+        return 'LOW'
+    
+    def _generate_interventions(self, crisis_info, plan=None):
         """
         INTELLIGENT: Create personalized action plans
+        
+        Picks the most feasible combination of candidates that closes the
+        deficit before the crisis day (see services.interventions).
         """
-        interventions = []
         deficit = crisis_info['deficit']
+        days_to_crisis = crisis_info['days_to_crisis']
+        
+        if plan is None:
+            candidates = self._intervention_candidates(deficit, days_to_crisis)
+            plan = optimize_interventions(candidates, deficit, days_to_crisis)
+        
+        crisis_info['intervention_plan'] = {
+            'total_impact': plan['total_impact'],
+            'combined_feasibility': plan['combined_feasibility'],
+            'covers_deficit': plan['covers_deficit'],
+            'method': plan['method']
+        }
+        
+        # INTELLIGENT: Rank by effectiveness
+        interventions = list(plan['selected'])
+        interventions.sort(key=lambda x: x['impact'] * x['feasibility'], reverse=True)
+        
+        return interventions
+    
+    def _intervention_candidates(self, deficit, days_to_crisis):
+        """
+        CONTEXT AWARE: Every intervention this user could take
+        
+        Options sharing a 'group' are alternatives (e.g. 1, 2 or 3 shifts);
+        'days' is when the money lands, 'cost' breaks ties.
+        """
+        candidates = []
         
         # CONTEXT AWARE: Check income pattern from Income Agent
         income_pattern = self.income_agent.state.get('income_pattern')
         
-        # Generate income-based interventions
-        if income_pattern == 'variable':
-            # Gig worker - suggest extra shifts
-            shifts_needed = int(deficit / 1500) + 1
-            interventions.append({
+        # Generate income-based interventions (gig workers pick up shifts easily)
+        shift_feasibility = 0.8 if income_pattern == 'variable' else 0.4
+        for shifts in range(1, MAX_EXTRA_SHIFTS + 1):
+            candidates.append({
+                'group': 'income_boost',
                 'type': 'income_boost',
-                'action': f'Take {shifts_needed} extra shifts',
-                'impact': shifts_needed * 1500,
-                'feasibility': 0.8,
-                'timeframe': f'{shifts_needed * 2} days'
+                'action': f'Take {shifts} extra shifts',
+                'impact': shifts * SHIFT_EARNINGS,
+                'feasibility': shift_feasibility * 0.95 ** (shifts - 1),
+                'cost': 0,
+                'days': shifts * 2,
+                'timeframe': f'{shifts * 2} days'
             })
         
         # COMMUNICATION: Get savings info from Agent 3
         emergency_fund = self.savings_agent.get_fund_balance()
         
         if emergency_fund > 0:
-            interventions.append({
-                'type': 'use_emergency_fund',
-                'action': f'Use emergency fund (₹{emergency_fund:.0f} available)',
-                'impact': min(emergency_fund, deficit),
-                'feasibility': 1.0,
-                'timeframe': 'Instant',
-                'warning': 'Will deplete emergency fund'
-            })
+            usable = min(emergency_fund, deficit)
+            for fraction in FUND_FRACTIONS:
+                amount = usable * fraction
+                candidates.append({
+                    'group': 'use_emergency_fund',
+                    'type': 'use_emergency_fund',
+                    'action': f'Use ₹{amount:.0f} of emergency fund (₹{emergency_fund:.0f} available)',
+                    'impact': amount,
+                    'feasibility': 1.0,
+                    'cost': amount,
+                    'days': 0,
+                    'timeframe': 'Instant',
+                    'warning': 'Will deplete emergency fund'
+                })
         
-        # Generate expense-cutting interventions
-        cuttable = self._find_cuttable_expenses(deficit)
-        if cuttable:
-            interventions.append({
-                'type': 'expense_reduction',
-                'action': f'Cut non-essentials: {cuttable["items"]}',
-                'impact': cuttable['total_savings'],
-                'feasibility': 0.7,
-                'timeframe': 'Immediate'
-            })
+        # Generate expense-cutting interventions (savings accrue until the crisis)
+        avg_expenses = self.db.get_avg_daily_expenses(self.user_id)
+        if avg_expenses and avg_expenses > 0:
+            for share, feasibility in EXPENSE_CUT_TIERS:
+                candidates.append({
+                    'group': 'expense_reduction',
+                    'type': 'expense_reduction',
+                    'action': f'Cut {share:.0%} of daily spend (dining out, entertainment, shopping)',
+                    'impact': float(avg_expenses * share * days_to_crisis),
+                    'feasibility': feasibility,
+                    'cost': 0,
+                    'days': 0,
+                    'timeframe': 'Immediate'
+                })
         
-        # INTELLIGENT: Rank by effectiveness
-        interventions.sort(key=lambda x: x['impact'] * x['feasibility'], reverse=True)
+        # Ask for more time on individual bills
+        for bill in self.db.get_upcoming_bills(self.user_id, days=14) or []:
+            amount = float(bill.get('amount', 0))
+            name = bill.get('name', 'bill')
+            candidates.append({
+                'group': f'delay_payment:{name}',
+                'type': 'delay_payment',
+                'action': f'Ask to delay {name} (₹{amount:.0f})',
+                'impact': amount,
+                'feasibility': DELAY_FEASIBILITY,
+                'cost': amount * LATE_FEE_RATE,
+                'days': 1,
+                'timeframe': '1 day',
+                'warning': 'May incur a late fee'
+            })
         
-        return interventions
+        return candidates
     
     def simulate_decision(self, decision_type, decision_params):
         """
         BUTTERFLY EFFECT SIMULATOR
         Shows real-time impact of decisions
+        
+        Decisions are applied as a delta on the cached scenario trajectories,
+        so no resimulation is needed (fast enough for a UI slider):
+          - 'one_off_expense' {'amount', 'day'}: spend once on `day` (0 = today)
+          - 'recurring_cut' {'amount', 'day'}: save `amount` every day from `day`
+          - 'extra_shift' {'amount', 'shifts', 'day'}: extra earnings on `day`
         """
-        print(f"🦋 Simulating: {decision_type}")
-        
-        # Get current crisis state
-        current_crisis = self.run_scenario_analysis()
-        
-        if not current_crisis:
-            return {'message': 'No crisis to simulate'}
-        
-        # INTELLIGENT: Apply decision and recalculate
-        modified_state = self._apply_decision(decision_type, decision_params)
-        
-        # Re-run analysis with modified state
-        new_crisis = self._recalculate_with_changes(modified_state)
-        
-        # REACTIVE: Show the impact
-        impact = {
-            'before': {
-                'probability': current_crisis['probability'],
-                'days_to_crisis': current_crisis['days_to_crisis'],
-                'deficit': current_crisis['deficit']
-            },
-            'after': {
-                'probability': new_crisis['probability'] if new_crisis else 0,
-                'days_to_crisis': new_crisis['days_to_crisis'] if new_crisis else None,
-                'deficit': new_crisis['deficit'] if new_crisis else 0
-            },
-            'change': {
-                'probability_delta': (new_crisis['probability'] if new_crisis else 0) - current_crisis['probability'],
-                'risk_reduced': current_crisis['probability'] - (new_crisis['probability'] if new_crisis else 0) > 0
-            }
-        }
+        log.debug("🦋 Simulating decision", user_id=self.user_id, decision=decision_type)
+        return self.simulate_decisions([
+            {'type': decision_type, 'params': decision_params}
+        ])[0]
+    
+    def simulate_decisions(self, decisions):
+        """
+        BATCH: Score many candidate decisions against the same trajectories
         
-        return impact
+        Args:
+            decisions: list of {'type': ..., 'params': {...}}
+        
+        Returns:
+            list of impact dicts (before / after / change) in input order
+        """
+        trajectories = self._get_trajectories()
+        if trajectories is None:
+            return [{'message': 'No forecast to simulate'} for _ in decisions]
+        
+        # INTELLIGENT: Apply every decision as a (decisions x days) delta
+        days = trajectories.shape[-1]
+        deltas = np.stack([
+            self._apply_decision(d.get('type'), d.get('params') or {}, days)
+            for d in decisions
+        ]) if decisions else np.zeros((0, days))
+        
+        before = summarize_trajectories(trajectories)
+        after = self._recalculate_with_changes(trajectories, deltas)
+        
+        before_info = self._crisis_summary(before)
+        impacts = []
+        for i, decision in enumerate(decisions):
+            after_info = self._crisis_summary({k: v[i] for k, v in after.items()})
+            
+            # REACTIVE: Show the impact
+            impacts.append({
+                'decision': decision,
+                'before': before_info,
+                'after': after_info,
+                'change': {
+                    'probability_delta': after_info['probability'] - before_info['probability'],
+                    'risk_reduced': before_info['probability'] - after_info['probability'] > 0,
+                    'deficit_delta': after_info['deficit'] - before_info['deficit']
+                }
+            })
+        
+        return impacts
+    
+    def _get_trajectories(self):
+        """
+        Cached (scenarios x days) balance trajectories, refreshed if stale
+        """
+        balance = self.db.get_balance(self.user_id)
+        bills = self.db.get_upcoming_bills(self.user_id, days=14)
+        avg_expenses = self.db.get_avg_daily_expenses(self.user_id)
+        key = self._scenario_key(balance, bills, avg_expenses)
+        
+        cached = self._trajectory_cache
+        if cached is None or cached['key'] != key or key[0] is None:
+            self.run_scenario_analysis()
+            cached = self._trajectory_cache
+        return cached['trajectories'] if cached else None
+    
+    def _scenario_key(self, balance, bills, avg_expenses):
+        """
+        What the trajectories depend on (data version None = unversioned DB)
+        """
+        get_version = getattr(self.db, 'get_data_version', None)
+        version = get_version(self.user_id) if get_version else None
+        total_bills = sum(b.get('amount', 0) for b in (bills or []))
+        return (version, float(balance or 0.0), float(total_bills), float(avg_expenses or 0.0))
+    
+    def _apply_decision(self, decision_type, params, days):
+        """
+        Balance delta (days,) that a decision adds to every scenario
+        """
+        decision_type = DECISION_ALIASES.get(decision_type, decision_type)
+        amount = float(params.get('amount', 0.0))
+        start = int(params.get('day', 0))
+        elapsed = np.arange(days) - start + 1  # days the decision has been in effect
+        
+        if decision_type == 'one_off_expense':
+            return np.where(elapsed > 0, -amount, 0.0)
+        if decision_type == 'recurring_cut':
+            return amount * np.maximum(elapsed, 0)
+        if decision_type == 'extra_shift':
+            earnings = float(params.get('amount', 1500)) * int(params.get('shifts', 1))
+            return np.where(elapsed > 0, earnings, 0.0)
+        raise ValueError(f"Unknown decision type: {decision_type}")
+    
+    def _recalculate_with_changes(self, trajectories, deltas):
+        """
+        Crisis summary after adding each delta to all scenario trajectories
+        """
+        # (decisions, 1, days) + (scenarios, days) -> (decisions, scenarios, days)
+        return summarize_trajectories(trajectories + deltas[:, None, :])
+    
+    def _crisis_summary(self, summary):
+        probability = float(summary['probability'])
+        return {
+            'probability': probability,
+            'days_to_crisis': int(summary['days_to_crisis']) if probability > 0 else None,
+            'deficit': float(summary['deficit']) if probability > 0 else 0
+        }
     
     def _handle_crisis_detected(self, crisis_info):
         """
         REACTIVE + PROACTIVE: Respond and alert
         """
+        # MEMORY: Only a transition counts; re-checks during a crisis update it
+        if self.state.get('active_crisis') is None:
+            CRISES_DETECTED.labels(crisis_info['severity']).inc()
         self.state['active_crisis'] = crisis_info
         
         # Alert user
@@ -199,15 +577,27 @@ class CrisisAgent:
         # PROACTIVE: Start monitoring more frequently
         self.state['monitoring_frequency'] = 'high'
         
-        print(f"🚨 CRISIS ALERT: {crisis_info['severity']} - {crisis_info['days_to_crisis']} days")
+        log.warning("🚨 CRISIS ALERT", user_id=self.user_id, severity=crisis_info['severity'],
+                    days_to_crisis=crisis_info['days_to_crisis'])
+    
+    def _handle_crisis_resolved(self):
+        """
+        REACTIVE: Crisis no longer projected, back to normal monitoring
+        """
+        resolved = self.state['active_crisis']
+        self.state['crisis_history'].append(resolved)
+        self.state['active_crisis'] = None
+        self.state['monitoring_frequency'] = 'normal'
+        log.info("✅ Crisis resolved", user_id=self.user_id)
     
-    def _should_run_analysis(self):
+    def _should_run_analysis(self, force=False):
         """
         AUTONOMOUS: Decide when to check
         """
-        # Run daily normally, every 6 hours during crisis
-        pass
+        # Run daily normally, every 6 hours during crisis, right away on new data
+        return self.state.get('monitoring', True) and (force or self.next_check_in() <= 0)
     
+    @timed("_simulate_scenario")
     def _simulate_scenario(self, income_stream, balance, bills, avg_expenses):
         """
         Simulate a scenario over the provided income_stream (daily amounts).
@@ -215,29 +605,31 @@ class CrisisAgent:
           - 'crisis': bool
           - 'days_to_crisis': int or None
           - 'deficit': float (amount short at crisis)
+          - 'trajectory': array of daily balances (kept for what-if analysis)
         """
         if not income_stream:
             return {'crisis': False, 'days_to_crisis': None, 'deficit': 0}
 
-        current_balance = float(balance or 0.0)
         total_bills = sum(b.get('amount', 0) for b in (bills or []))
         # Spread bills evenly across period as a simple heuristic
         per_day_bills = (total_bills / len(income_stream)) if total_bills and len(income_stream) else 0.0
 
-        for idx, income in enumerate(income_stream):
-            # Add income, subtract typical expenses and the share of bills
-            current_balance += float(income or 0.0)
-            current_balance -= float(avg_expenses or 0.0)
-            current_balance -= per_day_bills
-
-            if current_balance < 0:
-                # Crisis occurs on this day
-                deficit = -current_balance
-                return {
-                    'crisis': True,
-                    'days_to_crisis': idx + 1,
-                    'deficit': float(deficit)
-                }
+        # Add income, subtract typical expenses and the share of bills
+        trajectory = simulate_balances(
+            income_stream,
+            float(balance or 0.0),
+            float(avg_expenses or 0.0) + per_day_bills
+        )
+        crisis, days_to_crisis, deficit = find_first_crisis(trajectory)
+
+        if crisis:
+            # Crisis occurs on this day
+            return {
+                'crisis': True,
+                'days_to_crisis': int(days_to_crisis),
+                'deficit': float(deficit),
+                'trajectory': trajectory
+            }
 
         # No crisis detected in this scenario
-        return {'crisis': False, 'days_to_crisis': None, 'deficit': 0}
\ No newline at end of file
+        return {'crisis': False, 'days_to_crisis': None, 'deficit': 0, 'trajectory': trajectory}
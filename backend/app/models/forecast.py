@@ -1,70 +1,92 @@
 """
 Simple forecasting logic (no Prophet dependency)
 """
-import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from ..utils.log import DEBUG, get_logger
 
-def generate_three_scenarios(income_data, periods=90):
+
+log = get_logger(__name__)
+
+
+def simulate_income_paths(mean_income, std_income, min_income, max_income,
+                          future_dates, n_paths=1000, rng=None):
+    """
+    Draw N Monte Carlo income paths in a single NumPy call
+
+    Args:
+        mean_income / std_income: Statistics of the user's history
+        min_income / max_income: Used for the floor (50% of min) and cap (120% of max)
+        future_dates: DatetimeIndex of the forecast horizon
+        n_paths: Number of sample paths to draw
+        rng: Optional np.random.Generator
+
+    Returns:
+        ndarray of shape (n_paths, len(future_dates))
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+
+    # Weekend adjustment (example: might earn more or less)
+    weekend_factor = np.where(np.asarray(future_dates.dayofweek) >= 5, 0.85, 1.0)
+
+    # Random daily variation based on YOUR actual variance
+    paths = rng.normal(
+        loc=mean_income * weekend_factor,
+        scale=std_income * 0.5,
+        size=(n_paths, len(future_dates)),
+    )
+
+    # Floor at half your min, cap at 120% your max
+    np.clip(paths, min_income * 0.5, max_income * 1.2, out=paths)
+    return paths
+
+
+def generate_three_scenarios(income_data, periods=90, n_paths=1000,
+                             percentiles=(10, 50, 90), seed=None):
     """
     Generate 3 financial futures using simple statistical methods
     
     Args:
         income_data: List of dicts [{'date': '2024-01-01', 'income': 450}, ...]
         periods: Number of days to forecast (default 90)
+        n_paths: Number of Monte Carlo paths to draw (default 1000)
+        percentiles: Bands reported as (pessimistic, base, optimistic)
+        seed: Optional RNG seed (defaults to a time-based seed)
     
     Returns:
         dict with 3 scenarios: pessimistic, base, optimistic
     """
+    import pandas as pd  # deferred: keeps pandas out of the API's cold start
+
     df = pd.DataFrame(income_data)
     df.columns = ['ds', 'y']
     df['ds'] = pd.to_datetime(df['ds'])
     df = df.sort_values('ds')
     
-    print(f"📊 Generating forecast from {len(df)} days of income data...")
-    print(f"   📅 Date range: {df['ds'].min().date()} to {df['ds'].max().date()}")
-    
     # Calculate statistics FROM YOUR DATA
     mean_income = df['y'].mean()
     std_income = df['y'].std() if len(df) > 1 else mean_income * 0.2
     min_income = df['y'].min()
     max_income = df['y'].max()
     
-    print(f"   💰 Your income stats: mean=₹{mean_income:.0f}, std=₹{std_income:.0f}")
-    print(f"   📉 Range: ₹{min_income:.0f} - ₹{max_income:.0f}")
-    
     # Generate future dates
     last_date = df['ds'].iloc[-1]
     future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=periods)
     
     # Use time-based seed so results vary each time (but reproducible within same second)
-    seed = int(datetime.now().timestamp()) % 10000
-    np.random.seed(seed)
-    
-    # Generate base forecast with YOUR income patterns
-    # Add weekly patterns (weekends might differ)
-    base_values = []
-    for i in range(periods):
-        # Base: your mean income with natural variation
-        day_of_week = (future_dates[i].dayofweek)
-        
-        # Weekend adjustment (example: might earn more or less)
-        weekend_factor = 0.85 if day_of_week >= 5 else 1.0
-        
-        # Random daily variation based on YOUR actual variance
-        daily_value = np.random.normal(mean_income * weekend_factor, std_income * 0.5)
-        daily_value = max(daily_value, min_income * 0.5)  # Floor at half your min
-        daily_value = min(daily_value, max_income * 1.2)  # Cap at 120% your max
-        base_values.append(daily_value)
-    
-    base_values = np.array(base_values)
-    
-    # Pessimistic: 70% of base (bad days, fewer gigs)
-    pessimistic_values = base_values * 0.7
+    if seed is None:
+        seed = int(datetime.now().timestamp()) % 10000
+    rng = np.random.default_rng(seed)
     
-    # Optimistic: 130% of base (good days, more gigs, tips)
-    optimistic_values = base_values * 1.3
+    # Draw all paths at once, then read the scenarios off as percentile bands
+    paths = simulate_income_paths(
+        mean_income, std_income, min_income, max_income,
+        future_dates, n_paths=n_paths, rng=rng
+    )
+    pessimistic_values, base_values, optimistic_values = np.percentile(
+        paths, percentiles, axis=0
+    )
     
     scenarios = {
         'dates': future_dates.strftime('%Y-%m-%d').tolist(),
@@ -73,9 +95,16 @@ def generate_three_scenarios(income_data, periods=90):
         'optimistic': optimistic_values.tolist()
     }
     
-    print("✅ Three scenarios generated FROM YOUR DATA!")
-    print(f"   📉 Pessimistic avg: ₹{np.mean(scenarios['pessimistic']):.0f}/day")
-    print(f"   📊 Base avg: ₹{np.mean(scenarios['base']):.0f}/day")
-    print(f"   📈 Optimistic avg: ₹{np.mean(scenarios['optimistic']):.0f}/day")
+    if log.enabled(DEBUG):
+        log.debug(
+            "📊 Three scenarios generated",
+            history_days=len(df),
+            date_range=f"{df['ds'].iloc[0].date()}..{last_date.date()}",
+            mean=round(float(mean_income), 2),
+            std=round(float(std_income), 2),
+            pessimistic_avg=round(float(pessimistic_values.mean()), 2),
+            base_avg=round(float(base_values.mean()), 2),
+            optimistic_avg=round(float(optimistic_values.mean()), 2),
+        )
     
-    return scenarios
\ No newline at end of file
+    return scenarios
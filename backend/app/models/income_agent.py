@@ -1,6 +1,132 @@
 # agents/income_agent.py
 import numpy as np
 import datetime 
+from collections import deque
+
+from ..config import FORECAST_CACHE_SIZE
+from ..utils.cache import LRUCache
+from ..utils.log import get_logger
+from ..utils.metrics import timed
+from ..utils.state import VersionedState
+from ..utils.stats import fit_trend_batch
+from ..services.timeseries import INCOME
+
+
+log = get_logger(__name__)
+
+
+# Shared across agents: (user_id, data_version) -> longest forecast computed
+forecast_cache = LRUCache(max_size=FORECAST_CACHE_SIZE)
+
+# Recent values used for the level + trend fit
+TREND_WINDOW = 30
+
+# Messages kept on an agent's bus (agents live as long as their registry entry)
+MESSAGE_BUS_SIZE = 100
+
+
+def trend_forecast_batch(mean, slope, periods):
+    """
+    Build base/optimistic/pessimistic paths from fitted level and slope
+
+    Args:
+        mean / slope: arrays (users,) (or scalars)
+        periods: forecast horizon in days
+
+    Returns:
+        dict of arrays shaped (users, periods) (or (periods,) for scalars)
+    """
+    steps = np.arange(1, periods + 1, dtype=float)
+    base = np.maximum(0.0, np.asarray(mean, dtype=float)[..., None] + np.asarray(slope, dtype=float)[..., None] * steps)
+    return {
+        'base': base,
+        'optimistic': base * 1.2,
+        'pessimistic': base * 0.8
+    }
+
+
+def batch_trend_forecast(windows, periods):
+    """
+    Fit the trend model for many users in one vectorized pass
+
+    Args:
+        windows: array (users, TREND_WINDOW) of each user's recent income
+        periods: forecast horizon in days
+
+    Returns:
+        dict of (users, periods) arrays: base / optimistic / pessimistic
+    """
+    mean, slope = fit_trend_batch(windows)
+    return trend_forecast_batch(mean, slope, periods)
+
+
+@timed("predict_scenarios_batch")
+def predict_scenarios_batch(income_agents, days=14):
+    """
+    IncomeAgent.predict_scenarios for many users at once
+
+    Cached forecasts are reused; every other user with a full
+    TREND_WINDOW of income goes into one (users, TREND_WINDOW) matrix
+    that batch_trend_forecast fits and extends in a single pass. Short
+    histories take the per-user path (fallback or short-window fit).
+
+    Returns:
+        dict of (users, days) arrays: base / optimistic / pessimistic
+    """
+    income_agents = list(income_agents)
+    scenarios = {name: np.empty((len(income_agents), days)) for name in ('base', 'optimistic', 'pessimistic')}
+
+    rows, windows, history_means, keys = [], [], [], []
+    for i, agent in enumerate(income_agents):
+        agent._ensure_pattern()
+        cache_key = agent._forecast_cache_key()
+        if cache_key is not None:
+            cached = forecast_cache.get(cache_key)
+            if cached is not None and cached['days'] >= days:
+                for name, values in cached['scenarios'].items():
+                    scenarios[name][i] = values[:days]
+                continue
+
+        amounts = agent._income_amounts(days=365)
+        if len(amounts) < TREND_WINDOW:
+            single = agent.predict_scenarios(days)  # short history: per-user fit / fallback
+            for name, values in single.items():
+                scenarios[name][i] = values
+            continue
+
+        rows.append(i)
+        windows.append(amounts[-TREND_WINDOW:])
+        history_means.append(amounts.mean())
+        keys.append(cache_key)
+
+    if not rows:
+        return scenarios
+
+    batch = batch_trend_forecast(np.stack(windows), days)
+
+    # CONTEXT AWARE: widen the pessimistic path for variable earners
+    variable = np.array([income_agents[i].state.get('income_pattern') == 'variable' for i in rows])
+    batch['pessimistic'] = np.where(variable[:, None], batch['pessimistic'] * 0.8, batch['pessimistic'])
+
+    # PROACTIVE: lean period ahead when the base path dips under the history
+    avg_predicted = batch['base'].mean(axis=1)
+    lean = avg_predicted < np.asarray(history_means) * 0.85
+
+    analyzed_at = datetime.datetime.now()
+    for j, i in enumerate(rows):
+        agent = income_agents[i]
+        agent.state['last_analysis'] = analyzed_at
+        if lean[j]:
+            agent._warn_lean_period(avg_predicted[j], history_means[j])
+        if keys[j] is not None:
+            forecast_cache.put(keys[j], {
+                'days': days, 'scenarios': {name: values[j].tolist() for name, values in batch.items()}
+            })
+    for name, values in batch.items():
+        scenarios[name][rows] = values
+    return scenarios
+
+
 class IncomeAgent:
     """
     Agent 1: Income Predictor
@@ -10,30 +136,35 @@ class IncomeAgent:
     def __init__(self, user_id, db):
         self.user_id = user_id
         self.db = db
-        self.state = {
+        self.state = VersionedState({
             'last_analysis': None,
             'confidence_level': 0,
             'income_pattern': None  # 'fixed', 'variable', 'mixed'
-        }
-        self.message_bus = []  # To communicate with other agents
+        })
+        self.message_bus = deque(maxlen=MESSAGE_BUS_SIZE)  # To communicate with other agents
     
+    @timed("analyze_income_pattern")
     def analyze_income_pattern(self):
         """
         AUTONOMOUS: Automatically classifies income type
         """
-        transactions = self.db.get_transactions(self.user_id, days=60)
-        income_txns = [t for t in transactions if t['type'] == 'income']
-        
-        if not income_txns:
-            return None
+        # Running stats maintained by the DB on every write (O(1) here)
+        get_stats = getattr(self.db, 'get_income_stats', None)
+        stats = get_stats(self.user_id) if get_stats else None
         
-        amounts = [t['amount'] for t in income_txns]
-        std_dev = np.std(amounts)
-        mean = np.mean(amounts)
+        if stats is not None:
+            if not stats.recent.count:
+                return None
+            coefficient_of_variation = stats.coefficient_of_variation()
+        else:
+            amounts = self._income_amounts(days=60)
+            if not len(amounts):
+                return None
+            std_dev = np.std(amounts)
+            mean = np.mean(amounts)
+            coefficient_of_variation = std_dev / mean if mean > 0 else 0
         
         # DECISION MAKING: Classify pattern
-        coefficient_of_variation = std_dev / mean if mean > 0 else 0
-        
         if coefficient_of_variation < 0.1:
             pattern = 'fixed'
             confidence = 0.9
@@ -60,29 +191,64 @@ class IncomeAgent:
         
         return pattern
     
+    @timed("predict_scenarios")
     def predict_scenarios(self, days=14):
         """
         GOAL-ORIENTED: Generate predictions to help user plan
         """
-        print(f"🎯 Income Agent: Analyzing {days}-day outlook for user {self.user_id}")
+        log.debug("🎯 Income Agent: analyzing outlook", user_id=self.user_id, days=days)
+
+        self._ensure_pattern()
+
+        # MEMORY: Reuse a forecast already computed for this data version
+        cache_key = self._forecast_cache_key()
+        if cache_key is not None:
+            cached = forecast_cache.get(cache_key)
+            if cached is not None and cached['days'] >= days:
+                return {name: values[:days] for name, values in cached['scenarios'].items()}
+
+        scenarios = self._compute_scenarios(days)
+
+        if cache_key is not None:
+            # Shorter horizons are served later as a prefix of this one
+            forecast_cache.put(cache_key, {'days': days, 'scenarios': scenarios})
+            scenarios = {name: list(values) for name, values in scenarios.items()}
+
+        return scenarios
 
-        # Ensure income pattern is classified
+    def _ensure_pattern(self):
+        """
+        Classify the income pattern first if it isn't known yet
+        """
         if not self.state.get('income_pattern'):
             try:
                 self.analyze_income_pattern()
             except Exception:
                 pass
 
+    def _forecast_cache_key(self):
+        """
+        Cache key for this user's forecast, or None if the DB is unversioned
+        """
+        get_version = getattr(self.db, 'get_data_version', None)
+        if get_version is None:
+            return None
+        return (self.user_id, get_version(self.user_id))
+
+    def _compute_scenarios(self, days):
+        """
+        Fit and build the scenarios (uncached path of predict_scenarios)
+        """
         # Get historical data
-        income_data = self._get_income_history()
+        amounts = self._income_amounts(days=365)
 
         # If insufficient data, use a simple fallback prediction
-        if not income_data or len(income_data) < 3:
+        if len(amounts) < 3:
             return self._fallback_simple_prediction(days)
 
         # Use a lightweight statistical forecast (no external Prophet dependency)
         try:
-            scenarios = self._prophet_forecast(income_data, days)
+            scenarios = self._prophet_forecast(amounts, days)
             self.state['last_analysis'] = datetime.datetime.now()
 
             # CONTEXT AWARE: Adjust based on pattern
@@ -92,24 +258,30 @@ class IncomeAgent:
 
             # PROACTIVE: Warn if lean period ahead
             avg_predicted = np.mean(scenarios['base'])
-            avg_historical = np.mean([d['income'] for d in income_data])
+            avg_historical = np.mean(amounts)
 
             if avg_predicted < avg_historical * 0.85:
-                self._broadcast_message({
-                    'from': 'income_agent',
-                    'type': 'lean_period_warning',
-                    'data': {
-                        'severity': 'HIGH',
-                        'message': f"Lean period ahead: {avg_predicted:.0f} vs usual {avg_historical:.0f}",
-                        'recommendation': 'Prepare for lower income next 2 weeks'
-                    }
-                })
+                self._warn_lean_period(avg_predicted, avg_historical)
 
             return scenarios
         except Exception as e:
-            print(f"⚠️ Forecast failed: {e}, using fallback")
+            log.warning("⚠️ Forecast failed, using fallback", user_id=self.user_id, error=str(e))
             return self._fallback_simple_prediction(days)
     
+    def _warn_lean_period(self, avg_predicted, avg_historical):
+        """
+        PROACTIVE: Warn other agents that income is about to dip
+        """
+        self._broadcast_message({
+            'from': 'income_agent',
+            'type': 'lean_period_warning',
+            'data': {
+                'severity': 'HIGH',
+                'message': f"Lean period ahead: {avg_predicted:.0f} vs usual {avg_historical:.0f}",
+                'recommendation': 'Prepare for lower income next 2 weeks'
+            }
+        })
+
     def get_point_of_no_return(self, bills_upcoming):
         """
         INTELLIGENT: Calculate minimum income needed
@@ -148,7 +320,7 @@ class IncomeAgent:
         COMMUNICATION: Talk to other agents
         """
         self.message_bus.append(message)
-        print(f"📨 Income Agent → {message['type']}")
+        log.debug("📨 Income Agent message", user_id=self.user_id, type=message['type'])
     
     def _get_pattern_advice(self, pattern):
         """
@@ -161,73 +333,57 @@ class IncomeAgent:
         }
         return advice.get(pattern, 'Unknown pattern')
     
-    def _prophet_forecast(self, income_data, periods):
+    def _prophet_forecast(self, amounts, periods):
         # Lightweight statistical forecast (moving average + simple trend)
-        # income_data: list of {'date', 'income'}
-        amounts = [d['income'] for d in income_data]
-        if not amounts:
+        # amounts: date-ordered daily income values
+        if not len(amounts):
             raise ValueError('No income data for forecasting')
 
-        # Use recent window to compute base level and trend
-        window = amounts[-30:] if len(amounts) >= 30 else amounts
-        mean = float(np.mean(window))
-        x = np.arange(len(window))
-        if len(x) > 1:
-            slope = float(np.polyfit(x, window, 1)[0])
+        # Level and trend of the recent window: maintained by the DB on
+        # write when available, else closed-form least squares here
+        get_stats = getattr(self.db, 'get_income_stats', None)
+        stats = get_stats(self.user_id) if get_stats else None
+        if stats is not None and stats.trend.count:
+            scenarios = trend_forecast_batch(stats.trend.mean, stats.trend.slope, periods)
         else:
-            slope = 0.0
-
-        base = []
-        for i in range(1, periods + 1):
-            val = mean + slope * i
-            base.append(max(0.0, float(val)))
-
-        optimistic = [b * 1.2 for b in base]
-        pessimistic = [b * 0.8 for b in base]
-
-        return {
-            'base': base,
-            'optimistic': optimistic,
-            'pessimistic': pessimistic
-        }
+            # Same fit as the fleet-wide batch, as a batch of one
+            scenarios = {
+                name: values[0]
+                for name, values in batch_trend_forecast(amounts[-TREND_WINDOW:][None, :], periods).items()
+            }
+        return {name: values.tolist() for name, values in scenarios.items()}
 
-    def _get_income_history(self):
+    def _income_amounts(self, days=60):
         """
-        Retrieve and normalize income history from the DB for this user.
-        Returns list of dicts: {'date': 'YYYY-MM-DD', 'income': float}
+        Date-ordered income amounts from the last `days` days of history.
+        Uses the DB's array API when available, else normalizes dict rows.
         """
-        txns = self.db.get_transactions(self.user_id, days=365)
+        get_arrays = getattr(self.db, 'get_transaction_arrays', None)
+        if get_arrays is not None:
+            window = get_arrays(self.user_id, days=days)
+            is_income = window.types == INCOME
+            return window.amounts if is_income.all() else window.amounts[is_income]
+
+        txns = self.db.get_transactions(self.user_id, days=days)
         income_txns = [t for t in txns if t.get('type') == 'income']
-        if not income_txns:
-            return []
 
         # Normalize and sort by date
         normalized = []
         for t in income_txns:
-            d = t.get('date')
-            amt = t.get('amount', 0.0)
-            # Some stored rows may already be strings
             try:
                 # Keep string dates as-is (frontend stores 'YYYY-MM-DD')
-                normalized.append({'date': str(d), 'income': float(amt)})
+                normalized.append((str(t.get('date')), float(t.get('amount', 0.0))))
             except Exception:
                 continue
+        normalized.sort(key=lambda x: x[0])
 
-        # Sort by date ascending
-        try:
-            normalized.sort(key=lambda x: x['date'])
-        except Exception:
-            pass
-
-        return normalized
+        return np.array([amt for _, amt in normalized], dtype=float)
     
     def _fallback_simple_prediction(self, days):
         # Simple fallback: repeat recent average with +/- bands
-        transactions = self.db.get_transactions(self.user_id, days=60)
-        income_txns = [t for t in transactions if t['type'] == 'income']
-        amounts = [t['amount'] for t in income_txns]
+        amounts = self._income_amounts(days=60)
 
-        if not amounts:
+        if not len(amounts):
             # No data at all: return small default numbers
             base_val = 1000.0
         else:
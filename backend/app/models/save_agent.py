@@ -1,5 +1,14 @@
 # agents/savings_agent.py
 import datetime
+
+from ..utils.log import get_logger
+from ..utils.metrics import timed
+from ..utils.state import VersionedState
+
+
+log = get_logger(__name__)
+
+
 class SavingsAgent:
     """
     Agent 3: Auto-Save Guardian
@@ -12,12 +21,12 @@ class SavingsAgent:
         self.income_agent = income_agent
         self.crisis_agent = crisis_agent
         
-        self.state = {
+        self.state = VersionedState({
             'mode': 'normal',  # 'normal', 'crisis', 'paused'
             'fund_balance': 0,
             'reserved_for_bills': 0,
             'auto_save_enabled': False
-        }
+        })
         
         self.goal = 10000  # ₹10K emergency fund
     
@@ -25,7 +34,7 @@ class SavingsAgent:
         """
         REACTIVE: Respond to crisis from Agent 2
         """
-        print(f"🛡️ Savings Agent: CRISIS MODE ACTIVATED")
+        log.info("🛡️ Savings Agent: crisis mode activated", user_id=self.user_id)
         
         self.state['mode'] = 'crisis'
         
@@ -36,11 +45,12 @@ class SavingsAgent:
         # PROACTIVE: Lock emergency fund
         self.db.update_user_state(self.user_id, {
             'emergency_fund_locked': True,
-            'crisis_mode_since': datetime.now()
+            'crisis_mode_since': datetime.datetime.now()
         })
         
-        print(f"💰 Emergency fund (₹{self.state['fund_balance']:.0f}) is now protected")
+        log.info("💰 Emergency fund protected", user_id=self.user_id, fund_balance=self.state['fund_balance'])
     
+    @timed("suggest_daily_save")
     def suggest_daily_save(self):
         """
         INTELLIGENT: Calculate optimal save amount
@@ -50,7 +60,7 @@ class SavingsAgent:
         crisis_status = self.crisis_agent.state.get('active_crisis')
         
         if crisis_status:
-            print("⏸️ Savings Agent: Skipping save (crisis mode)")
+            log.debug("⏸️ Savings Agent: skipping save (crisis mode)", user_id=self.user_id)
             return None
         
         # Get financial state
@@ -59,7 +69,7 @@ class SavingsAgent:
         available = balance - reserved
         
         if available < 500:
-            print("⏸️ Savings Agent: Balance too low to save safely")
+            log.debug("⏸️ Savings Agent: balance too low to save safely", user_id=self.user_id)
             return None
         
         # INTELLIGENT CALCULATION
@@ -83,7 +93,7 @@ class SavingsAgent:
         """
         PROACTIVE: Automatically protect bill money
         """
-        print("🛡️ Savings Agent: Checking upcoming bills...")
+        log.debug("🛡️ Savings Agent: checking upcoming bills", user_id=self.user_id)
         
         # Get bills due in next 14 days
         upcoming_bills = self.db.get_upcoming_bills(self.user_id, days=14)
@@ -103,7 +113,7 @@ class SavingsAgent:
         balance = self.db.get_balance(self.user_id)
         available = balance - total_to_reserve
         
-        print(f"✅ Reserved ₹{total_to_reserve:.0f} for bills. Available: ₹{available:.0f}")
+        log.debug("✅ Reserved for bills", user_id=self.user_id, reserved=total_to_reserve, available=available)
         
         # PROACTIVE: Warn if low available balance
         if available < 2000:
@@ -134,7 +144,7 @@ class SavingsAgent:
         balance = self.db.get_balance(self.user_id)
         available = balance - self.state['reserved_for_bills']
         
-        impact = self.crisis_agent.simulate_decision('reduce_expense', {
+        impact = self.crisis_agent.simulate_decision('one_off_expense', {
             'amount': purchase_amount
         })
         
@@ -153,6 +163,15 @@ class SavingsAgent:
             ]
         }
     
+    def _calculate_bill_reserves(self):
+        """
+        Money that must stay untouched for bills due in the next 14 days
+        """
+        if self.state['reserved_for_bills']:
+            return self.state['reserved_for_bills']
+        upcoming_bills = self.db.get_upcoming_bills(self.user_id, days=14) or []
+        return sum(bill.get('amount', 0) for bill in upcoming_bills)
+    
     def get_fund_balance(self):
         """
         Simple getter for other agents
@@ -160,4 +179,4 @@ class SavingsAgent:
         return self.state['fund_balance']
     
     def _broadcast_warning(self, warning):
-        print(f"⚠️ Savings Agent Warning: {warning['type']}")
\ No newline at end of file
+        log.info("⚠️ Savings Agent warning", user_id=self.user_id, type=warning['type'])
\ No newline at end of file
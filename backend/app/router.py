@@ -0,0 +1,462 @@
+"""
+Sharded serving: N app.main worker processes behind one routing process
+
+Each worker owns the users that consistent hashing of user_id maps to it
+(state, agent systems and caches stay process-local), so CPU-heavy
+requests for different users run on different cores. The router forwards
+each request to the owning worker (user_id from the query string or the
+JSON body, "demo_user" otherwise), fans fleet-wide endpoints out to all
+workers, and on resize moves only the users whose owner changed.
+
+Run:  python -m app.router --workers 4 --port 8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from .config import (
+    ROUTER_ADMIN_TOKEN,
+    ROUTER_TIMEOUT,
+    SHARD_BASE_PORT,
+    SHARD_WORKERS,
+    SQLITE_PATH,
+)
+from .utils.hashring import HashRing
+from .utils.log import configure_logging, get_logger
+from .utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+
+
+log = get_logger(__name__)
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Not forwarded in either direction
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade", "host"}
+
+# Users moved per export/import call during a resize
+MOVE_BATCH = 200
+
+
+def shard_name(index):
+    return f"shard-{index}"
+
+
+class ShardRouter:
+    """
+    Owns the worker processes and the hash ring
+
+    Args:
+        workers: Number of worker processes to start
+        base_port: Worker i listens on base_port + i (127.0.0.1 only)
+    """
+
+    def __init__(self, workers=SHARD_WORKERS, base_port=SHARD_BASE_PORT):
+        self.target = max(1, workers)
+        self.base_port = base_port
+        self.workers = {}  # shard id -> {"url", "process"}
+        self.ring = HashRing()
+        self.client = None
+
+        # Cleared while users move between shards; requests wait on it
+        self._routing = asyncio.Event()
+        self._resize_lock = asyncio.Lock()
+        self._in_flight = 0
+        self._idle = asyncio.Condition()
+
+        self.requests_routed = 0
+        self.users_moved = 0
+
+    # ---------------------------------------------------------------
+    # Worker processes
+    # ---------------------------------------------------------------
+    async def start(self):
+        self.client = httpx.AsyncClient(timeout=ROUTER_TIMEOUT)
+        await self._spawn(range(self.target))
+        self.ring = HashRing(self.workers)
+        # Durable backends may hold users placed under an earlier worker count
+        moved = await self._move_users(self.ring)
+        self._routing.set()
+        log.info("🔀 Router ready", shards=len(self.workers), users_rebalanced=moved)
+
+    async def stop(self):
+        for shard in list(self.workers):
+            self._terminate(shard)
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def _spawn(self, indexes):
+        started = []
+        for i in indexes:
+            shard, port = shard_name(i), self.base_port + i
+            root, ext = os.path.splitext(SQLITE_PATH)
+            env = dict(os.environ, SHARD_ID=shard, SQLITE_PATH=f"{root}.{shard}{ext or '.db'}")
+            # Workers share the cores: split the compute process pools between them
+            env.setdefault("COMPUTE_WORKERS", str(max(1, (os.cpu_count() or 1) // self.target)))
+            process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app",
+                 "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=env,
+            )
+            self.workers[shard] = {"url": f"http://127.0.0.1:{port}", "process": process}
+            started.append(shard)
+        await asyncio.gather(*(self._wait_healthy(shard) for shard in started))
+
+    async def _wait_healthy(self, shard, timeout=60.0):
+        worker = self.workers[shard]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if worker["process"].poll() is not None:
+                raise RuntimeError(f"{shard} exited with code {worker['process'].returncode}")
+            try:
+                response = await self.client.get(worker["url"] + "/api/health")
+                if response.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"{shard} did not become healthy in {timeout:.0f}s")
+
+    def _terminate(self, shard):
+        worker = self.workers.pop(shard)
+        worker["process"].terminate()  # uvicorn runs shutdown (state persisted, DB flushed)
+        try:
+            worker["process"].wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker["process"].kill()
+
+    # ---------------------------------------------------------------
+    # Routing
+    # ---------------------------------------------------------------
+    def owner(self, user_id):
+        return self.workers[self.ring.node_for(user_id)]["url"]
+
+    async def _enter(self):
+        await self._routing.wait()
+        self._in_flight += 1
+
+    async def _leave(self):
+        async with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    async def forward(self, request: Request):
+        """Proxy one request to the owning worker, streaming the response"""
+        content_type = request.headers.get("content-type", "")
+        user_id = request.query_params.get("user_id")
+        if content_type.startswith("application/json"):
+            body = await request.body()
+            if user_id is None:
+                try:
+                    payload = json.loads(body or b"null")
+                    user_id = payload.get("user_id") if isinstance(payload, dict) else None
+                except ValueError:
+                    pass
+        else:
+            body = request.stream()  # e.g. CSV uploads: not buffered here
+
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in HOP_HEADERS]
+        if "x-request-id" not in request.headers:
+            headers.append(("x-request-id", uuid.uuid4().hex[:16]))  # same id in the worker's logs
+
+        await self._enter()
+        try:
+            upstream = self.client.build_request(
+                request.method,
+                self.owner(user_id or "demo_user") + request.url.path,
+                params=request.query_params,
+                headers=headers,
+                content=body,
+            )
+            response = await self.client.send(upstream, stream=True)
+        except httpx.TransportError as e:
+            await self._leave()
+            raise HTTPException(status_code=503, detail=f"Shard unavailable: {e}")
+        except BaseException:
+            await self._leave()
+            raise
+        self.requests_routed += 1
+
+        async def release():
+            await response.aclose()
+            await self._leave()
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS},
+            background=BackgroundTask(release),
+        )
+
+    async def fan_out(self, method, path, text=False, **kwargs):
+        """Same call on every worker; {shard: parsed JSON (or text) or {"error": ...}}"""
+        await self._enter()
+        try:
+            shards = list(self.workers)
+            responses = await asyncio.gather(
+                *(self.client.request(method, self.workers[s]["url"] + path, **kwargs) for s in shards),
+                return_exceptions=True,
+            )
+        finally:
+            await self._leave()
+        results = {}
+        for shard, response in zip(shards, responses):
+            if isinstance(response, Exception):
+                results[shard] = {"error": str(response)}
+            elif response.status_code != 200:
+                results[shard] = {"error": response.text}
+            else:
+                results[shard] = response.text if text else response.json()
+        return results
+
+    # ---------------------------------------------------------------
+    # Rebalancing
+    # ---------------------------------------------------------------
+    async def resize(self, workers):
+        """
+        Change the worker count and hand moved users to their new owners
+
+        Routing is paused (requests wait) from the moment in-flight
+        requests have drained until every moved user is imported.
+        The handoff is two-phase: users are exported (kept at the old
+        owner), imported by the new owner, and dropped at the old owner
+        only once every import succeeded; if one fails the old ring stays
+        and the imported copies are dropped instead.
+        """
+        workers = max(1, workers)
+        async with self._resize_lock:
+            if workers == len(self.workers):
+                return {"workers": workers, "users_moved": 0}
+            self.target = workers
+            if workers > len(self.workers):
+                await self._spawn(range(len(self.workers), workers))
+
+            self._routing.clear()
+            try:
+                async with self._idle:
+                    await self._idle.wait_for(lambda: self._in_flight == 0)
+
+                new_ring = HashRing([shard_name(i) for i in range(workers)], vnodes=self.ring.vnodes)
+                handed = await self._move_users(new_ring)
+                self.ring = new_ring
+                moved = await self._drop_moved(handed)
+                for shard in [s for s in self.workers if s not in new_ring.nodes]:
+                    self._terminate(shard)
+            finally:
+                self._routing.set()
+
+        self.users_moved += moved
+        log.info("🔀 Resized", shards=workers, users_moved=moved)
+        return {"workers": workers, "users_moved": moved}
+
+    async def _post(self, url, path, payload):
+        response = await self.client.post(url + path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def _move_users(self, new_ring):
+        """
+        Copy every user whose owner changes to the new owner
+
+        Returns:
+            list of (old owner url, user_ids) to drop once the ring is switched
+        """
+        exported = []  # (old owner url, user_ids): monitors paused there
+        handed = []    # (old owner url, new owner url, user_ids): imported
+        try:
+            for shard, worker in list(self.workers.items()):
+                response = await self.client.get(worker["url"] + "/internal/shard/users")
+                response.raise_for_status()
+                moves = {}
+                for user_id in response.json()["user_ids"]:
+                    owner = new_ring.node_for(user_id)
+                    if owner != shard:
+                        moves.setdefault(owner, []).append(user_id)
+
+                for owner, user_ids in moves.items():
+                    for lo in range(0, len(user_ids), MOVE_BATCH):
+                        batch = user_ids[lo:lo + MOVE_BATCH]
+                        exported.append((worker["url"], batch))
+                        users = (await self._post(worker["url"], "/internal/shard/export",
+                                                  {"user_ids": batch}))["users"]
+                        target = self.workers[owner]["url"]
+                        await self._post(target, "/internal/shard/import", {"users": users})
+                        handed.append((worker["url"], target, batch))
+        except Exception:
+            await self._abort_moves(exported, handed)
+            raise
+        return [(source, user_ids) for source, _, user_ids in handed]
+
+    async def _abort_moves(self, exported, handed):
+        """ROLLBACK: the old owners keep their users; drop the copies already imported"""
+        for _, target, user_ids in handed:
+            try:
+                await self._post(target, "/internal/shard/drop", {"user_ids": user_ids})
+            except Exception as e:
+                log.error("❌ Could not drop imported copies", shard_url=target, users=len(user_ids), error=str(e))
+        for source, user_ids in exported:
+            try:
+                await self._post(source, "/internal/shard/restore", {"user_ids": user_ids})
+            except Exception as e:
+                log.error("❌ Could not restore exported users", shard_url=source, users=len(user_ids), error=str(e))
+
+    async def _drop_moved(self, handed):
+        """Commit: forget moved users at their old owners; returns the number moved"""
+        moved = 0
+        for source, user_ids in handed:
+            try:
+                await self._post(source, "/internal/shard/drop", {"user_ids": user_ids})
+            except Exception as e:
+                # The new owner already serves them; the stale copies are only reported
+                log.warning("⚠️ Could not drop moved users", shard_url=source, users=len(user_ids), error=str(e))
+            moved += len(user_ids)
+        return moved
+
+    def stats(self):
+        return {
+            "workers": {shard: worker["url"] for shard, worker in self.workers.items()},
+            "vnodes": self.ring.vnodes,
+            "routing_paused": not self._routing.is_set(),
+            "in_flight": self._in_flight,
+            "requests_routed": self.requests_routed,
+            "users_moved": self.users_moved,
+        }
+
+
+app = FastAPI(title="FinMate AI shard router")
+router = ShardRouter()
+
+
+class ResizeRequest(BaseModel):
+    workers: int
+
+
+def _check_admin(request: Request):
+    if ROUTER_ADMIN_TOKEN and request.headers.get("x-router-token") != ROUTER_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid router token")
+
+
+@app.on_event("startup")
+async def start_workers():
+    await router.start()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await router.stop()
+
+
+@app.get("/router/shards")
+async def router_shards():
+    return router.stats()
+
+
+@app.post("/router/resize")
+async def router_resize(body: ResizeRequest, request: Request):
+    _check_admin(request)
+    try:
+        return await router.resize(body.workers)
+    except (httpx.HTTPError, RuntimeError) as e:
+        raise HTTPException(status_code=502, detail=f"Resize failed: {e}")
+
+
+@app.get("/api/health")
+async def health_check():
+    shards = await router.fan_out("GET", "/api/health")
+    healthy = all("error" not in health for health in shards.values())
+    return {"status": "healthy" if healthy else "degraded", "router": router.stats(), "shards": shards}
+
+
+def merge_metrics(shards):
+    """
+    One exposition from every shard's /api/metrics: samples gain a shard
+    label and stay grouped under a single HELP / TYPE per metric family
+    """
+    families = {}  # name -> {"meta": {"HELP"|"TYPE": line}, "samples": [...]}
+    for shard, text in shards.items():
+        family = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                _, kind, name = line.split(" ", 3)[:3]
+                family = families.setdefault(name, {"meta": {}, "samples": []})
+                family["meta"].setdefault(kind, line)  # first shard's HELP / TYPE
+            elif line and family is not None:
+                cut = min(i for i in (line.find("{"), line.find(" ")) if i >= 0)
+                name, rest = line[:cut], line[cut:]
+                if rest.startswith("{"):
+                    rest = f'{{shard="{shard}",' + rest[1:]
+                else:
+                    rest = f'{{shard="{shard}"}}' + rest
+                family["samples"].append(name + rest)
+    lines = []
+    for family in families.values():
+        lines.extend(family["meta"].values())
+        lines.extend(family["samples"])
+    return "\n".join(lines) + "\n"
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """All shards' metrics, labelled by shard, plus which shards answered"""
+    shards = await router.fan_out("GET", "/api/metrics", text=True)
+    up = [
+        "# HELP finmate_shard_up Shard answered the metrics scrape",
+        "# TYPE finmate_shard_up gauge",
+    ] + [f'finmate_shard_up{{shard="{s}"}} {int(isinstance(r, str))}' for s, r in shards.items()]
+    text = merge_metrics({s: r for s, r in shards.items() if isinstance(r, str)})
+    return PlainTextResponse(text + "\n".join(up) + "\n", media_type=METRICS_CONTENT_TYPE)
+
+
+@app.post("/api/agents/crisis-scan")
+async def agents_crisis_scan():
+    """Fleet-wide sweep: every shard scans its own users"""
+    shards = await router.fan_out("POST", "/api/agents/crisis-scan")
+    errors = {shard: r["error"] for shard, r in shards.items() if "error" in r}
+    if errors and len(errors) == len(shards):
+        return JSONResponse(status_code=502, content={"detail": errors})
+    results = {}
+    for r in shards.values():
+        results.update(r.get("results", {}))
+    return {
+        "users_scanned": sum(r.get("users_scanned", 0) for r in shards.values()),
+        "crises_detected": sum(r.get("crises_detected", 0) for r in shards.values()),
+        "results": results,
+        "shard_errors": errors,
+    }
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"])
+async def proxy(path: str, request: Request):
+    if path.startswith("internal/"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await router.forward(request)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run FinMate AI as user-sharded worker processes")
+    parser.add_argument("--workers", type=int, default=SHARD_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    configure_logging()
+    router.target = max(1, args.workers)
+    print(f"\n🚀 Starting FinMate AI with {router.target} shard workers...")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,18 @@
 """
 Action suggestion generation with impact calculation
 """
+import numpy as np
+
+from ..config import ACTION_MAX_COMBINED
+from ..models.crisis import SCENARIO_NAMES, simulate_balances
+
+
+INCOME_ACTION_TYPES = ('EARN', 'CUT')  # change a suggestion's scenarios
+
+# Defaults for how an action is spread over the horizon (days)
+EARN_SPREAD_DAYS = 7      # one-time boost spread over a week
+CUT_PERIOD_DAYS = 30      # CUT amounts are per month
+DELAY_DAYS = 30           # a delayed payment comes back after a month
 
 
 def generate_suggestions(crisis_info, current_income_avg=500):
@@ -22,6 +34,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
                 'id': 'optimize_1',
                 'title': 'Save ₹100 daily',
                 'impact': '+₹3,000/month',
+                'amount': 3000,
                 'description': 'Auto-lock ₹100 every evening',
                 'action_type': 'SAVE',
                 'butterfly_effect': 'Small daily saves = ₹36,000/year'
@@ -30,6 +43,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
                 'id': 'optimize_2',
                 'title': 'Take 1 extra shift/week',
                 'impact': '+₹1,600/month',
+                'amount': 1600,
                 'description': 'Work one Sunday shift per week',
                 'action_type': 'EARN',
                 'butterfly_effect': 'One shift = ₹19,200/year extra'
@@ -38,6 +52,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
                 'id': 'optimize_3',
                 'title': 'Cut ₹50 non-essentials',
                 'impact': '+₹1,500/month',
+                'amount': 1500,
                 'description': 'Skip one chai/snack per day',
                 'action_type': 'CUT',
                 'butterfly_effect': 'One chai less = ₹18,000/year saved'
@@ -56,6 +71,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
             'id': 'crisis_1',
             'title': 'Take 2 extra weekend shifts',
             'impact': f'+₹800 (covers {(800/deficit)*100:.0f}% of deficit)',
+            'amount': 800,
             'description': 'Work both Saturday & Sunday this week',
             'action_type': 'EARN',
             'butterfly_effect': f'₹800 shift = ₹{800 * 4:,}impact over 4 weeks',
@@ -65,6 +81,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
             'id': 'crisis_2',
             'title': f'Cut ₹{daily_gap:.0f} daily expenses',
             'impact': f'+₹{daily_gap * days:.0f} (closes gap)',
+            'amount': round(daily_gap * days),
             'description': 'Skip dining out, reduce non-essentials',
             'action_type': 'CUT',
             'butterfly_effect': f'Small cuts today = Crisis averted',
@@ -74,6 +91,7 @@ def generate_suggestions(crisis_info, current_income_avg=500):
             'id': 'crisis_3',
             'title': 'Delay ₹1,200 payment',
             'impact': '+₹1,200 breathing room',
+            'amount': 1200,
             'description': 'Negotiate payment extension with lender',
             'action_type': 'DELAY',
             'butterfly_effect': 'Buying time = Finding solutions',
@@ -84,10 +102,109 @@ def generate_suggestions(crisis_info, current_income_avg=500):
     return suggestions
 
 
+def _action_days(action, default):
+    """An action's spread / period / delay in days (at least one)"""
+    days = int(action.get('days', default))
+    if days < 1:
+        raise ValueError(f"{action['action_type']} action needs days >= 1, got {days}")
+    return days
+
+
+def action_income_deltas(actions, days):
+    """
+    Daily income change each structured action causes
+    
+    Args:
+        actions: list of {'action_type': EARN|CUT|SAVE|DELAY, 'amount': number,
+                 optional 'days': spread (EARN), period (CUT) or delay (DELAY)}
+        days: forecast horizon
+    
+    Returns:
+        array (actions, days)
+    """
+    deltas = np.zeros((len(actions), days))
+    
+    for i, action in enumerate(actions):
+        action_type = action['action_type']
+        amount = float(action.get('amount', 0))
+        
+        if action_type == 'EARN':
+            # One-time boost (spread over a week)
+            spread = _action_days(action, EARN_SPREAD_DAYS)
+            deltas[i, :min(spread, days)] = amount / spread
+        elif action_type == 'CUT':
+            # Daily savings (reduces expenses, effectively adds income)
+            deltas[i] = amount / _action_days(action, CUT_PERIOD_DAYS)
+        elif action_type == 'DELAY':
+            # Payment pushed out: money stays today, leaves when it is due
+            deltas[i, 0] = amount
+            due = _action_days(action, DELAY_DAYS)
+            if due < days:
+                deltas[i, due] -= amount
+        elif action_type == 'SAVE':
+            # Auto-save doesn't change income, but improves balance
+            pass
+        else:
+            raise ValueError(f"Unknown action type: {action_type}")
+    
+    return deltas
+
+
+def action_subsets(n_actions):
+    """
+    Every subset of n actions as a boolean mask (2**n, n), row i = bits of i
+    """
+    rows = np.arange(2 ** n_actions)[:, None]
+    return (rows >> np.arange(n_actions)) & 1 == 1
+
+
+def apply_actions(scenarios, actions, current_balance=0, daily_costs=0):
+    """
+    MATRIX: Apply every subset of the actions to all scenarios in one pass
+    
+    Args:
+        scenarios: array (scenarios, days) of daily income, or the
+                   {'pessimistic', 'base', 'optimistic'} dict of lists
+        actions: list of structured actions (see action_income_deltas)
+        current_balance: starting balance
+        daily_costs: expenses + bill share per day
+    
+    Returns:
+        dict with:
+          - 'subsets': bool array (2**A, A), which actions each row applies
+          - 'scenarios': array (2**A, scenarios, days) of updated income
+          - 'balances': array (2**A, scenarios, days) of balance trajectories
+        Row 0 is "no action", the last row is "all actions".
+    """
+    if len(actions) > ACTION_MAX_COMBINED:
+        raise ValueError(
+            f"Too many actions to combine ({len(actions)} > {ACTION_MAX_COMBINED})"
+        )
+    
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios[name] for name in SCENARIO_NAMES]
+    income = np.nan_to_num(np.asarray(scenarios, dtype=float))
+    
+    subsets = action_subsets(len(actions))
+    deltas = action_income_deltas(actions, income.shape[-1])
+    
+    # (subsets, actions) @ (actions, days) -> (subsets, 1, days) + (scenarios, days)
+    updated = income + (subsets @ deltas)[:, None, :]
+    
+    return {
+        'subsets': subsets,
+        'scenarios': updated,
+        'balances': simulate_balances(updated, current_balance, daily_costs)
+    }
+
+
 def calculate_action_impact(action, scenarios, current_balance=0):
     """
     Calculate how an action changes the three scenarios
     
+    Runs through apply_actions; only EARN and CUT suggestions change the
+    income (SAVE and DELAY leave the scenarios as they are).
+    
     Args:
         action: dict with action details
         scenarios: Current 3 scenarios
@@ -96,38 +213,22 @@ def calculate_action_impact(action, scenarios, current_balance=0):
     Returns:
         Updated scenarios with action applied
     """
+    amount = action.get('amount')
+    if amount is None:
+        # Parse action impact (e.g., "+₹800" -> 800)
+        impact_str = action.get('impact', '+₹0')
+        amount = int(''.join(filter(str.isdigit, impact_str.split()[0])))
     
-    # Parse action impact (e.g., "+₹800" -> 800)
-    impact_str = action.get('impact', '+₹0')
-    impact_value = int(''.join(filter(str.isdigit, impact_str.split()[0])))
-    
-    # Apply impact to all scenarios
-    updated_scenarios = {}
+    names = [name for name in scenarios if name != 'dates']
+    structured = {'action_type': action['action_type'], 'amount': amount}
+    if action['action_type'] not in INCOME_ACTION_TYPES:
+        # A suggestion's income only moves for EARN / CUT (DELAY buys time, it
+        # isn't income here); unknown actions change nothing either
+        structured = {'action_type': 'SAVE', 'amount': 0}
     
-    for scenario_name, values in scenarios.items():
-        if scenario_name == 'dates':
-            updated_scenarios['dates'] = values
-            continue
-        
-        # Add action impact to each day's income
-        if action['action_type'] == 'EARN':
-            # One-time boost (spread over a week)
-            updated_values = values.copy()
-            boost_per_day = impact_value / 7
-            for i in range(min(7, len(updated_values))):
-                updated_values[i] += boost_per_day
-            updated_scenarios[scenario_name] = updated_values
-        
-        elif action['action_type'] == 'CUT':
-            # Daily savings (reduces expenses, effectively adds income)
-            daily_savings = impact_value / 30
-            updated_scenarios[scenario_name] = [v + daily_savings for v in values]
-        
-        elif action['action_type'] == 'SAVE':
-            # Auto-save doesn't change income, but improves balance
-            updated_scenarios[scenario_name] = values  # Same income
-        
-        else:
-            updated_scenarios[scenario_name] = values
+    result = apply_actions([scenarios[name] for name in names], [structured], current_balance)
     
-    return updated_scenarios
\ No newline at end of file
+    updated_scenarios = {name: result['scenarios'][-1, i].tolist() for i, name in enumerate(names)}
+    if 'dates' in scenarios:
+        updated_scenarios['dates'] = scenarios['dates']
+    return updated_scenarios
@@ -0,0 +1,84 @@
+"""
+Demo income history for users without data
+
+The CSV is parsed once (at startup) into read-only arrays plus the
+derived summary / running stats. Every user seeded from it references
+the same arrays; TransactionSeries copies them on the user's first write,
+so seeding costs the same for any number of users and the history is
+stored once.
+"""
+import csv
+import threading
+from typing import Any, Dict, NamedTuple
+
+import numpy as np
+
+from ..config import DEMO_DATA_PATH
+from ..utils.stats import IncomeStats
+from .summary import summarize_income
+from .timeseries import INCOME, TransactionSeries, to_ordinals
+
+
+class DemoDataset(NamedTuple):
+    """Immutable demo history: read-only columns and what is derived from them"""
+    dates: np.ndarray    # int32 day ordinals
+    amounts: np.ndarray  # float64
+    types: np.ndarray    # int8, all INCOME
+    summary: Dict[str, Any]
+    stats: IncomeStats   # template; users get copies (stats are updated on append)
+
+    def series(self) -> TransactionSeries:
+        """A new series over the shared columns (copy-on-write)"""
+        return TransactionSeries(self.dates, self.amounts, self.types)
+
+    def profile(self) -> Dict[str, Any]:
+        # Same defaults as a CSV upload: a starting buffer of 5 average days
+        return {
+            "balance": float(self.amounts.mean() * 5) if len(self.amounts) else 0.0,
+            "bills": [],
+            "avg_expenses": 500,
+        }
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+def load_demo_dataset(path: str = DEMO_DATA_PATH) -> DemoDataset:
+    """Parse a date,income CSV into a DemoDataset"""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    dates = to_ordinals([row["date"] for row in rows])
+    amounts = np.array([float(row["income"]) for row in rows], dtype=np.float64)
+    order = np.argsort(dates, kind="stable")
+    dates, amounts = dates[order], amounts[order]
+
+    # Same normalisation as TransactionSeries.merge (one row per date, last wins)
+    last = np.ones(len(dates), dtype=bool)
+    last[:-1] = dates[:-1] != dates[1:]
+    dates, amounts = dates[last], amounts[last]
+
+    history = {"date": dates.astype("timedelta64[D]") + np.datetime64("1970-01-01", "D"), "income": amounts}
+    return DemoDataset(
+        dates=_readonly(dates),
+        amounts=_readonly(amounts),
+        types=_readonly(np.full(len(dates), INCOME, dtype=np.int8)),
+        summary=summarize_income(history),
+        stats=IncomeStats.from_history(dates, amounts),
+    )
+
+
+_dataset = None
+_lock = threading.Lock()
+
+
+def demo_dataset() -> DemoDataset:
+    """The process-wide demo dataset, loaded on first use"""
+    global _dataset
+    if _dataset is None:
+        with _lock:
+            if _dataset is None:
+                _dataset = load_demo_dataset()
+    return _dataset
@@ -0,0 +1,222 @@
+"""
+Bounded executor for CPU-bound request work
+
+Pure functions (arguments and result picklable, no agent / DB state) run
+in a process pool so they use other cores; agent methods, which read and
+mutate per-user state, run in a thread pool: off the event loop, but
+still one core's worth under the GIL. Both share one bound on queued +
+running jobs: past it, run() fails fast with ExecutorBusy instead of
+letting requests pile up. Queue wait and execution time are recorded
+per stage.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..config import (
+    AGENT_THREADS,
+    COMPUTE_EXECUTOR,
+    COMPUTE_QUEUE_SIZE,
+    COMPUTE_TIMEOUT,
+    COMPUTE_WORKERS,
+)
+from ..utils.log import configure_logging, request_id_var
+from ..utils.metrics import histogram
+
+
+COMPUTE_SECONDS = histogram(
+    "finmate_compute_seconds", "Compute executor time per stage", ["stage", "phase"]
+)
+
+
+class ExecutorBusy(RuntimeError):
+    """Too many jobs queued; retry later"""
+
+
+class ExecutorTimeout(TimeoutError):
+    """A job did not finish within its timeout"""
+
+
+def _timed(fn, args, kwargs, request_id=None):
+    # Runs in the worker: wall-clock timestamps are comparable across processes
+    token = request_id_var.set(request_id)  # logs in the job keep the request's id
+    try:
+        started = time.time()
+        result = fn(*args, **kwargs)
+        return started, time.time(), result
+    finally:
+        request_id_var.reset(token)
+
+
+def _noop():
+    return None
+
+
+class Timings:
+    """Count / total / max plus a window of recent samples for percentiles"""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+
+        def pct(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2) if ordered else None
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class ComputeExecutor:
+    """
+    Args:
+        mode: "process" or "thread" (where pure=True jobs run)
+        workers: Process pool size
+        threads: Thread pool size (agent work, and pure jobs in thread mode)
+        max_queue: Max jobs queued or running at once
+        timeout: Default seconds to wait for a job
+    """
+
+    def __init__(self, mode=COMPUTE_EXECUTOR, workers=COMPUTE_WORKERS, threads=AGENT_THREADS,
+                 max_queue=COMPUTE_QUEUE_SIZE, timeout=COMPUTE_TIMEOUT):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._threads = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="compute")
+        self._processes = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stages = {}  # stage -> {"queue_wait", "exec", "errors", "timeouts", "rejected"}
+
+    def _process_pool(self):
+        if self._processes is None:
+            # spawn: forking a process that runs threads (DB flusher, pools) is unsafe
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_logging,
+            )
+        return self._processes
+
+    def warm_up(self):
+        """Start the worker processes now instead of on the first request"""
+        if self.mode == "process":
+            pool = self._process_pool()
+            for _ in range(self.workers):
+                pool.submit(_noop)
+
+    def _stage(self, stage):
+        metrics = self.stages.get(stage)
+        if metrics is None:
+            metrics = self.stages[stage] = {
+                "queue_wait": Timings(), "exec": Timings(), "errors": 0, "timeouts": 0, "rejected": 0,
+            }
+        return metrics
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, stage, fn, *args, pure=False, timeout=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) off the event loop
+
+        Args:
+            stage: Metrics label
+            pure: True if fn can run in another process
+            timeout: Seconds to wait (default: executor timeout)
+
+        Raises:
+            ExecutorBusy: max_queue jobs already queued or running
+            ExecutorTimeout: no result within the timeout (a job that
+                already started keeps its slot until it finishes)
+        """
+        metrics = self._stage(stage)
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                metrics["rejected"] += 1
+                raise ExecutorBusy(f"Compute queue full ({self.max_queue} jobs)")
+            self._in_flight += 1
+
+        pool = self._process_pool() if pure and self.mode == "process" else self._threads
+        submitted = time.time()
+        try:
+            future = pool.submit(_timed, fn, args, kwargs, request_id_var.get())
+        except BrokenProcessPool:
+            self._processes = None  # a worker died; start a fresh pool next time
+            self._release(None)
+            raise
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            started, finished, result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            raise ExecutorTimeout(f"{stage} did not finish in {timeout:g}s")
+        except BrokenProcessPool:
+            self._processes = None
+            metrics["errors"] += 1
+            raise
+        except Exception:
+            metrics["errors"] += 1
+            raise
+
+        queue_wait, run_time = max(0.0, started - submitted), finished - started
+        metrics["queue_wait"].add(queue_wait)
+        metrics["exec"].add(run_time)
+        COMPUTE_SECONDS.labels(stage, "queue_wait").observe(queue_wait)
+        COMPUTE_SECONDS.labels(stage, "exec").observe(run_time)
+        return result
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "max_queue": self.max_queue,
+            "stages": {
+                stage: {
+                    "queue_wait": m["queue_wait"].summary(),
+                    "exec": m["exec"].summary(),
+                    "errors": m["errors"],
+                    "timeouts": m["timeouts"],
+                    "rejected": m["rejected"],
+                }
+                for stage, m in self.stages.items()
+            },
+        }
+
+    def shutdown(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=True, cancel_futures=True)
+            self._processes = None
+
+
+compute = ComputeExecutor()
@@ -0,0 +1,94 @@
+"""
+In-process fake of the firebase_admin.db (Realtime Database) API
+
+Supports what services.firebase uses: reference(path) with get / set /
+update (including multi-path "a/b/c" keys) / push / delete / child.
+Values are round-tripped through JSON like the real client, and every
+call is counted so tests can check how chatty a code path is.
+"""
+import json
+import threading
+import uuid
+from collections import Counter
+
+
+def _split(path):
+    return [part for part in (path or "").split("/") if part]
+
+
+class FakeRealtimeDatabase:
+    def __init__(self, data=None):
+        self.data = data if data is not None else {}
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def reference(self, path="/"):
+        return FakeReference(self, _split(path))
+
+    # Low-level tree access (all paths are lists of keys)
+    def _get(self, parts):
+        node = self.data
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return json.loads(json.dumps(node))
+
+    def _set(self, parts, value):
+        if value is not None:
+            value = json.loads(json.dumps(value))
+        if not parts:
+            self.data = value if isinstance(value, dict) else {}
+            return
+        node = self.data
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+
+class FakeReference:
+    def __init__(self, database, parts):
+        self._db = database
+        self._parts = parts
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return "/" + "/".join(self._parts)
+
+    def child(self, path):
+        return FakeReference(self._db, self._parts + _split(path))
+
+    def get(self):
+        with self._db._lock:
+            self._db.calls["get"] += 1
+            return self._db._get(self._parts)
+
+    def set(self, value):
+        with self._db._lock:
+            self._db.calls["set"] += 1
+            self._db._set(self._parts, value)
+
+    def update(self, value):
+        with self._db._lock:
+            self._db.calls["update"] += 1
+            for key, item in value.items():
+                self._db._set(self._parts + _split(key), item)
+
+    def push(self, value=""):
+        with self._db._lock:
+            self._db.calls["push"] += 1
+            key = uuid.uuid4().hex
+            self._db._set(self._parts + [key], value)
+        return self.child(key)
+
+    def delete(self):
+        with self._db._lock:
+            self._db.calls["delete"] += 1
+            self._db._set(self._parts, None)
@@ -1,13 +1,385 @@
 """
-Firebase helper functions
+Firebase helper functions and the Firebase-backed DB
+
+DB keeps the InMemoryDB data model as a per-user read-through cache: a
+user's document is fetched from the Realtime Database once, on first
+access. Writes update the cache immediately and are written behind:
+changed parts (profile / state / transactions) and new crisis alerts are
+coalesced per path and sent as one multi-path update at most every
+FIREBASE_FLUSH_INTERVAL seconds (sooner once FIREBASE_MAX_BATCH paths
+are pending). close() flushes whatever is left.
+
+Transactions are stored in chunks of CHUNK_ROWS rows, so appending to a
+long history rewrites only the chunks the new rows fall into; a rebuilt
+history (out-of-order upload, import) replaces the whole node. Values
+are serialized outside the lock from snapshots taken under it.
+
+Layout: users/{user_id}/{profile, state, crisis_alerts}
+        users/{user_id}/transactions/{rows, chunks/{i}/{dates, amounts, types}}
 """
-import firebase_admin
-from firebase_admin import credentials, db
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+import numpy as np
+
+from ..config import (
+    FIREBASE_CREDENTIALS,
+    FIREBASE_DATABASE_URL,
+    FIREBASE_FLUSH_INTERVAL,
+    FIREBASE_MAX_BATCH,
+)
+from ..utils.log import get_logger
+from ..utils.serialize import to_jsonable
+from .memory_db import INTERNAL_KEYS, InMemoryDB
+from .timeseries import INCOME, TransactionSeries
+
+
+log = get_logger(__name__)
 
-def save_user_data(user_id, data):
+# Transaction rows per stored chunk (an append rewrites only its chunks)
+CHUNK_ROWS = 1000
+
+
+def get_database():
+    """
+    firebase_admin.db, initializing the default app on first use
+    """
+    import firebase_admin
+    from firebase_admin import credentials, db
+
+    try:
+        firebase_admin.get_app()
+    except ValueError:
+        firebase_admin.initialize_app(
+            credentials.Certificate(FIREBASE_CREDENTIALS),
+            {"databaseURL": FIREBASE_DATABASE_URL},
+        )
+    return db
+
+
+def save_user_data(user_id, data, database=None):
     """Save data to Firebase"""
-    pass
+    (database or get_database()).reference(f"users/{user_id}").update(to_jsonable(data))
+
 
-def get_user_data(user_id):
+def get_user_data(user_id, database=None):
     """Retrieve data from Firebase"""
-    pass
+    return (database or get_database()).reference(f"users/{user_id}").get()
+
+
+class DB(InMemoryDB):
+    """
+    Firebase Realtime Database backend with the InMemoryDB interface
+
+    Args:
+        database: object with reference(path) (firebase_admin.db or a
+                  FakeRealtimeDatabase); defaults to firebase_admin.db
+        flush_interval: max seconds a write waits before it is sent
+        max_batch: pending paths that trigger an early flush
+    """
+
+    def __init__(self, database=None, flush_interval=FIREBASE_FLUSH_INTERVAL, max_batch=FIREBASE_MAX_BATCH):
+        super().__init__({})
+        self._database = database
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._lock = threading.RLock()
+        self._dirty = {}    # user_id -> parts to serialize at flush time
+        self._dirty_rows = {}  # user_id -> first transaction row to write (0: whole history)
+        self._pending = {}  # path -> value (crisis alerts, failed flushes)
+        self._loading = {}  # user_id -> Future of a first load in progress
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        self.reads = 0
+        self.flushes = 0
+        self.paths_written = 0
+        self.writes_coalesced = 0
+        self.errors = 0
+
+    def _db(self):
+        if self._database is None:
+            self._database = get_database()
+        return self._database
+
+    def connect(self):
+        """
+        Connect now instead of on first use, so a missing firebase_admin or
+        bad credentials fail at startup (raises whatever the SDK raises)
+        """
+        self._db()
+        return self
+
+    # ---------------------------------------------------------------
+    # Read-through
+    # ---------------------------------------------------------------
+    def _ensure_user(self, user_id):
+        """
+        The cached user, loaded on first access
+
+        The fetch runs outside the DB lock, so a slow load only delays
+        callers for that user (they share its Future), not everyone else.
+        """
+        user = self.store.get(user_id)
+        if user is not None:
+            return user
+        if self._lock._is_owned():
+            # Called with the lock held (writes load the user before locking,
+            # so only if it was dropped meanwhile): waiting for another
+            # loader, which needs the lock to publish, would deadlock
+            return self._publish(user_id, self._load_user(user_id))
+        with self._lock:
+            user = self.store.get(user_id)
+            if user is not None:
+                return user
+            loading = self._loading.get(user_id)
+            owner = loading is None
+            if owner:
+                loading = self._loading[user_id] = Future()
+        if not owner:
+            return loading.result()
+
+        try:
+            user = self._load_user(user_id)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[user_id]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            user = self._publish(user_id, user)
+            del self._loading[user_id]
+        loading.set_result(user)
+        return user
+
+    def _load_user(self, user_id):
+        """MEMORY: One round trip per user, then served from the cache"""
+        document = self._db().reference(f"users/{user_id}").get() or {}
+        self.reads += 1
+
+        user = dict(document.get("profile") or {})
+        if document.get("state"):
+            user["state"] = document["state"]
+
+        columns = _read_columns(document.get("transactions") or {})
+        if columns is not None:
+            user["transactions"] = TransactionSeries(*columns)
+            # Derived stats on a private store: nothing to write back, no lock needed
+            InMemoryDB({user_id: user})._after_write(user_id)
+        return user
+
+    def _publish(self, user_id, user):
+        """Under the lock: cache a loaded user unless a write (import) got there first"""
+        return self.store.setdefault(user_id, user)
+
+    def user_ids(self):
+        """Cached users only (listing the whole remote tree would be too costly)."""
+        return list(self.store)
+
+    # ---------------------------------------------------------------
+    # Write-behind
+    # ---------------------------------------------------------------
+    def _mark_dirty(self, user_id, part):
+        parts = self._dirty.setdefault(user_id, set())
+        if part in parts:
+            self.writes_coalesced += 1
+        parts.add(part)
+        self._schedule_flush()
+
+    def _mark_rows(self, user_id, start):
+        previous = self._dirty_rows.get(user_id)
+        if previous is not None:
+            self.writes_coalesced += 1
+            start = min(start, previous)
+        self._dirty_rows[user_id] = start
+        self._schedule_flush()
+
+    def _pending_paths(self):
+        return len(self._pending) + len(self._dirty_rows) + sum(len(p) for p in self._dirty.values())
+
+    def _schedule_flush(self):
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._flush_loop, name="firebase-flush", daemon=True)
+            self._thread.start()
+        if self._pending_paths() >= self.max_batch:
+            self._wake.set()
+
+    def _after_write(self, user_id, appended_from=None):
+        with self._lock:
+            super()._after_write(user_id, appended_from)
+            self._mark_rows(user_id, appended_from or 0)
+
+    def merge_transactions(self, user_id, dates, amounts, type_code=INCOME):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            return super().merge_transactions(user_id, dates, amounts, type_code)
+
+    def set_transactions(self, user_id, transactions):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            super().set_transactions(user_id, transactions)
+
+    def update_profile(self, user_id, updates, overwrite=True):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            super().update_profile(user_id, updates, overwrite)
+            self._mark_dirty(user_id, "profile")
+
+    def update_user_state(self, user_id, updates):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            super().update_user_state(user_id, updates)
+            self._mark_dirty(user_id, "state")
+
+    def save_crisis_alert(self, user_id, crisis_info):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            super().save_crisis_alert(user_id, crisis_info)
+            key = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+            self._pending[f"users/{user_id}/crisis_alerts/{key}"] = to_jsonable(crisis_info)
+            self._schedule_flush()
+
+    def seed_user(self, user_id, dataset):
+        self._ensure_user(user_id)  # first load outside the lock
+        with self._lock:
+            super().seed_user(user_id, dataset)
+            self._mark_dirty(user_id, "profile")
+            self._mark_rows(user_id, 0)
+
+    def import_user(self, user_id, snapshot):
+        # Crisis alerts are already stored remotely; only the cached parts are rewritten
+        with self._lock:
+            super().import_user(user_id, snapshot)
+            self._mark_dirty(user_id, "profile")
+            self._mark_dirty(user_id, "state")
+
+    def drop_user(self, user_id):
+        # Pending writes must land before the cache entry goes away
+        self.flush()
+        with self._lock:
+            super().drop_user(user_id)
+
+    def _snapshot(self, user_id, part):
+        """Under the lock: shallow copies / row views that later writes don't change"""
+        user = self.store.get(user_id, {})
+        if part == "profile":
+            return {k: v for k, v in user.items() if k not in INTERNAL_KEYS}
+        if part == "state":
+            return dict(user.get("state", {}))
+        # Rows handed out are never modified in place (see TransactionSeries)
+        series = user.get("transactions") or TransactionSeries()
+        return series.dates, series.amounts, series.types
+
+    def flush(self):
+        """
+        Send all pending writes as one multi-path update
+
+        Returns:
+            number of paths written
+        """
+        with self._lock:
+            pending = dict(self._pending)
+            parts = [(user_id, part) for user_id, names in self._dirty.items() for part in names]
+            rows = dict(self._dirty_rows)
+            snapshots = [self._snapshot(user_id, part) for user_id, part in parts]
+            columns = [self._snapshot(user_id, "transactions") for user_id in rows]
+            self._pending.clear()
+            self._dirty.clear()
+            self._dirty_rows.clear()
+
+        # Serialize outside the lock: writers only wait for the snapshots above
+        payload = dict(pending)
+        for (user_id, part), value in zip(parts, snapshots):
+            payload[f"users/{user_id}/{part}"] = to_jsonable(value)
+        for (user_id, start), (dates, amounts, types) in zip(rows.items(), columns):
+            payload.update(_transaction_paths(user_id, start, dates, amounts, types))
+
+        if not payload:
+            return 0
+        try:
+            self._db().reference("/").update(payload)
+        except Exception:
+            # Retry on the next flush, re-serialized then so newer values win
+            with self._lock:
+                self.errors += 1
+                for path, value in pending.items():
+                    self._pending.setdefault(path, value)
+                for user_id, part in parts:
+                    self._dirty.setdefault(user_id, set()).add(part)
+                for user_id, start in rows.items():
+                    self._dirty_rows[user_id] = min(start, self._dirty_rows.get(user_id, start))
+            raise
+        self.flushes += 1
+        self.paths_written += len(payload)
+        return len(payload)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.warning("⚠️ Firebase flush failed (will retry)", error=str(e))
+
+    def close(self):
+        """Stop the background flusher and write everything still pending"""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_users": len(self.store),
+                "pending_paths": self._pending_paths(),
+                "reads": self.reads,
+                "flushes": self.flushes,
+                "paths_written": self.paths_written,
+                "writes_coalesced": self.writes_coalesced,
+                "errors": self.errors,
+            }
+
+
+def _transaction_paths(user_id, start, dates, amounts, types):
+    """
+    Paths rewriting rows [start:] of a user's transactions: the chunks
+    they fall into, or the whole node (dropping stale chunks) from row 0
+    """
+    base = f"users/{user_id}/transactions"
+    first = start // CHUNK_ROWS
+    chunks = {
+        str(i): {
+            "dates": dates[lo:lo + CHUNK_ROWS].tolist(),
+            "amounts": amounts[lo:lo + CHUNK_ROWS].tolist(),
+            "types": types[lo:lo + CHUNK_ROWS].tolist(),
+        }
+        for i, lo in enumerate(range(first * CHUNK_ROWS, len(dates), CHUNK_ROWS), first)
+    }
+    if first == 0:
+        return {base: {"rows": len(dates), "chunks": chunks}}
+    paths = {f"{base}/chunks/{i}": chunk for i, chunk in chunks.items()}
+    paths[f"{base}/rows"] = len(dates)
+    return paths
+
+
+def _read_columns(node):
+    """(dates, amounts, types) from a stored transactions node, None if empty"""
+    if "chunks" not in node:
+        # Single-node layout written before chunking
+        return (node["dates"], node["amounts"], node["types"]) if node.get("dates") else None
+    chunks = node["chunks"]
+    # The Realtime Database returns objects with integer keys as arrays
+    if isinstance(chunks, dict):
+        chunks = [chunks[key] for key in sorted(chunks, key=int)]
+    chunks = [chunk for chunk in chunks if chunk]
+    if not chunks:
+        return None
+    return tuple(np.concatenate([chunk[name] for chunk in chunks])
+                 for name in ("dates", "amounts", "types"))
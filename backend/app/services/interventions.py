@@ -0,0 +1,284 @@
+"""
+Intervention planning: pick the set of actions that closes a deficit in time
+
+Each candidate is a dict with:
+    - 'group': options in the same group are mutually exclusive
+      (e.g. "take 1/2/3 extra shifts"); defaults to a group of its own
+    - 'impact': money it frees up or brings in
+    - 'feasibility': probability (0-1] that the user can actually do it
+    - 'cost': side cost (fund depletion, late fees), only used to break ties
+    - 'days': days until the money lands; must be <= days_to_crisis
+plus any display fields (type, action, timeframe, ...) passed through.
+
+The plan with the highest combined feasibility (product of the chosen
+feasibilities) that still covers the deficit is a covering knapsack:
+minimise sum(-log feasibility) subject to sum(impact) >= deficit. It is
+solved by dynamic programming over the deficit discretised into
+`resolution` units (impacts rounded down, so a covering plan really
+covers), vectorised across users for batch runs. To bound the work the
+DP only looks at each user's DP_MAX_CANDIDATES most promising candidates;
+users it can't reach within its latency budget get a greedy plan instead.
+"""
+import time
+
+import numpy as np
+
+from ..config import INTERVENTION_BUDGET_MS, INTERVENTION_RESOLUTION
+
+
+# Weight of 'cost' (as a fraction of the deficit) next to -log(feasibility)
+COST_WEIGHT = 0.01
+
+# Max DP cells (users x options x units) evaluated per numpy step
+DP_CHUNK_CELLS = 2_000_000
+
+# Users solved per DP pass (bounds the backtracking table)
+DP_BATCH_USERS = 256
+
+# Candidates per user the DP considers (the greedy fallback sees all)
+DP_MAX_CANDIDATES = 64
+
+
+def optimize_interventions(candidates, deficit, days_to_crisis, budget_ms=INTERVENTION_BUDGET_MS):
+    """
+    Most feasible set of candidates covering `deficit` before `days_to_crisis`
+
+    Returns:
+        dict: selected (candidate dicts), total_impact, combined_feasibility,
+        covers_deficit, method ('dp', 'greedy' or 'none')
+    """
+    return optimize_interventions_batch([candidates], [deficit], [days_to_crisis], budget_ms)[0]
+
+
+def greedy_interventions(candidates, deficit, days_to_crisis):
+    """
+    FALLBACK: Best impact per unit of -log(feasibility) until covered
+    """
+    flat = _flatten([candidates], [deficit], [days_to_crisis], INTERVENTION_RESOLUTION)
+    return _plan(candidates, _greedy(flat, [0])[0], deficit, 'greedy')
+
+
+def optimize_interventions_batch(pools, deficits, days_to_crisis,
+                                 budget_ms=INTERVENTION_BUDGET_MS,
+                                 resolution=INTERVENTION_RESOLUTION):
+    """
+    BATCH: One plan per user, the DP vectorised across users
+
+    Args:
+        pools: list of candidate lists (one per user)
+        deficits: deficit per user
+        days_to_crisis: crisis horizon per user
+        budget_ms: latency budget for the DP; users not solved when it
+                   runs out get the greedy plan
+        resolution: DP units per deficit
+
+    Returns:
+        list of plans (see optimize_interventions)
+    """
+    start = time.perf_counter()
+    deficits = np.asarray(deficits, dtype=float)
+    flat = _flatten(pools, deficits, days_to_crisis, resolution)
+    active = np.flatnonzero(deficits > 0)
+
+    deadline = start + budget_ms / 1000.0
+
+    solved = {}
+    for lo in range(0, len(active), DP_BATCH_USERS):
+        chunk = _dp(flat, active[lo:lo + DP_BATCH_USERS], resolution, deadline)
+        if chunk is None:
+            break  # LATENCY BUDGET: out of time, the rest go greedy
+        solved.update(chunk)
+
+    # Out of time, or the pool can't cover the deficit -> cover as much as possible
+    greedy = _greedy(flat, [u for u in active.tolist() if u not in solved])
+
+    plans = []
+    for u, pool in enumerate(pools):
+        if u in solved:
+            plans.append(_plan(pool, solved[u], deficits[u], 'dp'))
+        elif u in greedy:
+            plans.append(_plan(pool, greedy[u], deficits[u], 'greedy'))
+        else:
+            plans.append(_plan(pool, [], max(deficits[u], 0.0), 'none'))
+    return plans
+
+
+def _flatten(pools, deficits, days_to_crisis, resolution):
+    """
+    All usable candidates of all users as flat arrays
+    """
+    sizes = [len(pool) for pool in pools]
+    total = sum(sizes)
+    user = np.repeat(np.arange(len(pools)), sizes)
+    index = np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    def column(field):
+        return np.fromiter((c.get(field, 0) for pool in pools for c in pool), dtype=float, count=total)
+
+    impact, cost, days = column('impact'), column('cost'), column('days')
+    feasibility = np.minimum(column('feasibility'), 1.0)
+
+    group = []
+    for pool in pools:
+        group_ids = {}
+        group.extend(group_ids.setdefault(c.get('group', i), len(group_ids)) for i, c in enumerate(pool))
+
+    deficit = np.asarray(deficits, dtype=float)[user]
+    horizon = np.asarray(days_to_crisis, dtype=float)[user]
+
+    usable = (feasibility > 0) & (impact > 0) & (days <= horizon) & (deficit > 0)
+    keep = np.flatnonzero(usable)
+    user, deficit, impact = user[keep], deficit[keep], impact[keep]
+
+    weight = -np.log(feasibility[keep]) + COST_WEIGHT * cost[keep] / deficit
+    units = np.minimum(np.floor(impact * resolution / deficit), resolution).astype(np.int64)
+
+    return {
+        'n_users': len(pools),
+        'user': user,
+        'group': np.asarray(group, dtype=np.int64)[keep],
+        'index': index[keep].astype(np.int64),
+        'impact': impact,
+        'weight': weight,
+        'units': units,
+        'deficit': deficit,
+        'shortlist': _shortlist(user, impact / (weight + 1e-9), weight)
+    }
+
+
+def _shortlist(user, ratio, weight):
+    """
+    BOUNDED SEARCH: Per user, the candidates with the best impact per
+    weight plus the most feasible ones (DP_MAX_CANDIDATES in total)
+    """
+    half = DP_MAX_CANDIDATES // 2
+    keep = np.zeros(len(user), dtype=bool)
+    for key in (-ratio, weight):
+        order = np.lexsort((key, user))
+        starts = np.flatnonzero(np.r_[True, user[order][1:] != user[order][:-1]]) if len(user) else order
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        keep[order[rank < half]] = True
+    return keep
+
+
+def _dp(flat, users, resolution, deadline):
+    """
+    Covering-knapsack DP for `users`; {user: [candidate index]} for the
+    users whose deficit can be covered, None if the deadline passes
+    """
+    rows_of = np.full(flat['n_users'], -1)
+    rows_of[users] = np.arange(len(users))
+
+    # Options that can't move the DP (zero units) only add weight
+    take = flat['shortlist'] & (flat['units'] > 0) & (rows_of[flat['user']] >= 0)
+    row = rows_of[flat['user'][take]]
+    group, units = flat['group'][take], flat['units'][take]
+    weight, index = flat['weight'][take], flat['index'][take]
+    n_rows = len(users)
+    if not len(row):
+        return {}
+
+    # Pad to (rows, groups, options): compact group ids and option slots
+    order = np.lexsort((group, row))
+    row, group, units, weight, index = row[order], group[order], units[order], weight[order], index[order]
+    new_group = np.ones(len(row), dtype=bool)
+    new_group[1:] = (row[1:] != row[:-1]) | (group[1:] != group[:-1])
+    group_run = np.cumsum(new_group) - 1
+    first_run_of_row = np.full(n_rows, 0)
+    row_starts = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+    first_run_of_row[row[row_starts]] = group_run[row_starts]
+    g_slot = group_run - first_run_of_row[row]
+    run_starts = np.flatnonzero(new_group)
+    o_slot = np.arange(len(row)) - run_starts[group_run]
+
+    n_groups, n_options = int(g_slot.max()) + 1, int(o_slot.max()) + 1
+    pad_units = np.zeros((n_rows, n_groups, n_options), dtype=np.int64)
+    pad_weight = np.full((n_rows, n_groups, n_options), np.inf)
+    pad_index = np.full((n_rows, n_groups, n_options), -1, dtype=np.int64)
+    pad_units[row, g_slot, o_slot] = units
+    pad_weight[row, g_slot, o_slot] = weight
+    pad_index[row, g_slot, o_slot] = index
+
+    # dp[r, c] = min weight reaching coverage >= c units; pull from max(c - units, 0)
+    coverage = np.arange(resolution + 1)
+    rows = np.arange(n_rows)[:, None, None]
+    dp = np.full((n_rows, resolution + 1), np.inf)
+    dp[:, 0] = 0.0
+    choice = np.full((n_groups, n_rows, resolution + 1), -1,
+                     dtype=np.int16 if n_options < 2 ** 15 else np.int32)
+    step = max(1, DP_CHUNK_CELLS // (n_rows * (resolution + 1)))
+
+    for g in range(n_groups):
+        if time.perf_counter() > deadline:
+            return None
+        best = dp.copy()
+        for lo in range(0, n_options, step):
+            hi = min(lo + step, n_options)
+            prev = np.maximum(coverage - pad_units[:, g, lo:hi, None], 0)
+            candidate = dp[rows, prev] + pad_weight[:, g, lo:hi, None]
+            option = candidate.argmin(axis=1)
+            value = np.take_along_axis(candidate, option[:, None, :], axis=1)[:, 0]
+            better = value < best
+            best[better] = value[better]
+            choice[g][better] = option[better] + lo
+        dp = best
+
+    # Backtrack from full coverage, all rows at once
+    covered = np.isfinite(dp[:, -1])
+    c = np.full(n_rows, resolution)
+    picks = []
+    flat_rows = np.arange(n_rows)
+    for g in range(n_groups - 1, -1, -1):
+        option = choice[g, flat_rows, c]
+        chosen = covered & (option >= 0)
+        safe = np.maximum(option, 0)
+        picks.append(np.where(chosen, pad_index[flat_rows, g, safe], -1))
+        c = np.where(chosen, np.maximum(c - pad_units[flat_rows, g, safe], 0), c)
+
+    picks = np.stack(picks[::-1], axis=1)
+    return {
+        int(users[r]): [int(i) for i in picks[r] if i >= 0]
+        for r in np.flatnonzero(covered)
+    }
+
+
+def _greedy(flat, users):
+    """
+    Greedy plans for `users`: best option per group, then highest impact
+    per weight until the deficit is covered; {user: [candidate index]}
+    """
+    wanted = np.isin(flat['user'], np.asarray(users, dtype=np.int64))
+    user, group, index = flat['user'][wanted], flat['group'][wanted], flat['index'][wanted]
+    impact, weight, deficit = flat['impact'][wanted], flat['weight'][wanted], flat['deficit'][wanted]
+    ratio = impact / (weight + 1e-9)
+
+    # Best-ratio option of each (user, group)
+    order = np.lexsort((-ratio, group, user))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (user[order][1:] != user[order][:-1]) | (group[order][1:] != group[order][:-1])
+    best = order[first]
+
+    # Highest ratio first, take while the user is still short
+    order = best[np.lexsort((weight[best], -ratio[best], user[best]))]
+    u, amount = user[order], impact[order]
+    total = np.cumsum(amount)
+    starts = np.flatnonzero(np.r_[True, u[1:] != u[:-1]]) if len(u) else np.array([], dtype=np.int64)
+    before = total - amount - np.repeat(total[starts] - amount[starts], np.diff(np.r_[starts, len(u)]))
+    chosen = order[before < deficit[order]]
+
+    selections = {int(x): [] for x in users}
+    for x, i in zip(user[chosen].tolist(), index[chosen].tolist()):
+        selections[x].append(i)
+    return selections
+
+
+def _plan(pool, selected, deficit, method):
+    chosen = [pool[i] for i in selected]
+    total = float(sum(c['impact'] for c in chosen))
+    return {
+        'selected': chosen,
+        'total_impact': total,
+        'combined_feasibility': float(np.prod([c['feasibility'] for c in chosen])) if chosen else 0.0,
+        'covers_deficit': total >= float(deficit),
+        'method': method
+    }
@@ -0,0 +1,129 @@
+"""
+Shared async LLM client (Groq) with a pooled HTTP client and a concurrency cap
+"""
+import asyncio
+import os
+import time
+from collections import deque
+
+from ..config import (
+    LLM_BASE_URL,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_MODEL,
+    LLM_TIMEOUT,
+)
+from ..utils.metrics import STAGE_SECONDS, histogram, timed
+
+
+_client = None
+_semaphore = None
+
+# Recent streaming timings: {'ttft_ms', 'total_ms', 'chunks'}
+stream_timings = deque(maxlen=1000)
+
+FIRST_TOKEN_SECONDS = histogram(
+    "finmate_llm_first_token_seconds", "Time to the first streamed LLM token"
+)
+STREAM_SECONDS = STAGE_SECONDS.labels("llm_stream")
+
+
+def get_async_client():
+    """Return the process-wide AsyncGroq client, creating it on first use"""
+    global _client
+    if _client is None:
+        import httpx
+        from groq import AsyncGroq
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            ),
+            timeout=LLM_TIMEOUT,
+        )
+        _client = AsyncGroq(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=LLM_BASE_URL,
+            http_client=http_client,
+        )
+    return _client
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+@timed("llm_complete")
+async def complete(messages, max_tokens=250, temperature=0.7):
+    """
+    Run one chat completion without blocking the event loop
+
+    At most LLM_MAX_CONCURRENCY calls are in flight; the rest wait their turn.
+
+    Returns:
+        The assistant message text
+    """
+    async with _get_semaphore():
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+    return response.choices[0].message.content
+
+
+async def stream(messages, max_tokens=250, temperature=0.7, timing=None):
+    """
+    Stream a chat completion, yielding text deltas as the model produces them
+
+    Time-to-first-token and total latency are appended to `stream_timings`
+    and, if given, written into the caller's `timing` dict.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    chunks = 0
+
+    async with _get_semaphore():
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunks += 1
+            yield delta
+
+    finished = time.perf_counter()
+    result = {
+        'ttft_ms': (first_token_at - started) * 1000 if first_token_at else None,
+        'total_ms': (finished - started) * 1000,
+        'chunks': chunks
+    }
+    stream_timings.append(result)
+    STREAM_SECONDS.observe(finished - started)
+    if first_token_at is not None:
+        FIRST_TOKEN_SECONDS.observe(first_token_at - started)
+    if timing is not None:
+        timing.update(result)
+
+
+async def aclose():
+    """Close the pooled HTTP client (call on app shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
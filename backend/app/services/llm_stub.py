@@ -0,0 +1,76 @@
+"""
+Local stub of the Groq/OpenAI chat completions API for testing
+
+Supports both regular and streaming (`"stream": true`, SSE) completions.
+
+Run:  uvicorn app.services.llm_stub:app --port 9000
+Then: LLM_BASE_URL=http://127.0.0.1:9000 uvicorn app.main:app
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+# Simulated model latency in seconds (before the first token / per token)
+STUB_DELAY = float(os.getenv("LLM_STUB_DELAY", 0.5))
+STUB_TOKEN_DELAY = float(os.getenv("LLM_STUB_TOKEN_DELAY", 0.02))
+
+app = FastAPI(title="FinMate LLM stub")
+
+
+def _stub_reply(messages):
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return f"[stub] You said: {last}"
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+async def _stream_reply(completion_id, model, content):
+    await asyncio.sleep(STUB_DELAY)
+    yield f"data: {json.dumps(_chunk(completion_id, model, {'role': 'assistant', 'content': ''}))}\n\n"
+    for token in content.split(" "):
+        yield f"data: {json.dumps(_chunk(completion_id, model, {'content': token + ' '}))}\n\n"
+        await asyncio.sleep(STUB_TOKEN_DELAY)
+    yield f"data: {json.dumps(_chunk(completion_id, model, {}, 'stop'))}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    model = body.get("model", "stub")
+    content = _stub_reply(body.get("messages", []))
+
+    if body.get("stream"):
+        return StreamingResponse(
+            _stream_reply(completion_id, model, content),
+            media_type="text/event-stream",
+        )
+
+    await asyncio.sleep(STUB_DELAY)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
@@ -0,0 +1,173 @@
+"""
+In-memory DB wrapper (default backend; data is lost on restart)
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..utils.cache import next_data_version
+from ..utils.serialize import to_jsonable
+from ..utils.stats import IncomeStats
+from .summary import summarize_appended, summarize_income
+from .timeseries import INCOME, TransactionSeries
+
+
+# Cache-only keys of a user record (everything else is profile)
+INTERNAL_KEYS = {"transactions", "data_version", "income_summary", "income_stats", "state", "crisis_alerts"}
+
+
+class InMemoryDB:
+    """
+    Simple in-memory "DB" wrapper that matches what agents expect
+    """
+
+    def __init__(self, store: Dict[str, Dict[str, Any]]):
+        self.store = store
+
+    def _ensure_user(self, user_id: str) -> Dict[str, Any]:
+        return self.store.setdefault(user_id, {})
+
+    def _series(self, user_id: str) -> TransactionSeries:
+        user = self._ensure_user(user_id)
+        # stored as columnar arrays of (date ordinal, amount, type code)
+        return user.setdefault("transactions", TransactionSeries())
+
+    def get_transactions(self, user_id: str, days: int = 60):
+        # Compatibility layer: list of {date, amount, type} for the window
+        return self.get_transaction_arrays(user_id, days=days).to_records()
+
+    def get_transaction_arrays(self, user_id: str, days: Optional[int] = 60):
+        """Zero-copy (dates, amounts, types) views over the last `days` days."""
+        return self._series(user_id).window(days=days)
+
+    def set_transactions(self, user_id: str, transactions: list):
+        user = self._ensure_user(user_id)
+        user["transactions"] = TransactionSeries.from_records(transactions)
+        self._after_write(user_id)
+
+    def merge_transactions(self, user_id: str, dates, amounts, type_code: int = INCOME) -> int:
+        """Merge rows into the history (date-ordered, deduplicated by date)."""
+        series = self._series(user_id)
+        size_before = len(series)
+        appended = series.merge(dates, amounts, type_code)
+        self._after_write(user_id, appended_from=size_before if appended else None)
+        return len(series)
+
+    def seed_user(self, user_id: str, dataset):
+        """Give a user the demo history (services.demo): shared columns, O(1) per user."""
+        user = self._ensure_user(user_id)
+        user.update(dataset.profile())
+        user["transactions"] = dataset.series()
+        user["data_version"] = next_data_version()
+        user["income_summary"] = dataset.summary
+        user["income_stats"] = dataset.stats.copy()
+
+    def _after_write(self, user_id: str, appended_from: Optional[int] = None):
+        # New version for caches + summary statistics refreshed once per write
+        user = self._ensure_user(user_id)
+        user["data_version"] = next_data_version()
+
+        # Running income stats and summary: O(appended rows), rebuilt otherwise
+        stats = user.get("income_stats")
+        summary = user.get("income_summary")
+        series = self._series(user_id)
+        if stats is not None and summary is not None and appended_from is not None:
+            new_types = series.types[appended_from:]
+            is_income = new_types == INCOME
+            stats.append(series.dates[appended_from:][is_income], series.amounts[appended_from:][is_income])
+            user["income_summary"] = summarize_appended(summary, series, appended_from)
+        else:
+            window = self.get_transaction_arrays(user_id, days=None)
+            is_income = window.types == INCOME
+            user["income_stats"] = IncomeStats.from_history(window.dates[is_income], window.amounts[is_income])
+            user["income_summary"] = summarize_income(self.get_income_history(user_id))
+
+    def get_income_stats(self, user_id: str) -> Optional[IncomeStats]:
+        """Running income statistics (whole history + rolling 60 days)."""
+        return self._ensure_user(user_id).get("income_stats")
+
+    def get_income_summary(self, user_id: str) -> Dict[str, Any]:
+        """Income summary maintained at write time (see services.summary)."""
+        return self._ensure_user(user_id).get("income_summary", {})
+
+    def get_income_history(self, user_id: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """Income history as columns: {"date": datetime64[D] array, "income": float array}."""
+        window = self.get_transaction_arrays(user_id, days=days)
+        is_income = window.types == INCOME
+        if not is_income.all():
+            window = window._replace(dates=window.dates[is_income], amounts=window.amounts[is_income])
+        return {
+            "date": window.dates.astype("timedelta64[D]") + np.datetime64("1970-01-01", "D"),
+            "income": window.amounts,
+        }
+
+    def get_data_version(self, user_id: str) -> int:
+        """Version that changes on every write to the user's transactions."""
+        user = self._ensure_user(user_id)
+        return user.setdefault("data_version", next_data_version())
+
+    def user_ids(self):
+        return list(self.store)
+
+    def get_profile(self, user_id: str) -> Dict[str, Any]:
+        """Per-user fields (balance, bills, avg_expenses, ...); treat as read-only."""
+        return self._ensure_user(user_id)
+
+    def update_profile(self, user_id: str, updates: dict, overwrite: bool = True):
+        """Set profile fields; with overwrite=False only missing fields are set."""
+        user = self._ensure_user(user_id)
+        for key, value in updates.items():
+            if overwrite or key not in user:
+                user[key] = value
+
+    def get_balance(self, user_id: str) -> float:
+        user = self._ensure_user(user_id)
+        return float(user.get("balance", 0.0))
+
+    def get_upcoming_bills(self, user_id: str, days: int = 14):
+        user = self._ensure_user(user_id)
+        # list of {name, amount, due_date}
+        return user.get("bills", [])
+
+    def get_avg_daily_expenses(self, user_id: str) -> float:
+        user = self._ensure_user(user_id)
+        return float(user.get("avg_expenses", 0.0))
+
+    def update_user_state(self, user_id: str, updates: dict):
+        user = self._ensure_user(user_id)
+        state = user.setdefault("state", {})
+        state.update(updates)
+
+    def get_user_state(self, user_id: str) -> dict:
+        user = self._ensure_user(user_id)
+        return user.get("state", {})
+
+    def save_crisis_alert(self, user_id: str, crisis_info: dict):
+        user = self._ensure_user(user_id)
+        alerts = user.setdefault("crisis_alerts", [])
+        alerts.append(crisis_info)
+
+    def export_user(self, user_id: str) -> Dict[str, Any]:
+        """JSON-ready snapshot of one user (to move users between shards)."""
+        user = self._ensure_user(user_id)
+        series = self._series(user_id)
+        return to_jsonable({
+            "profile": {k: v for k, v in user.items() if k not in INTERNAL_KEYS},
+            "state": user.get("state", {}),
+            "transactions": {"dates": series.dates, "amounts": series.amounts, "types": series.types},
+            "crisis_alerts": user.get("crisis_alerts", []),
+        })
+
+    def import_user(self, user_id: str, snapshot: Dict[str, Any]):
+        """Replace a user with a snapshot from export_user()."""
+        user = self.store[user_id] = dict(snapshot.get("profile") or {})
+        user["state"] = snapshot.get("state") or {}
+        user["crisis_alerts"] = list(snapshot.get("crisis_alerts") or [])
+        columns = snapshot.get("transactions") or {}
+        user["transactions"] = TransactionSeries(
+            columns.get("dates"), columns.get("amounts"), columns.get("types")
+        )
+        self._after_write(user_id)
+
+    def drop_user(self, user_id: str):
+        self.store.pop(user_id, None)
@@ -0,0 +1,244 @@
+"""
+Bounded, evicting registry of per-user AgentSystem instances
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from ..config import AGENT_REGISTRY_IDLE_TTL, AGENT_REGISTRY_MAX_SIZE
+from ..utils.log import get_logger
+
+
+log = get_logger(__name__)
+
+
+class AgentRegistry:
+    """
+    user_id -> AgentSystem with LRU + idle-TTL eviction
+
+    Args:
+        max_size: Maximum number of live agent systems
+        idle_ttl: Seconds without access before a system is evicted (None = never)
+        on_evict: Optional hook(user_id, system) called after eviction,
+                  e.g. to persist agent state
+
+    A system whose `lock` is held is in use: LRU and idle eviction skip it
+    until it is released (the registry may run over max_size meanwhile),
+    so it is never rebuilt while the old instance is still working.
+    """
+
+    def __init__(self, max_size=1000, idle_ttl=None, on_evict=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+        self._clock = clock
+        self._entries = OrderedDict()  # user_id -> (system or Future while building, last_access)
+        self._evicting = {}  # user_id -> Event set once its on_evict hook has run
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.lru_evictions = 0
+        self.idle_evictions = 0
+
+    # The lock only guards the dict: factory() and on_evict (DB reads /
+    # writes) run outside it, so one slow user never blocks the others.
+
+    def get(self, user_id, default=None):
+        with self._lock:
+            evicted = self._evict_idle()
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._touch(user_id, entry[0])
+        self._run_hooks(evicted)
+        if entry is None:
+            return default
+        try:
+            return self._resolve(entry[0])
+        except Exception:
+            return default  # its build failed
+
+    def get_built(self, user_id):
+        """
+        The user's system if it is built, else None (missing or still
+        being built); never blocks, so the event loop can call it
+        """
+        with self._lock:
+            evicted = self._evict_idle()
+            entry = self._entries.get(user_id)
+            ready = entry is not None and not isinstance(entry[0], Future)
+            if ready:
+                self.hits += 1
+                self._touch(user_id, entry[0])
+        self._run_hooks(evicted)
+        return entry[0] if ready else None
+
+    def get_or_create(self, user_id, factory):
+        """
+        Return (system, created); `factory()` builds a missing system
+
+        Concurrent callers for the same user wait for the one build.
+        """
+        with self._lock:
+            evicted = self._evict_idle()
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self.hits += 1
+                self._touch(user_id, entry[0])
+            else:
+                self.misses += 1
+                pending = Future()
+                self._touch(user_id, pending)
+            evicting = self._evicting.get(user_id)
+        self._run_hooks(evicted)
+
+        if entry is not None:
+            return self._resolve(entry[0]), False
+
+        try:
+            if evicting is not None:
+                evicting.wait()  # build from the state the old system persisted
+            system = factory()
+        except BaseException as e:
+            with self._lock:
+                if self._entries.get(user_id, (None,))[0] is pending:
+                    del self._entries[user_id]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            if self._entries.get(user_id, (None,))[0] is pending:
+                self._touch(user_id, system)
+            evicted = self._evict_lru()
+        pending.set_result(system)
+        self._run_hooks(evicted)
+        return system, True
+
+    def put(self, user_id, system):
+        with self._lock:
+            self._touch(user_id, system)
+            evicted = self._evict_lru()
+        self._run_hooks(evicted)
+
+    def evict(self, user_id):
+        """Remove one user's system (runs the on_evict hook)"""
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+            evicted = self._mark_evicting(user_id, entry[0]) if entry is not None else []
+        self._run_hooks(evicted)
+        return entry is not None
+
+    def clear(self):
+        with self._lock:
+            user_ids = list(self._entries)
+        for user_id in user_ids:
+            self.evict(user_id)
+
+    def _touch(self, user_id, system):
+        self._entries[user_id] = (system, self._clock())
+        self._entries.move_to_end(user_id)
+
+    @staticmethod
+    def _resolve(system):
+        return system.result() if isinstance(system, Future) else system
+
+    def _mark_evicting(self, user_id, system):
+        """Hook work for a removed entry (none for a system still being built)"""
+        if isinstance(system, Future):
+            return []
+        done = self._evicting[user_id] = threading.Event()
+        return [(user_id, system, done)]
+
+    @staticmethod
+    def _in_use(system):
+        """True while some thread holds the system's lock (Futures: never)"""
+        lock = getattr(system, 'lock', None)
+        if lock is None:
+            return False
+        if getattr(lock, '_is_owned', lambda: False)():
+            return True  # held by this thread (non-blocking acquire would succeed)
+        if not lock.acquire(blocking=False):
+            return True
+        lock.release()
+        return False
+
+    def _evict_lru(self):
+        evicted = []
+        excess = len(self._entries) - self.max_size
+        if excess <= 0:
+            return evicted
+        # Least recently used first, skipping systems in use
+        for user_id, (system, _) in list(self._entries.items()):
+            if excess <= 0:
+                break
+            if self._in_use(system):
+                continue
+            del self._entries[user_id]
+            excess -= 1
+            self.lru_evictions += 1
+            evicted += self._mark_evicting(user_id, system)
+        return evicted
+
+    def _evict_idle(self):
+        evicted = []
+        if self.idle_ttl is None:
+            return evicted
+        cutoff = self._clock() - self.idle_ttl
+        # Entries are in access order, so idle ones are all at the front
+        for user_id, (system, last_access) in list(self._entries.items()):
+            if last_access > cutoff:
+                break
+            if self._in_use(system):
+                continue
+            del self._entries[user_id]
+            self.idle_evictions += 1
+            evicted += self._mark_evicting(user_id, system)
+        return evicted
+
+    def _run_hooks(self, evicted):
+        """Run on_evict for removed systems, outside the lock"""
+        for user_id, system, done in evicted:
+            try:
+                if self.on_evict is not None:
+                    self.on_evict(user_id, system)
+            except Exception as e:
+                log.exception("⚠️ Agent registry on_evict failed", user_id=user_id, error=str(e))
+            finally:
+                with self._lock:
+                    if self._evicting.get(user_id) is done:
+                        del self._evicting[user_id]
+                done.set()
+
+    # dict-style access kept for existing callers (e.g. the Flask app)
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
+
+    def __getitem__(self, user_id):
+        system = self.get(user_id)
+        if system is None:
+            raise KeyError(user_id)
+        return system
+
+    def __setitem__(self, user_id, system):
+        self.put(user_id, system)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'idle_ttl': self.idle_ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'lru_evictions': self.lru_evictions,
+            'idle_evictions': self.idle_evictions
+        }
+
+
+# Shared by the FastAPI endpoints and the chat agent
+agent_registry = AgentRegistry(
+    max_size=AGENT_REGISTRY_MAX_SIZE,
+    idle_ttl=AGENT_REGISTRY_IDLE_TTL,
+)
@@ -0,0 +1,199 @@
+"""
+Adaptive background crisis monitor
+
+Keeps a priority queue of users keyed by their next check time, so each
+wake-up only touches users that are actually due.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+from ..config import (
+    MONITOR_BATCH_SIZE,
+    MONITOR_CONCURRENCY,
+    MONITOR_CRISIS_INTERVAL,
+    MONITOR_JITTER,
+    MONITOR_NORMAL_INTERVAL,
+    MONITOR_STARTUP_SPREAD,
+)
+from ..utils.log import get_logger
+
+
+log = get_logger(__name__)
+
+
+class CrisisMonitorScheduler:
+    """
+    Runs CrisisAgent.monitor_continuously for due users in bounded batches
+
+    Args:
+        get_agent_system: callable(user_id) -> AgentSystem
+        batch_size: Max users taken off the queue per wake-up
+        concurrency: Max checks running at once (each runs in a worker thread)
+        jitter: Random extra delay, as a fraction of the interval, so users
+                scheduled together do not all come due together
+        max_sleep: Upper bound on one idle sleep (seconds)
+    """
+
+    def __init__(self, get_agent_system, batch_size=MONITOR_BATCH_SIZE,
+                 concurrency=MONITOR_CONCURRENCY, jitter=MONITOR_JITTER,
+                 max_sleep=60.0, clock=time.time):
+        self.get_agent_system = get_agent_system
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.max_sleep = max_sleep
+        self._clock = clock
+
+        self._heap = []          # (due_time, seq, user_id)
+        self._due = {}           # user_id -> current due_time (stale heap entries are skipped)
+        self._seq = itertools.count()
+        self._running = set()    # users being checked right now
+        self._forced = set()     # users whose next check ignores the agent's interval
+        self._cancelled = set()  # running users unscheduled meanwhile (not requeued)
+        self._wakeup = None
+        self._task = None
+
+        self.checks_run = 0
+        self.crises_detected = 0
+        self.errors = 0
+
+    def schedule(self, user_id, delay=0.0, only_if_new=False, force=False):
+        """
+        Queue (or move) a user's next check `delay` seconds from now
+
+        force: the check runs even if the agent checked recently (new data)
+        """
+        self._cancelled.discard(user_id)
+        if force:
+            self._forced.add(user_id)
+        if only_if_new and user_id in self._due:
+            return
+        due = self._clock() + max(0.0, delay)
+        if user_id in self._due and self._due[user_id] <= due:
+            return
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), user_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def seed(self, user_ids, spread=MONITOR_STARTUP_SPREAD):
+        """
+        Queue users already stored when the process starts
+
+        Their first checks are spread over `spread` seconds; a user whose
+        persisted agent state says it isn't due yet just gets rescheduled.
+        """
+        count = 0
+        for user_id in user_ids:
+            self.schedule(user_id, random.uniform(0, spread), only_if_new=True)
+            count += 1
+        return count
+
+    def unschedule(self, user_id):
+        self._due.pop(user_id, None)
+        self._forced.discard(user_id)
+        if user_id in self._running:
+            self._cancelled.add(user_id)
+
+    def _pop_due(self):
+        """Take up to batch_size users whose due time has passed"""
+        now = self._clock()
+        batch = []
+        while self._heap and len(batch) < self.batch_size:
+            due, _, user_id = self._heap[0]
+            if self._due.get(user_id) != due:
+                heapq.heappop(self._heap)  # stale entry
+                continue
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            del self._due[user_id]
+            batch.append(user_id)
+        return batch
+
+    def _seconds_until_next(self):
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return self.max_sleep
+        return min(self.max_sleep, max(0.0, self._heap[0][0] - self._clock()))
+
+    def _check_user(self, user_id, force=False):
+        """Blocking: run one monitor pass, return seconds until the next one"""
+        system = self.get_agent_system(user_id)
+        with system.lock:
+            crisis_info = system.crisis_agent.monitor_continuously(force)
+            if system.crisis_agent.flags_crisis(crisis_info):
+                self.crises_detected += 1
+            return system.crisis_agent.next_check_in()
+
+    async def _run_one(self, user_id, semaphore):
+        self._running.add(user_id)
+        async with semaphore:
+            try:
+                force = user_id in self._forced
+                self._forced.discard(user_id)
+                next_in = await asyncio.to_thread(self._check_user, user_id, force)
+                self.checks_run += 1
+            except Exception as e:
+                self.errors += 1
+                log.exception("⚠️ Crisis monitor failed", user_id=user_id, error=str(e))
+                # Retry at the (shorter) crisis cadence
+                next_in = MONITOR_CRISIS_INTERVAL
+        self._running.discard(user_id)
+        if user_id in self._cancelled:
+            self._cancelled.discard(user_id)
+            return
+        if next_in <= 0:
+            # Agent skipped the check (e.g. monitoring switched off)
+            next_in = MONITOR_NORMAL_INTERVAL
+        self.schedule(user_id, next_in * (1 + random.uniform(0, self.jitter)))
+
+    async def run_due(self):
+        """Process every currently-due user, batch by batch"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        processed = 0
+        batch = self._pop_due()
+        while batch:
+            await asyncio.gather(*(self._run_one(user_id, semaphore) for user_id in batch))
+            processed += len(batch)
+            batch = self._pop_due()
+        return processed
+
+    async def run_forever(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            await self.run_due()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+    def stats(self):
+        return {
+            'running': self._task is not None,
+            'scheduled_users': len(self._due),
+            'next_due_in': self._seconds_until_next() if self._due else None,
+            'checks_run': self.checks_run,
+            'crises_detected': self.crises_detected,
+            'errors': self.errors
+        }
@@ -0,0 +1,341 @@
+"""
+SQLite persistence backend (same interface as main.InMemoryDB)
+
+Transactions live in a WITHOUT ROWID table clustered on
+(user_id, date, type), so date-window queries are index range scans done
+by SQLite. The database runs in WAL mode: readers don't block the writer.
+Profiles (balance, bills, ...) and agent state are JSON columns, cached
+in-process and written through on every update.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..utils.cache import next_data_version
+from ..utils.serialize import dumps, to_jsonable
+from ..utils.stats import IncomeStats
+from .summary import summarize_income
+from .timeseries import INCOME, TYPE_CODES, TransactionWindow, to_ordinals
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL DEFAULT '{}',
+    state   TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    user_id TEXT    NOT NULL,
+    date    INTEGER NOT NULL,  -- days since 1970-01-01
+    type    INTEGER NOT NULL,  -- services.timeseries.TYPE_CODES
+    amount  REAL    NOT NULL,
+    PRIMARY KEY (user_id, date, type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS crisis_alerts (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id    TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    alert      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_crisis_alerts_user ON crisis_alerts (user_id, created_at);
+"""
+
+UPSERT_TRANSACTION = """
+INSERT INTO transactions (user_id, date, type, amount) VALUES (?, ?, ?, ?)
+ON CONFLICT (user_id, date, type) DO UPDATE SET amount = excluded.amount
+"""
+
+
+class SQLiteDB:
+    """
+    Durable DB wrapper that matches what agents expect
+
+    Data versions, income summaries and running income stats are kept
+    in-process (like InMemoryDB) and rebuilt from SQL on first use.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+        self._profiles: Dict[str, dict] = {}
+        self._states: Dict[str, dict] = {}
+        self._versions: Dict[str, int] = {}
+        self._derived: Dict[str, dict] = {}  # user_id -> {version, stats, summary}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _ensure_user(self, user_id: str):
+        self._conn.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+
+    def user_ids(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT user_id FROM users")]
+
+    # ---------------------------------------------------------------
+    # Transactions
+    # ---------------------------------------------------------------
+    def get_transactions(self, user_id: str, days: int = 60):
+        # Compatibility layer: list of {date, amount, type} for the window
+        return self.get_transaction_arrays(user_id, days=days).to_records()
+
+    def get_transaction_arrays(self, user_id: str, days: Optional[int] = 60, end: Optional[int] = None):
+        """(dates, amounts, types) arrays for the last `days` days, queried in SQL."""
+        with self._lock:
+            if end is None and days is not None:
+                # Window ends at the most recent transaction (as TransactionSeries.window)
+                end = self._conn.execute(
+                    "SELECT MAX(date) FROM transactions WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+            if end is None and days is not None:
+                rows = []  # no transactions yet
+            else:
+                lo = -(2 ** 31) if days is None else int(end) - int(days) + 1
+                hi = 2 ** 31 if end is None else int(end)
+                # Range scan on the (user_id, date, type) primary key, already in order
+                rows = self._conn.execute(
+                    "SELECT date, amount, type FROM transactions"
+                    " WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date, type",
+                    (user_id, lo, hi),
+                ).fetchall()
+        table = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return TransactionWindow(
+            table[:, 0].astype(np.int32), table[:, 1], table[:, 2].astype(np.int8)
+        )
+
+    def set_transactions(self, user_id: str, transactions: list):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._ensure_user(user_id)
+                self._conn.execute("DELETE FROM transactions WHERE user_id = ?", (user_id,))
+                self._conn.executemany(UPSERT_TRANSACTION, (
+                    (user_id, int(day), TYPE_CODES.get(r.get('type'), INCOME), float(r.get('amount', 0.0)))
+                    for r, day in zip(transactions, to_ordinals([r['date'] for r in transactions]).tolist())
+                ))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._after_write(user_id)
+
+    def merge_transactions(self, user_id: str, dates, amounts, type_code: int = INCOME) -> int:
+        """Bulk upsert rows (duplicates by (date, type) replaced); returns the history size."""
+        dates = np.asarray(dates)
+        days = dates.astype(np.int32) if np.issubdtype(dates.dtype, np.integer) else to_ordinals(dates)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        order = np.argsort(days, kind="stable")  # later duplicates still win
+        days, amounts = days[order], amounts[order]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._ensure_user(user_id)
+                last = self._conn.execute(
+                    "SELECT MAX(date) FROM transactions WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+                self._conn.executemany(UPSERT_TRANSACTION, zip(
+                    [user_id] * len(days), days.tolist(), [int(type_code)] * len(days), amounts.tolist()
+                ))
+                size = self._conn.execute(
+                    "SELECT COUNT(*) FROM transactions WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            appended = (
+                len(days)
+                and (last is None or days[0] > last)
+                and not np.any(days[1:] == days[:-1])
+            )
+            income_rows = (days, amounts) if type_code == INCOME else None
+            self._after_write(user_id, income_rows, appended=bool(appended))
+        return size
+
+    def _after_write(self, user_id: str, income_rows=None, appended: bool = False):
+        # New version for caches; running stats advanced in O(rows) on pure appends
+        version = next_data_version()
+        self._versions[user_id] = version
+        entry = self._derived.get(user_id)
+        if entry is not None and appended and entry["stats"] is not None:
+            if income_rows is not None:
+                entry["stats"].append(*income_rows)
+            entry.update(version=version, summary=None)
+        else:
+            self._derived.pop(user_id, None)
+
+    def _derived_entry(self, user_id: str) -> dict:
+        version = self.get_data_version(user_id)
+        entry = self._derived.get(user_id)
+        if entry is None or entry["version"] != version:
+            entry = {"version": version, "stats": None, "summary": None}
+            self._derived[user_id] = entry
+        return entry
+
+    def get_income_stats(self, user_id: str) -> Optional[IncomeStats]:
+        """Running income statistics (whole history + rolling 60 days)."""
+        with self._lock:
+            entry = self._derived_entry(user_id)
+            if entry["stats"] is None:
+                window = self.get_transaction_arrays(user_id, days=None)
+                is_income = window.types == INCOME
+                if not is_income.any():
+                    return None
+                entry["stats"] = IncomeStats.from_history(window.dates[is_income], window.amounts[is_income])
+            return entry["stats"]
+
+    def get_income_summary(self, user_id: str) -> Dict[str, Any]:
+        """Income summary, computed once per data version (see services.summary)."""
+        with self._lock:
+            entry = self._derived_entry(user_id)
+            if entry["summary"] is None:
+                entry["summary"] = summarize_income(self.get_income_history(user_id))
+            return entry["summary"]
+
+    def get_income_history(self, user_id: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """Income history as columns: {"date": datetime64[D] array, "income": float array}."""
+        window = self.get_transaction_arrays(user_id, days=days)
+        is_income = window.types == INCOME
+        return {
+            "date": window.dates[is_income].astype("timedelta64[D]") + np.datetime64("1970-01-01", "D"),
+            "income": window.amounts[is_income],
+        }
+
+    def get_data_version(self, user_id: str) -> int:
+        """Version that changes on every write to the user's transactions."""
+        return self._versions.setdefault(user_id, next_data_version())
+
+    # ---------------------------------------------------------------
+    # Profile (balance, bills, avg_expenses, ...) and agent state
+    # ---------------------------------------------------------------
+    def _load(self, cache: Dict[str, dict], column: str, user_id: str) -> dict:
+        value = cache.get(user_id)
+        if value is None:
+            row = self._conn.execute(
+                f"SELECT {column} FROM users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            value = cache[user_id] = json.loads(row[0]) if row else {}
+        return value
+
+    def _store(self, cache: Dict[str, dict], column: str, user_id: str, value: dict):
+        self._ensure_user(user_id)
+        self._conn.execute(f"UPDATE users SET {column} = ? WHERE user_id = ?", (dumps(value), user_id))
+        cache[user_id] = value
+
+    def get_profile(self, user_id: str) -> dict:
+        """Per-user fields (balance, bills, avg_expenses, ...); treat as read-only."""
+        with self._lock:
+            return self._load(self._profiles, "profile", user_id)
+
+    def update_profile(self, user_id: str, updates: dict, overwrite: bool = True):
+        """Set profile fields; with overwrite=False only missing fields are set."""
+        with self._lock:
+            profile = dict(self._load(self._profiles, "profile", user_id))
+            for key, value in updates.items():
+                if overwrite or key not in profile:
+                    profile[key] = value
+            self._store(self._profiles, "profile", user_id, profile)
+
+    def get_balance(self, user_id: str) -> float:
+        return float(self.get_profile(user_id).get("balance", 0.0))
+
+    def get_upcoming_bills(self, user_id: str, days: int = 14):
+        # list of {name, amount, due_date}
+        return self.get_profile(user_id).get("bills", [])
+
+    def get_avg_daily_expenses(self, user_id: str) -> float:
+        return float(self.get_profile(user_id).get("avg_expenses", 0.0))
+
+    def update_user_state(self, user_id: str, updates: dict):
+        with self._lock:
+            state = dict(self._load(self._states, "state", user_id))
+            state.update(updates)
+            self._store(self._states, "state", user_id, state)
+
+    def get_user_state(self, user_id: str) -> dict:
+        with self._lock:
+            return self._load(self._states, "state", user_id)
+
+    def save_crisis_alert(self, user_id: str, crisis_info: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO crisis_alerts (user_id, created_at, alert) VALUES (?, ?, ?)",
+                (user_id, time.time(), dumps(crisis_info)),
+            )
+
+    def seed_user(self, user_id: str, dataset):
+        """Give a user the demo history (services.demo); stored as the user's own rows."""
+        self.update_profile(user_id, dataset.profile())
+        self.merge_transactions(user_id, dataset.dates, dataset.amounts, INCOME)
+
+    def export_user(self, user_id: str) -> Dict[str, Any]:
+        """JSON-ready snapshot of one user (to move users between shards)."""
+        window = self.get_transaction_arrays(user_id, days=None)
+        with self._lock:
+            alerts = [
+                json.loads(row[0]) for row in self._conn.execute(
+                    "SELECT alert FROM crisis_alerts WHERE user_id = ? ORDER BY id", (user_id,)
+                )
+            ]
+        return to_jsonable({
+            "profile": self.get_profile(user_id),
+            "state": self.get_user_state(user_id),
+            "transactions": {"dates": window.dates, "amounts": window.amounts, "types": window.types},
+            "crisis_alerts": alerts,
+        })
+
+    def import_user(self, user_id: str, snapshot: Dict[str, Any]):
+        """Replace a user with a snapshot from export_user()."""
+        columns = snapshot.get("transactions") or {}
+        rows = zip(
+            [user_id] * len(columns.get("dates") or []),
+            columns.get("dates") or [], columns.get("types") or [], columns.get("amounts") or [],
+        )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._delete_user(user_id)
+                self._ensure_user(user_id)
+                self._conn.executemany(UPSERT_TRANSACTION, rows)
+                self._conn.executemany(
+                    "INSERT INTO crisis_alerts (user_id, created_at, alert) VALUES (?, ?, ?)",
+                    ((user_id, time.time(), dumps(alert)) for alert in snapshot.get("crisis_alerts") or []),
+                )
+                self._store(self._profiles, "profile", user_id, dict(snapshot.get("profile") or {}))
+                self._store(self._states, "state", user_id, dict(snapshot.get("state") or {}))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._profiles.pop(user_id, None)
+                self._states.pop(user_id, None)
+                raise
+            self._after_write(user_id)
+
+    def drop_user(self, user_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._delete_user(user_id)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            for cache in (self._profiles, self._states, self._versions, self._derived):
+                cache.pop(user_id, None)
+
+    def _delete_user(self, user_id: str):
+        for table in ("transactions", "crisis_alerts", "users"):
+            self._conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
@@ -0,0 +1,75 @@
+"""
+Per-user income summaries maintained at write time
+"""
+import numpy as np
+
+from .timeseries import INCOME
+
+
+# Days shown in the chat prompt's recent-income statistics / breakdown
+RECENT_DAYS = 14
+BREAKDOWN_DAYS = 7
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def summarize_income(history):
+    """
+    Summary statistics for the chat prompt, computed once per data write
+
+    Args:
+        history: {"date": datetime64[D] array, "income": float array}
+
+    Returns:
+        dict (empty if there is no income history)
+    """
+    dates, amounts = history["date"], history["income"]
+    if not len(amounts):
+        return {}
+    return _summary(len(amounts), str(dates[0]), dates[-RECENT_DAYS:], amounts[-RECENT_DAYS:])
+
+
+def summarize_appended(summary, series, appended_from):
+    """
+    Summary after rows were appended to `series` from row `appended_from`
+
+    Reads only the new rows and the last RECENT_DAYS income rows, so an
+    append costs O(new rows), not O(history).
+    """
+    is_income = series.types[appended_from:] == INCOME
+    added = int(is_income.sum())
+    if not added:
+        return summary
+    first_date = summary.get("first_date") or str(_EPOCH + int(series.dates[appended_from:][is_income][0]))
+    dates, amounts = _income_tail(series, RECENT_DAYS)
+    return _summary(summary.get("days", 0) + added, first_date, dates, amounts)
+
+
+def _income_tail(series, count):
+    """Last `count` income rows (dates as datetime64[D]), scanning back only as far as needed"""
+    dates, amounts, types = series.dates, series.amounts, series.types
+    size = count
+    while True:
+        lo = max(0, len(types) - size)
+        is_income = types[lo:] == INCOME
+        if lo == 0 or is_income.sum() >= count:
+            tail = slice(-count, None)
+            return (dates[lo:][is_income][tail].astype("timedelta64[D]") + _EPOCH,
+                    amounts[lo:][is_income][tail])
+        size *= 2
+
+
+def _summary(days, first_date, recent_dates, recent):
+    recent_total = float(recent.sum())
+    return {
+        "days": int(days),
+        "first_date": first_date,
+        "last_date": str(recent_dates[-1]),
+        "recent_days": int(len(recent)),
+        "recent_total": recent_total,
+        "recent_avg": recent_total / len(recent),
+        "recent_max": float(recent.max()),
+        "recent_min": float(recent.min()),
+        "breakdown": list(zip(np.datetime_as_string(recent_dates, unit="D").tolist(),
+                              recent.tolist()))[-BREAKDOWN_DAYS:],
+    }
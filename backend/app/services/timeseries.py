@@ -0,0 +1,177 @@
+"""
+Columnar per-user transaction store (NumPy arrays instead of lists of dicts)
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+
+# Transaction type <-> compact code stored in the 'types' column
+TYPE_CODES = {'income': 0, 'expense': 1}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+INCOME = TYPE_CODES['income']
+EXPENSE = TYPE_CODES['expense']
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def to_ordinals(dates):
+    """Convert date strings / datetimes to day ordinals (days since 1970-01-01)"""
+    return (np.asarray(dates, dtype='datetime64[D]') - _EPOCH).astype(np.int32)
+
+
+def ordinals_to_strings(ordinals):
+    """Convert day ordinals back to 'YYYY-MM-DD' strings"""
+    days = np.asarray(ordinals, dtype='int64').astype('timedelta64[D]') + _EPOCH
+    return np.datetime_as_string(days, unit='D').tolist()
+
+
+class TransactionWindow(NamedTuple):
+    """Read-only views over a date window of a TransactionSeries"""
+    dates: np.ndarray
+    amounts: np.ndarray
+    types: np.ndarray
+
+    def to_records(self):
+        """Compatibility layer: list of {date, amount, type} dicts"""
+        return [
+            {'date': date, 'amount': amount, 'type': TYPE_NAMES.get(code, 'other')}
+            for date, amount, code in zip(
+                ordinals_to_strings(self.dates),
+                self.amounts.tolist(),
+                self.types.tolist(),
+            )
+        ]
+
+
+class TransactionSeries:
+    """
+    One user's transactions as date-sorted columns
+
+    Columns live in over-allocated buffers so in-order appends are amortized
+    O(1). Rows already handed out are never modified in place, so windows
+    returned earlier stay valid after later writes. Columns may also be
+    read-only arrays shared between series (see services.demo): the first
+    write then copies them.
+    """
+
+    def __init__(self, dates=None, amounts=None, types=None):
+        dates = np.asarray(dates if dates is not None else [], dtype=np.int32)
+        amounts = np.asarray(amounts if amounts is not None else [], dtype=np.float64)
+        types = np.asarray(types if types is not None else [], dtype=np.int8)
+        self._set_columns(dates, amounts, types)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from a list of {date, amount, type} dicts"""
+        series = cls()
+        if records:
+            series.merge(
+                [r['date'] for r in records],
+                [float(r.get('amount', 0.0)) for r in records],
+                [TYPE_CODES.get(r.get('type'), INCOME) for r in records],
+            )
+        return series
+
+    def _set_columns(self, dates, amounts, types):
+        self._dates = dates
+        self._amounts = amounts
+        self._types = types
+        self._size = len(dates)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dates(self):
+        return self._dates[:self._size]
+
+    @property
+    def amounts(self):
+        return self._amounts[:self._size]
+
+    @property
+    def types(self):
+        return self._types[:self._size]
+
+    def window(self, days=None, end=None):
+        """
+        Zero-copy slice of the rows dated within the last `days` days
+
+        The window ends at `end` (a day ordinal) or, by default, at the most
+        recent transaction, so historical uploads still return data.
+        """
+        dates = self.dates
+        if not len(dates) or (days is None and end is None):
+            return TransactionWindow(dates, self.amounts, self.types)
+
+        end = int(dates[-1]) if end is None else int(end)
+        hi = np.searchsorted(dates, end, side='right')
+        lo = 0 if days is None else np.searchsorted(dates, end - int(days) + 1, side='left')
+        return TransactionWindow(dates[lo:hi], self._amounts[lo:hi], self._types[lo:hi])
+
+    def merge(self, dates, amounts, types=INCOME):
+        """
+        Merge new rows, keeping date order and deduplicating by (date, type)
+
+        Rows being merged win over existing rows with the same key.
+
+        Returns:
+            True if the rows were simply appended after the existing history
+            (earlier rows untouched), False if the history was rebuilt
+        """
+        dates = np.asarray(dates)
+        if np.issubdtype(dates.dtype, np.integer):
+            new_dates = dates.astype(np.int32)
+        else:
+            new_dates = to_ordinals(dates)
+        new_amounts = np.asarray(amounts, dtype=np.float64)
+        new_types = np.broadcast_to(np.asarray(types, dtype=np.int8), new_dates.shape)
+        if not len(new_dates):
+            return True
+
+        order = np.lexsort((new_types, new_dates))
+        new_dates, new_amounts, new_types = new_dates[order], new_amounts[order], new_types[order]
+
+        if (not self._size or new_dates[0] > self.dates[-1]) and _is_unique(new_dates, new_types):
+            self._append(new_dates, new_amounts, new_types)
+            return True
+        self._rebuild(new_dates, new_amounts, new_types)
+        return False
+
+    def _append(self, dates, amounts, types):
+        """Fast path: all new rows are strictly after the current last date"""
+        needed = self._size + len(dates)
+        if needed > len(self._dates) or not self._dates.flags.writeable:
+            capacity = max(needed, 2 * len(self._dates), 16)
+            self._dates = _grow(self._dates, self._size, capacity)
+            self._amounts = _grow(self._amounts, self._size, capacity)
+            self._types = _grow(self._types, self._size, capacity)
+        self._dates[self._size:needed] = dates
+        self._amounts[self._size:needed] = amounts
+        self._types[self._size:needed] = types
+        self._size = needed
+
+    def _rebuild(self, dates, amounts, types):
+        """General path: stable sort old + new rows and keep the newest per key"""
+        all_dates = np.concatenate([self.dates, dates])
+        all_amounts = np.concatenate([self.amounts, amounts])
+        all_types = np.concatenate([self.types, types])
+
+        order = np.lexsort((all_types, all_dates))
+        all_dates, all_amounts, all_types = all_dates[order], all_amounts[order], all_types[order]
+
+        # lexsort is stable, so the last row of each (date, type) group is the newest
+        keep = np.ones(len(all_dates), dtype=bool)
+        keep[:-1] = (all_dates[:-1] != all_dates[1:]) | (all_types[:-1] != all_types[1:])
+        self._set_columns(all_dates[keep], all_amounts[keep], all_types[keep])
+
+
+def _is_unique(dates, types):
+    return not np.any((dates[:-1] == dates[1:]) & (types[:-1] == types[1:]))
+
+
+def _grow(array, size, capacity):
+    grown = np.empty(capacity, dtype=array.dtype)
+    grown[:size] = array[:size]
+    return grown
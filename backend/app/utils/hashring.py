@@ -0,0 +1,58 @@
+"""
+Consistent hashing of user ids onto shards
+"""
+import bisect
+import hashlib
+
+from ..config import SHARD_VNODES
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Each node owns `vnodes` points on a 64-bit ring; a key belongs to the
+    first point clockwise from its hash. Adding or removing one node
+    only moves the keys of that node (~1/N of all keys).
+
+    Args:
+        nodes: Initial node names (e.g. shard ids)
+        vnodes: Points per node (more = more even spread)
+    """
+
+    def __init__(self, nodes=(), vnodes=SHARD_VNODES):
+        self.vnodes = vnodes
+        self._points = []  # sorted hashes
+        self._owners = []  # node owning each point
+        self.nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            at = bisect.bisect(self._points, point)
+            self._points.insert(at, point)
+            self._owners.insert(at, node)
+
+    def remove(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        keep = [i for i, owner in enumerate(self._owners) if owner != node]
+        self._points = [self._points[i] for i in keep]
+        self._owners = [self._owners[i] for i in keep]
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError("hash ring has no nodes")
+        at = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[at]
+
+    def __len__(self):
+        return len(self.nodes)
@@ -0,0 +1,187 @@
+"""
+Structured, leveled logging with the I/O done off the calling thread
+
+    log = get_logger(__name__)
+    log.debug("🎯 Income Agent: analyzing outlook", user_id=user_id, days=14)
+
+- Level gating first: a call below the configured level returns after one
+  cached isEnabledFor() check, before any record or message is built.
+- configure_logging() routes the "app" and "hybrid_chat" loggers through a
+  bounded queue; a listener thread formats (console or JSON) and writes.
+  Records are not pre-formatted on the caller's thread, so pass values
+  that won't be mutated afterwards. When the queue is full new records
+  are dropped (and counted) rather than blocking the request.
+- The current request id (request_id_var) is attached to every record;
+  the API middleware sets it per request and the compute executor
+  carries it into worker threads / processes.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+from ..config import LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE
+
+
+# Correlation id of the request being handled (None outside requests)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Loggers configure_logging() routes through the queue
+LOGGER_ROOTS = ("app", "hybrid_chat")
+
+DEBUG, INFO, WARNING, ERROR = logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR
+
+
+class StructLogger:
+    """Thin wrapper over a stdlib logger taking a message plus key=value fields"""
+
+    __slots__ = ("_logger",)
+
+    def __init__(self, logger):
+        self._logger = logger
+
+    def enabled(self, level):
+        """Guard for fields that are costly to compute"""
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level, msg, fields, exc_info=False):
+        self._logger.log(level, msg, exc_info=exc_info, stacklevel=3,
+                         extra={"fields": fields, "request_id": request_id_var.get()})
+
+    def debug(self, msg, **fields):
+        if self._logger.isEnabledFor(DEBUG):
+            self._log(DEBUG, msg, fields)
+
+    def info(self, msg, **fields):
+        if self._logger.isEnabledFor(INFO):
+            self._log(INFO, msg, fields)
+
+    def warning(self, msg, **fields):
+        if self._logger.isEnabledFor(WARNING):
+            self._log(WARNING, msg, fields)
+
+    def error(self, msg, **fields):
+        if self._logger.isEnabledFor(ERROR):
+            self._log(ERROR, msg, fields)
+
+    def exception(self, msg, **fields):
+        """ERROR with the current exception's traceback"""
+        if self._logger.isEnabledFor(ERROR):
+            self._log(ERROR, msg, fields, exc_info=True)
+
+
+def get_logger(name):
+    return StructLogger(logging.getLogger(name))
+
+
+class ConsoleFormatter(logging.Formatter):
+    """`12:00:01 INFO  app.main [req] message key=value ...`"""
+
+    def format(self, record):
+        parts = [
+            time.strftime("%H:%M:%S", time.localtime(record.created)),
+            f"{record.levelname:<5}",
+            record.name,
+        ]
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            parts.append(f"[{request_id}]")
+        parts.append(record.getMessage())
+        parts.extend(f"{key}={value}" for key, value in (getattr(record, "fields", None) or {}).items())
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is when the record is emitted (it may be redirected)"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands records over unformatted and drops when full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread (in-process queue, no pickling)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE, stream=None):
+    """Install the queue handler + listener (idempotent)"""
+    global _handler, _listener
+    level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    for name in LOGGER_ROOTS:
+        logging.getLogger(name).setLevel(level)
+    if _handler is not None:
+        return
+
+    output = logging.StreamHandler(stream) if stream is not None else StdoutHandler()
+    output.setFormatter(JSONFormatter() if fmt == "json" else ConsoleFormatter())
+    _handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+    for name in LOGGER_ROOTS:
+        logger = logging.getLogger(name)
+        logger.addHandler(_handler)
+        logger.propagate = False
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def stats():
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "dropped": _handler.dropped if _handler else 0,
+    }
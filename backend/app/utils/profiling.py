@@ -0,0 +1,249 @@
+"""
+Opt-in cProfile of a single request
+
+    profile = begin(token_from_request, "forecast")   # None unless the token matches
+    with section("load_history"): ...                 # sync block on the event loop
+    result = await offload(...)                       # offload() profiles the job in its worker
+    report = profile.finish(request_id)
+
+The profile travels in a context variable, so requests that don't opt in
+pay one ContextVar lookup per stage and nothing else. Executor jobs are
+profiled where they run (thread or worker process) by profile_call(), and
+their pstats come back with the result, so the report covers pandas /
+NumPy / agent calls without profiling other requests' work on the loop.
+"""
+import contextlib
+import contextvars
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import re
+import time
+
+from ..config import PROFILE_DIR, PROFILE_MIN_SHARE, PROFILE_TOKEN, PROFILE_TOP
+
+
+# Profile being collected for the current request (None: not profiling)
+profile_var = contextvars.ContextVar("profile", default=None)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Max call-tree depth in the report
+TREE_DEPTH = 16
+
+_NOT_PROFILING = contextlib.nullcontext()
+
+
+def requested(token):
+    """True if profiling is configured and `token` matches PROFILE_TOKEN"""
+    return bool(PROFILE_TOKEN and token) and hmac.compare_digest(str(token), PROFILE_TOKEN)
+
+
+def begin(token, label):
+    """Start profiling the current request if it carries the token"""
+    if not requested(token):
+        return None
+    profile = RequestProfile(label)
+    profile_var.set(profile)
+    return profile
+
+
+def current():
+    return profile_var.get()
+
+
+def section(stage):
+    """Profile a synchronous block of the current request (no-op when not profiling)"""
+    profile = profile_var.get()
+    return profile.section(stage) if profile is not None else _NOT_PROFILING
+
+
+def profile_call(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) under cProfile; returns (result, pstats dict)
+
+    Module-level so the process pool can pickle it. When another profiler
+    already owns the thread the call runs unprofiled (stats None).
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return fn(*args, **kwargs), None
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+class _Snapshot:
+    """Raw stats dict in the shape pstats.Stats() loads from"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def package_of(func):
+    """Group a pstats key: "numpy", "pandas", "app.models.crisis", "builtins", ..."""
+    filename, _, name = func
+    if filename == "~":
+        # C functions: "<method 'sum' of 'numpy.ndarray' objects>", "<built-in method numpy...>"
+        for package in ("numpy", "pandas"):
+            if package in name:
+                return package
+        return "builtins"
+    if filename.startswith("<"):
+        # Code without a source file: "<frozen importlib._bootstrap>", "<string>"
+        return "stdlib" if filename.startswith("<frozen ") else filename
+    path = os.path.abspath(filename)
+    if "site-packages" in path:
+        return path.split("site-packages" + os.sep, 1)[1].split(os.sep)[0].split(".")[0]
+    if path.startswith(BACKEND_DIR + os.sep):
+        return os.path.splitext(os.path.relpath(path, BACKEND_DIR))[0].replace(os.sep, ".")
+    return "stdlib"
+
+
+def label_of(func):
+    filename, line, name = func
+    if filename == "~":
+        return name
+    if filename.startswith("<"):
+        return f"{filename}:{line}({name})"
+    path = os.path.abspath(filename)
+    if "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(BACKEND_DIR + os.sep):
+        path = os.path.relpath(path, BACKEND_DIR)
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{line}({name})"
+
+
+def call_tree(stats, top=PROFILE_TOP, min_share=PROFILE_MIN_SHARE, depth=TREE_DEPTH):
+    """
+    Top-down tree from pstats caller edges
+
+    A child's time is its cumulative time when called from that parent,
+    summed over all call paths (what pstats records), so deep nodes are
+    an approximation for functions reached along several paths.
+    """
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((edge[3], edge[1], func))
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    total = sum(stats[func][3] for func in roots) or 1e-12
+    floor = total * min_share
+
+    def node(func, seconds, calls, path, level):
+        entry = {"function": label_of(func), "ms": round(seconds * 1000, 3), "calls": calls,
+                 "share": round(seconds / total, 4)}
+        if level < depth:
+            kids = [
+                node(child, child_seconds, child_calls, path | {child}, level + 1)
+                for child_seconds, child_calls, child in sorted(children.get(func, ()), reverse=True)[:top]
+                if child_seconds >= floor and child not in path
+            ]
+            if kids:
+                entry["children"] = kids
+        return entry
+
+    return [
+        node(func, stats[func][3], stats[func][1], {func}, 0)
+        for func in sorted(roots, key=lambda f: -stats[f][3])
+        if stats[func][3] >= floor
+    ]
+
+
+class RequestProfile:
+    """cProfile stats for each stage of one request"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.stages = []  # (stage, pstats dict)
+
+    def add(self, stage, stats):
+        if stats:
+            self.stages.append((stage, stats))
+
+    @contextlib.contextmanager
+    def section(self, stage):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            self.add(stage, profiler.stats)
+
+    def merged(self):
+        # Copies: Stats.add() replaces entries in the first dict it loaded
+        stats = pstats.Stats(_Snapshot(dict(self.stages[0][1]))) if self.stages else None
+        for _, raw in self.stages[1:]:
+            stats.add(_Snapshot(dict(raw)))
+        return stats
+
+    def report(self, top=PROFILE_TOP):
+        """
+        Returns:
+            dict: wall_ms, stages (profiled time and call tree per stage),
+            packages (self time per package / app module), functions
+            (largest cumulative time)
+        """
+        packages = {}
+        for _, raw in self.stages:
+            for func, (_, _, self_time, _, _) in raw.items():
+                package = package_of(func)
+                packages[package] = packages.get(package, 0.0) + self_time
+
+        merged = self.merged()
+        functions = []
+        if merged is not None:
+            ranked = sorted(merged.stats.items(), key=lambda item: -item[1][3])[:top]
+            functions = [
+                {"function": label_of(func), "calls": nc, "self_ms": round(tt * 1000, 3),
+                 "cumulative_ms": round(ct * 1000, 3)}
+                for func, (_, nc, tt, ct, _) in ranked
+            ]
+
+        return {
+            "label": self.label,
+            "wall_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": [
+                {"stage": stage, "profiled_ms": round(sum(e[2] for e in raw.values()) * 1000, 3),
+                 "call_tree": call_tree(raw, top)}
+                for stage, raw in self.stages
+            ],
+            "packages": [
+                {"package": name, "self_ms": round(seconds * 1000, 3)}
+                for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]
+            ],
+            "functions": functions,
+        }
+
+    def finish(self, name, directory=PROFILE_DIR):
+        """Build the report; with a directory, also save <name>.prof and <name>.json there"""
+        report = self.report()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, re.sub(r"[^\w.-]", "_", f"{self.label}-{name}"))
+            merged = self.merged()
+            if merged is not None:
+                merged.dump_stats(base + ".prof")
+            with open(base + ".json", "w") as f:
+                json.dump(report, f, indent=2)
+            report["saved_to"] = base + ".prof"
+        return report
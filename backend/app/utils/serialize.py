@@ -0,0 +1,27 @@
+"""
+JSON helpers for persisting agent state and profiles
+"""
+import datetime
+import json
+
+import numpy as np
+
+
+def json_default(value):
+    """Agent state may hold numpy scalars/arrays and datetimes"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value):
+    return json.dumps(value, default=json_default)
+
+
+def to_jsonable(value):
+    """Plain JSON types only (dicts, lists, str, numbers, bools, None)"""
+    return json.loads(dumps(value))
@@ -0,0 +1,49 @@
+"""
+Agent state container that tracks when it changes
+"""
+from .cache import next_data_version
+
+
+class VersionedState(dict):
+    """
+    dict whose `version` changes whenever a key is set, updated or removed
+
+    Consumers (e.g. the chat prompt cache) compare versions instead of
+    re-reading the whole state. Mutating nested values in place does not
+    bump the version.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = next_data_version()
+
+    def _touch(self):
+        self.version = next_data_version()
+
+    def __setitem__(self, key, value):
+        if key in self and self[key] is value:
+            return
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._touch()
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._touch()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._touch()
+        return super().setdefault(key, default)
+
+    def pop(self, key, *args):
+        if key in self:
+            self._touch()
+        return super().pop(key, *args)
+
+    def clear(self):
+        super().clear()
+        self._touch()
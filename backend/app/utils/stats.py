@@ -0,0 +1,223 @@
+"""
+Incrementally maintained statistics (O(1) per new observation)
+"""
+import copy
+import math
+from collections import deque
+
+import numpy as np
+
+
+class RunningStats:
+    """
+    Welford mean / variance that supports adding and removing values
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    @classmethod
+    def from_values(cls, values):
+        """Vectorized bulk initialisation"""
+        stats = cls()
+        values = np.asarray(values, dtype=float)
+        if len(values):
+            stats.count = int(len(values))
+            stats.mean = float(values.mean())
+            stats._m2 = float(((values - stats.mean) ** 2).sum())
+        return stats
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.count <= 1:
+            self.count, self.mean, self._m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.count
+        self._m2 = max(0.0, self._m2 - delta * (x - self.mean))
+
+    @property
+    def variance(self):
+        """Population variance (same as np.var / np.std default ddof=0)"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class RollingStats(RunningStats):
+    """
+    RunningStats over the observations dated within the last `window_days`
+    days of the newest observation (observations must arrive in date order)
+    """
+
+    def __init__(self, window_days=60):
+        super().__init__()
+        self.window_days = window_days
+        self._window = deque()  # (day ordinal, value)
+
+    @classmethod
+    def from_series(cls, days, values, window_days=60):
+        """Vectorized bulk initialisation from date-ordered arrays"""
+        days = np.asarray(days)
+        values = np.asarray(values, dtype=float)
+        start = np.searchsorted(days, days[-1] - window_days + 1) if len(days) else 0
+        stats = cls(window_days)
+        bulk = RunningStats.from_values(values[start:])
+        stats.count, stats.mean, stats._m2 = bulk.count, bulk.mean, bulk._m2
+        stats._window.extend(zip(days[start:].tolist(), values[start:].tolist()))
+        return stats
+
+    def add_at(self, day, x):
+        self._window.append((day, x))
+        self.add(x)
+        cutoff = day - self.window_days
+        while self._window and self._window[0][0] <= cutoff:
+            _, old = self._window.popleft()
+            self.remove(old)
+
+
+def fit_trend_batch(windows):
+    """
+    Closed-form least-squares level and slope for many windows at once
+
+    Same model as np.polyfit(np.arange(W), window, 1) per row.
+
+    Args:
+        windows: array (users, W) of date-ordered values
+
+    Returns:
+        (mean, slope) arrays of shape (users,)
+    """
+    windows = np.atleast_2d(np.asarray(windows, dtype=float))
+    n = windows.shape[1]
+    if n == 0:
+        zeros = np.zeros(windows.shape[0])
+        return zeros, zeros
+    x = np.arange(n, dtype=float)
+    sum_y = windows.sum(axis=1)
+    sum_xy = windows @ x
+    return sum_y / n, _slope(n, sum_y, sum_xy)
+
+
+def _slope(n, sum_y, sum_xy):
+    """Least-squares slope for x = 0..n-1 from the running sums"""
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    denom = n * sum_xx - sum_x ** 2
+    if denom == 0:
+        return np.zeros_like(np.asarray(sum_y, dtype=float)) if np.ndim(sum_y) else 0.0
+    return (n * sum_xy - sum_x * sum_y) / denom
+
+
+class SlidingTrend:
+    """
+    Level + slope of the last `window` values, updated in O(1) per value
+
+    Keeps sum(y) and sum(x*y) with x = 0..n-1 over the window; sliding the
+    window re-indexes x, which only needs the old sums and the dropped value.
+    """
+
+    # Recompute the sums exactly every so often to stop rounding drift
+    REFRESH_EVERY = 10000
+
+    def __init__(self, window=30):
+        self.window = window
+        self._values = deque()
+        self._sum_y = 0.0
+        self._sum_xy = 0.0
+        self._updates = 0
+
+    @classmethod
+    def from_values(cls, values, window=30):
+        trend = cls(window)
+        tail = np.asarray(values, dtype=float)[-window:]
+        trend._values.extend(tail.tolist())
+        trend._refresh()
+        return trend
+
+    def add(self, y):
+        n = len(self._values)
+        if n < self.window:
+            self._sum_xy += n * y
+            self._sum_y += y
+        else:
+            dropped = self._values.popleft()
+            # Remaining values shift from x=i to x=i-1; new value lands at x=n-1
+            self._sum_xy += -(self._sum_y - dropped) + (n - 1) * y
+            self._sum_y += y - dropped
+        self._values.append(y)
+
+        self._updates += 1
+        if self._updates % self.REFRESH_EVERY == 0:
+            self._refresh()
+
+    def _refresh(self):
+        values = np.fromiter(self._values, dtype=float, count=len(self._values))
+        self._sum_y = float(values.sum())
+        self._sum_xy = float(values @ np.arange(len(values), dtype=float))
+
+    @property
+    def count(self):
+        return len(self._values)
+
+    @property
+    def mean(self):
+        return self._sum_y / len(self._values) if self._values else 0.0
+
+    @property
+    def slope(self):
+        n = len(self._values)
+        return float(_slope(n, self._sum_y, self._sum_xy)) if n > 1 else 0.0
+
+
+class IncomeStats:
+    """
+    Per-user income statistics maintained as income is appended
+
+    `overall` covers the whole history, `recent` the last `window_days` days
+    and `trend` the level/slope of the last `trend_window` values.
+    """
+
+    def __init__(self, window_days=60, trend_window=30):
+        self.overall = RunningStats()
+        self.recent = RollingStats(window_days)
+        self.trend = SlidingTrend(trend_window)
+
+    @classmethod
+    def from_history(cls, days, amounts, window_days=60, trend_window=30):
+        stats = cls(window_days, trend_window)
+        stats.overall = RunningStats.from_values(amounts)
+        stats.recent = RollingStats.from_series(days, amounts, window_days)
+        stats.trend = SlidingTrend.from_values(amounts, trend_window)
+        return stats
+
+    def append(self, days, amounts):
+        """O(1) per value; `days` must all be after the newest observation"""
+        for day, x in zip(np.asarray(days).tolist(), np.asarray(amounts, dtype=float).tolist()):
+            self.overall.add(x)
+            self.recent.add_at(day, x)
+            self.trend.add(x)
+
+    def copy(self):
+        """Independent copy (O(window), not O(history))"""
+        clone = copy.copy(self)
+        clone.overall = copy.copy(self.overall)
+        clone.recent = copy.copy(self.recent)
+        clone.recent._window = self.recent._window.copy()
+        clone.trend = copy.copy(self.trend)
+        clone.trend._values = self.trend._values.copy()
+        return clone
+
+    def coefficient_of_variation(self):
+        mean = self.recent.mean
+        return self.recent.std / mean if mean > 0 else 0
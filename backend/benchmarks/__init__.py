@@ -0,0 +1,3 @@
+"""
+Benchmark suite for the forecast, crisis, upload and chat-context hot paths
+"""
@@ -0,0 +1,58 @@
+"""
+Synthetic data generators for the benchmark suite
+"""
+import numpy as np
+
+
+def income_series(rows, seed=0, start="2000-01-01"):
+    """
+    Daily gig income with weekly seasonality and noise
+
+    Returns:
+        (dates datetime64[D] array, amounts float array)
+    """
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64(start, "D") + np.arange(rows)
+    weekday = (dates.astype("int64") + 3) % 7  # 1970-01-01 was a Thursday
+    base = np.where(weekday >= 5, 425.0, 500.0)
+    amounts = np.clip(rng.normal(base, 150.0), 50.0, None).round(2)
+    return dates, amounts
+
+
+def income_records(rows, seed=0):
+    """Same data as [{'date': 'YYYY-MM-DD', 'income': float}, ...]"""
+    dates, amounts = income_series(rows, seed)
+    return [
+        {"date": date, "income": amount}
+        for date, amount in zip(np.datetime_as_string(dates, unit="D").tolist(), amounts.tolist())
+    ]
+
+
+def income_csv(rows, seed=0):
+    """Same data as CSV bytes in the upload format (date,income)"""
+    dates, amounts = income_series(rows, seed)
+    body = "\n".join(
+        f"{date},{amount}"
+        for date, amount in zip(np.datetime_as_string(dates, unit="D").tolist(), amounts.tolist())
+    )
+    return ("date,income\n" + body + "\n").encode()
+
+
+def populate_users(db, n_users, days=90, seed=0):
+    """
+    Fill a DB (InMemoryDB / SQLiteDB) with n_users synthetic users
+
+    Returns:
+        list of user ids
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = [f"bench_user_{i}" for i in range(n_users)]
+    for i, user_id in enumerate(user_ids):
+        dates, amounts = income_series(days, seed=seed + i)
+        db.merge_transactions(user_id, dates, amounts)
+        db.update_profile(user_id, {
+            "balance": float(rng.uniform(0, 6000)),
+            "bills": [{"name": "rent", "amount": float(rng.uniform(2000, 8000)), "due_date": None}],
+            "avg_expenses": float(rng.uniform(300, 700)),
+        })
+    return user_ids
@@ -0,0 +1,425 @@
+"""
+Benchmark runner: times the hot paths and emits machine-readable results
+
+Usage (from the backend folder):
+    python -m benchmarks.run                          # full suite (1k/100k/1M rows, 10k users)
+    python -m benchmarks.run --quick                  # smaller sizes for a fast check
+    python -m benchmarks.run --only upload,crisis     # subset of cases (name prefix match)
+    python -m benchmarks.run --output results.json    # write results
+    python -m benchmarks.run --baseline baseline.json # compare; exit 1 on regressions
+
+Each case reports wall time (min/median/mean over `repeat` runs), peak
+traced memory (tracemalloc) and the net number of allocated blocks left
+behind by one run.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from . import datagen
+
+
+FULL_SIZES = {"rows": [1_000, 100_000, 1_000_000], "users": 10_000}
+QUICK_SIZES = {"rows": [1_000, 100_000], "users": 1_000}
+
+
+@dataclass
+class Case:
+    name: str
+    params: dict
+    fn: Callable[[], object]
+    repeat: int = 10
+    setup: Optional[Callable[[], None]] = None
+    key: str = field(init=False)
+
+    def __post_init__(self):
+        self.key = f"{self.name}[{json.dumps(self.params, sort_keys=True)}]"
+
+
+# -------------------------------------------------------------------
+# Cases
+#
+# Each suite takes wanted(name) and skips the data setup of cases that
+# --only filtered out (some build 1M-row databases or 10k users).
+# -------------------------------------------------------------------
+def _fresh_db():
+    from app.main import InMemoryDB
+    return InMemoryDB({})
+
+
+def forecast_cases(sizes, wanted):
+    if not wanted("forecast.generate_three_scenarios"):
+        return
+    from app.models.forecast import generate_three_scenarios
+
+    records = datagen.income_records(1_000)
+    for periods in (90, 365):
+        yield Case(
+            "forecast.generate_three_scenarios",
+            {"history_rows": len(records), "periods": periods, "n_paths": 1000},
+            lambda periods=periods: generate_three_scenarios(records, periods=periods, seed=1),
+            repeat=20,
+        )
+
+
+def income_agent_cases(sizes, wanted):
+    if not wanted("income_agent.predict_scenarios"):
+        return
+    from app.models.income_agent import IncomeAgent, forecast_cache
+
+    for rows in sizes["rows"][:2]:
+        db = _fresh_db()
+        dates, amounts = datagen.income_series(rows)
+        db.merge_transactions("u", dates, amounts)
+        agent = IncomeAgent("u", db)
+        yield Case(
+            "income_agent.predict_scenarios",
+            {"history_rows": rows, "days": 14, "cache": "cold"},
+            lambda agent=agent: agent.predict_scenarios(14),
+            repeat=20,
+            setup=forecast_cache.clear,
+        )
+        yield Case(
+            "income_agent.predict_scenarios",
+            {"history_rows": rows, "days": 14, "cache": "warm"},
+            lambda agent=agent: agent.predict_scenarios(14),
+            repeat=50,
+        )
+
+
+def crisis_cases(sizes, wanted):
+    import numpy as np
+    from app.models.agent_system import AgentSystem
+    from app.models.crisis import analyze_scenarios_batch, run_batch_scenario_analysis
+    from app.models.income_agent import forecast_cache
+
+    if wanted("crisis_agent.run_scenario_analysis"):
+        db = _fresh_db()
+        user_ids = datagen.populate_users(db, 1)
+        system = AgentSystem(user_ids[0], db)
+        yield Case(
+            "crisis_agent.run_scenario_analysis",
+            {"history_rows": 90, "cache": "cold"},
+            system.crisis_agent.run_scenario_analysis,
+            repeat=20,
+            setup=forecast_cache.clear,
+        )
+
+    n_users = sizes["users"]
+    if wanted("crisis.analyze_scenarios_batch"):
+        rng = np.random.default_rng(0)
+        income = rng.normal(450, 150, (n_users, 3, 14))
+        balances = rng.uniform(0, 6000, n_users)
+        bills = rng.uniform(2000, 8000, n_users)
+        expenses = rng.uniform(300, 700, n_users)
+        yield Case(
+            "crisis.analyze_scenarios_batch",
+            {"users": n_users, "days": 14},
+            lambda: analyze_scenarios_batch(income, balances, bills, expenses),
+            repeat=10,
+        )
+
+    if wanted("crisis.run_batch_scenario_analysis"):
+        db = _fresh_db()
+        user_ids = datagen.populate_users(db, n_users)
+        agents = [AgentSystem(user_id, db).crisis_agent for user_id in user_ids]
+        yield Case(
+            "crisis.run_batch_scenario_analysis",
+            {"users": n_users, "days": 14, "cache": "cold"},
+            lambda: run_batch_scenario_analysis(agents),
+            repeat=3,
+            setup=forecast_cache.clear,
+        )
+
+
+def action_cases(sizes, wanted):
+    if not wanted("actions.apply_actions"):
+        return
+    import numpy as np
+    from app.services.actions import apply_actions
+
+    scenarios = np.random.default_rng(0).normal(450, 150, (3, 90))
+    actions = [
+        {"action_type": action_type, "amount": 500 + 100 * i}
+        for i, action_type in enumerate(["EARN", "CUT", "DELAY", "SAVE"] * 2)
+    ]
+    yield Case(
+        "actions.apply_actions",
+        {"actions": len(actions), "days": 90},
+        lambda: apply_actions(scenarios, actions, current_balance=2000, daily_costs=500),
+        repeat=20,
+    )
+
+
+def upload_cases(sizes, wanted):
+    if not wanted("upload.income_csv"):
+        return
+    from fastapi.testclient import TestClient
+    from app.main import app, user_data_store
+
+    client = TestClient(app)
+
+    def reset():
+        user_data_store.pop("demo_user", None)
+
+    for rows in sizes["rows"]:
+        body = datagen.income_csv(rows)
+
+        def upload(body=body):
+            response = client.post(
+                "/api/income/upload", files={"file": ("income.csv", body, "text/csv")}
+            )
+            response.raise_for_status()
+            return response
+
+        yield Case(
+            "upload.income_csv",
+            {"rows": rows, "bytes": len(body)},
+            upload,
+            repeat=3 if rows >= 1_000_000 else 10,
+            setup=reset,
+        )
+
+
+def memory_append_cases(sizes, wanted):
+    if not wanted("memory.merge_transactions_append"):
+        return
+    import itertools
+
+    # One new day per call: running stats and summary should not grow with the history
+    for rows in sizes["rows"]:
+        db = _fresh_db()
+        dates, amounts = datagen.income_series(rows)
+        db.merge_transactions("u", dates, amounts)
+        next_day = itertools.count(int(dates[-1].astype("int64")) + 1)
+        yield Case(
+            "memory.merge_transactions_append",
+            {"history_rows": rows, "new_rows": 1},
+            lambda db=db, next_day=next_day: db.merge_transactions("u", [next(next_day)], [450.0]),
+            repeat=200,
+        )
+
+
+def sqlite_cases(sizes, wanted):
+    merge, read = wanted("sqlite.merge_transactions"), wanted("sqlite.get_transaction_arrays")
+    if not (merge or read):
+        return
+    import tempfile
+    from app.services.sqlite_db import SQLiteDB
+
+    tmp = tempfile.mkdtemp(prefix="finmate-bench-")
+    for rows in sizes["rows"]:
+        dates, amounts = datagen.income_series(rows)
+        db = SQLiteDB(os.path.join(tmp, f"bench_{rows}.db"))
+        if merge:
+            yield Case(
+                "sqlite.merge_transactions",
+                {"rows": rows},
+                lambda db=db, dates=dates, amounts=amounts: db.merge_transactions("u", dates, amounts),
+                repeat=3 if rows >= 1_000_000 else 10,
+            )
+        else:
+            db.merge_transactions("u", dates, amounts)  # the read case needs the history
+        if not read:
+            continue
+        yield Case(
+            "sqlite.get_transaction_arrays",
+            {"history_rows": rows, "days": 60},
+            lambda db=db: db.get_transaction_arrays("u", days=60),
+            repeat=50,
+        )
+
+
+def daily_check_cases(sizes, wanted):
+    if not wanted("agent_system.daily_check"):
+        return
+    from app.models.agent_system import AgentSystem
+    from app.models.income_agent import forecast_cache
+
+    db = _fresh_db()
+    user_ids = datagen.populate_users(db, 1, days=365)
+    system = AgentSystem(user_ids[0], db)
+    yield Case(
+        "agent_system.daily_check",
+        {"history_rows": 365, "cache": "cold"},
+        system.daily_check,
+        repeat=20,
+        setup=forecast_cache.clear,
+    )
+    yield Case(
+        "agent_system.daily_check",
+        {"history_rows": 365, "cache": "warm"},
+        system.daily_check,
+        repeat=50,
+    )
+
+
+def chat_context_cases(sizes, wanted):
+    if not wanted("chat.get_user_context"):
+        return
+    import hybrid_chat
+    from app.main import db
+
+    n_users = sizes["users"]
+    user_ids = datagen.populate_users(db, n_users, seed=1000)
+
+    def all_users():
+        for user_id in user_ids:
+            hybrid_chat.get_user_context(user_id)
+
+    yield Case(
+        "chat.get_user_context",
+        {"users": n_users, "cache": "cold"},
+        all_users,
+        repeat=3,
+        setup=hybrid_chat.prompt_cache.clear,
+    )
+    yield Case(
+        "chat.get_user_context",
+        {"users": n_users, "cache": "warm"},
+        all_users,
+        repeat=3,
+    )
+
+
+SUITES = [
+    forecast_cases,
+    income_agent_cases,
+    crisis_cases,
+    action_cases,
+    upload_cases,
+    memory_append_cases,
+    sqlite_cases,
+    daily_check_cases,
+    chat_context_cases,
+]
+
+
+# -------------------------------------------------------------------
+# Measurement
+# -------------------------------------------------------------------
+def measure(case):
+    times = []
+    for _ in range(case.repeat):
+        if case.setup:
+            case.setup()
+        gc.collect()
+        started = time.perf_counter()
+        case.fn()
+        times.append(time.perf_counter() - started)
+
+    # One extra traced run for memory (tracing slows the code, so it is not timed)
+    if case.setup:
+        case.setup()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    case.fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    net_blocks = sys.getallocatedblocks() - blocks_before
+
+    return {
+        "name": case.name,
+        "params": case.params,
+        "key": case.key,
+        "repeat": case.repeat,
+        "time_s": {
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.fmean(times),
+        },
+        "peak_bytes": peak,
+        "net_blocks": net_blocks,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return keys whose median time regressed by more than `tolerance`"""
+    previous = {r["key"]: r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'case':70} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for result in results:
+        before = previous.get(result["key"])
+        if before is None:
+            continue
+        old, new = before["time_s"]["median"], result["time_s"]["median"]
+        ratio = new / old if old else float("inf")
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{result['key'][:70]:70} {old * 1000:9.2f}ms {new * 1000:9.2f}ms {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append(result["key"])
+    return regressions
+
+
+def environment():
+    import numpy
+    import pandas
+    return {
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FinMate hot-path benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller data sizes")
+    parser.add_argument("--only", help="comma-separated case name prefixes")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed median slowdown vs baseline (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = QUICK_SIZES if args.quick else FULL_SIZES
+    prefixes = [p.strip() for p in args.only.split(",")] if args.only else None
+
+    def wanted(name):
+        return not prefixes or any(name.startswith(p) for p in prefixes)
+
+    results = []
+    for suite in SUITES:
+        # Agents print progress; keep benchmark output readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            cases = list(suite(sizes, wanted))
+        for case in cases:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                result = measure(case)
+            results.append(result)
+            print(f"{case.key[:70]:70} median {result['time_s']['median'] * 1000:10.2f}ms "
+                  f"peak {result['peak_bytes'] / 1e6:8.2f}MB", flush=True)
+
+    report = {"environment": environment(), "sizes": sizes, "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # Agents log progress at INFO/DEBUG; keep benchmark output readable
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Cold-start checks: import-time profile and time-to-healthy budget
+
+Usage (from the backend folder):
+    python -m benchmarks.startup                      # import profile of app.main
+    python -m benchmarks.startup --budget-ms 2000     # + start uvicorn, time first /api/health 200
+    python -m benchmarks.startup --output startup.json
+
+Both measurements run in fresh subprocesses, so nothing already imported
+here skews them. With --budget-ms the exit code is 1 when the server
+answers /api/health later than the budget (best of --runs starts).
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default budget from process start to the first healthy response
+STARTUP_BUDGET_MS = 2000
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _env():
+    # No background work or external clients are needed to measure startup
+    return dict(os.environ, MONITOR_ENABLED="0")
+
+
+def import_profile(module="app.main", top=15):
+    """
+    `python -X importtime -c "import <module>"` summarised
+
+    Returns:
+        dict: total_ms (cumulative time of `module`), packages (self time
+        per top-level package, slowest first), slowest (modules with the
+        largest self time)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=_env(), capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    modules, packages, total_us = [], {}, 0
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        modules.append((name, self_us))
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+        if name == module:
+            total_us = cumulative_us
+
+    return {
+        "module": module,
+        "total_ms": total_us / 1000,
+        "modules_imported": len(modules),
+        "packages": [
+            {"package": name, "self_ms": us / 1000}
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        ],
+        "slowest": [
+            {"module": name, "self_ms": us / 1000}
+            for name, us in sorted(modules, key=lambda item: -item[1])[:top]
+        ],
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(timeout=60.0):
+    """Milliseconds from spawning uvicorn to the first 200 from /api/health"""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"/api/health not answering after {timeout:.0f}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FinMate cold-start checks")
+    parser.add_argument("--module", default="app.main", help="module to profile")
+    parser.add_argument("--top", type=int, default=15, help="rows in the profile tables")
+    parser.add_argument("--budget-ms", type=float, nargs="?", const=STARTUP_BUDGET_MS,
+                        help=f"check time to first healthy response (default budget {STARTUP_BUDGET_MS} ms)")
+    parser.add_argument("--runs", type=int, default=3, help="server starts for the budget check")
+    parser.add_argument("--output", help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    profile = import_profile(args.module, args.top)
+    print(f"import {profile['module']}: {profile['total_ms']:.1f}ms ({profile['modules_imported']} modules)")
+    print(f"\n{'package':40} {'self':>10}")
+    for row in profile["packages"]:
+        print(f"{row['package'][:40]:40} {row['self_ms']:8.1f}ms")
+    print(f"\n{'module':60} {'self':>10}")
+    for row in profile["slowest"]:
+        print(f"{row['module'][:60]:60} {row['self_ms']:8.1f}ms")
+
+    report = {"import_profile": profile}
+    status = 0
+    if args.budget_ms is not None:
+        runs = [time_to_healthy() for _ in range(max(1, args.runs))]
+        best = min(runs)
+        report["startup"] = {"budget_ms": args.budget_ms, "runs_ms": runs, "best_ms": best}
+        verdict = "OK" if best <= args.budget_ms else "OVER BUDGET"
+        print(f"\ntime to healthy: best {best:.0f}ms of {len(runs)} (budget {args.budget_ms:.0f}ms) {verdict}")
+        status = 0 if best <= args.budget_ms else 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Structured actions applied to the forecast scenarios
+"""
+import numpy as np
+import pytest
+
+from app.services.actions import action_income_deltas, apply_actions, calculate_action_impact
+
+SCENARIOS = {
+    'pessimistic': [300.0] * 10,
+    'base': [500.0] * 10,
+    'optimistic': [700.0] * 10,
+    'dates': [f"2026-01-{day:02d}" for day in range(1, 11)],
+}
+
+
+@pytest.mark.parametrize("action_type", ["EARN", "CUT", "DELAY"])
+def test_zero_days_is_rejected(action_type):
+    with pytest.raises(ValueError, match="days >= 1"):
+        action_income_deltas([{"action_type": action_type, "amount": 700, "days": 0}], 30)
+
+
+def test_days_spread_and_period():
+    earn, cut, delay = action_income_deltas([
+        {"action_type": "EARN", "amount": 700, "days": 2},
+        {"action_type": "CUT", "amount": 300, "days": 3},
+        {"action_type": "DELAY", "amount": 500, "days": 4},
+    ], 6)
+    assert earn.tolist() == [350, 350, 0, 0, 0, 0]
+    assert cut.tolist() == [100] * 6
+    assert delay.tolist() == [500, 0, 0, 0, -500, 0]
+
+
+def test_earn_and_cut_suggestions_move_income():
+    earn = calculate_action_impact({'action_type': 'EARN', 'amount': 700}, SCENARIOS)
+    assert earn['base'] == [600.0] * 7 + [500.0] * 3
+    assert earn['dates'] == SCENARIOS['dates']
+
+    # No numeric amount: parsed from the display string
+    cut = calculate_action_impact({'action_type': 'CUT', 'impact': '+₹1,500 (closes gap)'}, SCENARIOS)
+    assert cut['pessimistic'] == [350.0] * 10
+
+
+@pytest.mark.parametrize("action_type", ["SAVE", "DELAY", "UNKNOWN"])
+def test_other_suggestions_leave_the_scenarios(action_type):
+    updated = calculate_action_impact({'action_type': action_type, 'amount': 1200}, SCENARIOS)
+    assert updated == SCENARIOS
+
+
+def test_every_subset_is_applied():
+    actions = [{'action_type': 'EARN', 'amount': 700}, {'action_type': 'CUT', 'amount': 300}]
+    result = apply_actions(SCENARIOS, actions, current_balance=1000, daily_costs=400)
+
+    assert result['subsets'].tolist() == [[False, False], [True, False], [False, True], [True, True]]
+    base = result['scenarios'][:, 1]
+    assert base[0].tolist() == SCENARIOS['base']
+    assert base[3].tolist() == (base[1] + base[2] - base[0]).tolist()
+    assert np.allclose(result['balances'][0, 1], 1000 + 100 * np.arange(1, 11))
@@ -0,0 +1,73 @@
+"""
+Building agent systems from async handlers: off the event loop, under the user's lock
+"""
+import asyncio
+import threading
+
+from app import main
+from app.models.agent_system import AgentSystem
+from app.services.registry import AgentRegistry
+
+
+class StubSystem:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.RLock()
+
+
+def test_first_chat_builds_the_system_off_the_loop(monkeypatch):
+    calls = []
+
+    def daily_check(system):
+        calls.append((threading.current_thread() is threading.main_thread(), system.lock._is_owned()))
+        return {}
+
+    monkeypatch.setattr(AgentSystem, "daily_check", daily_check)
+    main.agent_registry.evict("first_chat_user")
+
+    async def chat_twice():
+        first = await main.chat_agent_system("first_chat_user")
+        second = await main.chat_agent_system("first_chat_user")
+        return first, second
+
+    first, second = asyncio.run(chat_twice())
+
+    assert first is second
+    assert calls == [(False, True)]  # one daily check, in a worker thread, holding system.lock
+
+
+def test_systems_in_use_are_not_evicted():
+    now = [0.0]
+    registry = AgentRegistry(max_size=1, idle_ttl=10, clock=lambda: now[0])
+    busy, _ = registry.get_or_create("busy", lambda: StubSystem("busy"))
+    acquired, release = threading.Event(), threading.Event()
+
+    def work():
+        with busy.lock:
+            acquired.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    assert acquired.wait(5)
+
+    # Over max_size and idle, but locked by the worker: kept
+    registry.get_or_create("other", lambda: StubSystem("other"))
+    now[0] = 20.0
+    assert registry.get_built("busy") is busy
+    assert registry.lru_evictions == 1  # "other" went instead
+
+    release.set()
+    worker.join(5)
+    registry.get_or_create("other", lambda: StubSystem("other"))
+    assert registry.get_built("busy") is None
+
+
+def test_evicted_system_is_persisted_under_its_lock():
+    system = StubSystem("asha")
+    persisted = []
+    system.persist = lambda: persisted.append(system.lock._is_owned())
+
+    main.persist_evicted("asha", system)
+
+    assert persisted == [True]
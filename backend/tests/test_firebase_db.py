@@ -0,0 +1,222 @@
+"""
+Firebase DB write-behind, run against the in-process fake database
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services.fake_rtdb import FakeReference, FakeRealtimeDatabase
+from app.services.firebase import CHUNK_ROWS, DB
+
+
+class FlakyDatabase(FakeRealtimeDatabase):
+    """Fake whose next `failures` updates raise"""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    def reference(self, path="/"):
+        reference = super().reference(path)
+        database = self
+
+        class FlakyReference(FakeReference):
+            def update(self, value):
+                if database.failures:
+                    database.failures -= 1
+                    raise ConnectionError("network down")
+                super().update(value)
+
+        return FlakyReference(database, reference._parts)
+
+
+class GatedDatabase(FakeRealtimeDatabase):
+    """Fake whose reads of one user block until `release` is set"""
+
+    def __init__(self, data, slow_user):
+        super().__init__(data)
+        self.slow_path = f"/users/{slow_user}"
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        self.timed_out = False
+
+    def reference(self, path="/"):
+        reference = super().reference(path)
+        database = self
+
+        class GatedReference(FakeReference):
+            def get(self):
+                if self.path == database.slow_path:
+                    database.reading.set()
+                    database.timed_out |= not database.release.wait(2)
+                return super().get()
+
+        return GatedReference(database, reference._parts)
+
+
+def make_db(database=None, **kwargs):
+    kwargs.setdefault("flush_interval", 60.0)  # only explicit / early flushes
+    kwargs.setdefault("max_batch", 1000)
+    return DB(database if database is not None else FakeRealtimeDatabase(), **kwargs)
+
+
+def days(start, count):
+    return np.arange(start, start + count, dtype=np.int32)
+
+
+def test_writes_to_one_path_are_coalesced():
+    fake = FakeRealtimeDatabase()
+    db = make_db(fake)
+    for balance in (100.0, 200.0, 300.0):
+        db.update_profile("asha", {"balance": balance})
+    db.update_user_state("asha", {"mode": "calm"})
+    db.update_user_state("asha", {"mode": "crisis"})
+
+    assert db.stats()["pending_paths"] == 2
+    assert db.writes_coalesced == 3
+    assert fake.calls["update"] == 0
+
+    assert db.flush() == 2
+    assert fake.calls["update"] == 1
+    assert fake.data["users"]["asha"]["profile"] == {"balance": 300.0}
+    assert fake.data["users"]["asha"]["state"] == {"mode": "crisis"}
+    assert db.flush() == 0
+    db.close()
+
+
+def test_max_batch_flushes_early():
+    fake = FakeRealtimeDatabase()
+    db = make_db(fake, max_batch=3)
+    db.update_profile("a", {"balance": 1.0})
+    db.update_profile("b", {"balance": 2.0})
+    time.sleep(0.1)
+    assert fake.calls["update"] == 0  # below max_batch: waits for the interval
+
+    db.update_profile("c", {"balance": 3.0})
+    deadline = time.time() + 5
+    while fake.calls["update"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert fake.calls["update"] == 1
+    assert set(fake.data["users"]) == {"a", "b", "c"}
+    db.close()
+
+
+def test_failed_flush_is_retried_with_newer_values():
+    fake = FlakyDatabase(failures=1)
+    db = make_db(fake)
+    db.update_profile("asha", {"balance": 100.0})
+    db.save_crisis_alert("asha", {"severity": "HIGH"})
+    db.merge_transactions("asha", days(19000, 5), [10.0] * 5)
+
+    with pytest.raises(ConnectionError):
+        db.flush()
+    assert db.errors == 1
+    assert db.stats()["pending_paths"] == 3
+    assert "users" not in fake.data
+
+    db.update_profile("asha", {"balance": 50.0})
+    db.merge_transactions("asha", days(19005, 2), [20.0] * 2)
+    db.flush()
+
+    user = fake.data["users"]["asha"]
+    assert user["profile"] == {"balance": 50.0}
+    assert [alert["severity"] for alert in user["crisis_alerts"].values()] == ["HIGH"]
+    assert user["transactions"]["rows"] == 7
+    assert db.stats()["pending_paths"] == 0
+    db.close()
+
+
+def test_close_flushes_pending_writes():
+    fake = FakeRealtimeDatabase()
+    db = make_db(fake)
+    db.update_profile("asha", {"balance": 100.0})
+    db.merge_transactions("asha", days(19000, 3), [10.0, 20.0, 30.0])
+    assert fake.calls["update"] == 0
+
+    db.close()
+
+    assert not db._thread.is_alive()
+    assert fake.data["users"]["asha"]["profile"] == {"balance": 100.0}
+    reloaded = make_db(fake)
+    window = reloaded.get_transaction_arrays("asha", days=None)
+    assert window.dates.tolist() == days(19000, 3).tolist()
+    assert window.amounts.tolist() == [10.0, 20.0, 30.0]
+
+
+def test_appends_rewrite_only_their_chunks():
+    fake = FakeRealtimeDatabase()
+    db = make_db(fake)
+    db.merge_transactions("asha", days(10000, 2 * CHUNK_ROWS + 10), np.arange(2 * CHUNK_ROWS + 10.0))
+    db.flush()
+    written = db.paths_written
+
+    db.merge_transactions("asha", days(10000 + 2 * CHUNK_ROWS + 10, 5), [1.0] * 5)
+    db.flush()
+    assert db.paths_written - written == 2  # rows + the last chunk
+
+    # Out-of-order rows rebuild the history: one path for the whole node
+    db.merge_transactions("asha", [9000], [7.0])
+    written = db.paths_written
+    db.flush()
+    assert db.paths_written - written == 1
+
+    reloaded = make_db(fake)
+    expected = db.get_transaction_arrays("asha", days=None)
+    actual = reloaded.get_transaction_arrays("asha", days=None)
+    assert actual.dates.tolist() == expected.dates.tolist()
+    assert actual.amounts.tolist() == expected.amounts.tolist()
+    assert actual.types.tolist() == expected.types.tolist()
+    db.close()
+
+
+def test_reads_the_unchunked_layout():
+    fake = FakeRealtimeDatabase({"users": {"asha": {
+        "profile": {"balance": 10.0},
+        "transactions": {"dates": [19000, 19001], "amounts": [5.0, 6.0], "types": [0, 0]},
+    }}})
+    db = make_db(fake)
+    assert db.get_transaction_arrays("asha", days=None).amounts.tolist() == [5.0, 6.0]
+    assert db.get_balance("asha") == 10.0
+    db.close()
+
+
+def test_slow_first_load_does_not_block_other_users():
+    fake = GatedDatabase({"users": {
+        "asha": {"profile": {"balance": 10.0}},
+        "ravi": {"profile": {"balance": 20.0}},
+    }}, slow_user="asha")
+    db = make_db(fake)
+    loads = [threading.Thread(target=db.get_balance, args=("asha",)) for _ in range(3)]
+    for load in loads:
+        load.start()
+    assert fake.reading.wait(5)
+
+    # asha's fetch is in flight: other users are still read and written
+    assert db.get_balance("ravi") == 20.0
+    db.update_profile("ravi", {"balance": 25.0})
+    assert db.get_balance("ravi") == 25.0
+    assert not fake.timed_out
+
+    fake.release.set()
+    for load in loads:
+        load.join(5)
+    assert db.get_balance("asha") == 10.0
+    assert db.reads == 2  # the concurrent loads of asha shared one fetch
+    db.close()
+
+
+def test_connect_fails_early_without_a_database(monkeypatch):
+    import app.services.firebase as firebase
+
+    def missing():
+        raise ImportError("firebase_admin is not installed")
+
+    monkeypatch.setattr(firebase, "get_database", missing)
+    with pytest.raises(ImportError):
+        DB().connect()
+    db = make_db().connect()
+    assert db._database is not None
+    db.close()
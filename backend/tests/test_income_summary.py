@@ -0,0 +1,53 @@
+"""
+Income summary kept up to date on append, against a full rebuild
+"""
+import random
+
+import numpy as np
+
+from app.services import memory_db
+from app.services.memory_db import InMemoryDB
+from app.services.summary import summarize_income
+from app.services.timeseries import EXPENSE, INCOME
+
+
+def test_appended_summary_matches_rebuild():
+    rng = random.Random(5)
+    db = InMemoryDB({})
+    day = 19000
+    for _ in range(60):
+        count = rng.randint(1, 6)
+        dates = np.arange(day, day + count, dtype=np.int32)
+        day += count + rng.randint(0, 2)
+        if rng.random() < 0.1:
+            dates = dates - 40  # out of order: history rebuilt
+        kind = EXPENSE if rng.random() < 0.3 else INCOME
+        db.merge_transactions("asha", dates, [rng.uniform(100, 900) for _ in dates], kind)
+
+        assert db.get_income_summary("asha") == summarize_income(db.get_income_history("asha"))
+
+
+def test_expense_only_appends_keep_the_summary():
+    db = InMemoryDB({})
+    db.merge_transactions("asha", [19000, 19001], [500.0, 600.0])
+    before = db.get_income_summary("asha")
+    db.merge_transactions("asha", [19002], [80.0], EXPENSE)
+    assert db.get_income_summary("asha") == before
+
+
+def test_append_does_not_rescan_the_history(monkeypatch):
+    db = InMemoryDB({})
+    db.merge_transactions("asha", np.arange(19000, 19100, dtype=np.int32), np.full(100, 400.0))
+
+    def rescan(*args, **kwargs):
+        raise AssertionError("full-history rebuild on append")
+
+    monkeypatch.setattr(memory_db, "summarize_income", rescan)
+    monkeypatch.setattr(memory_db.IncomeStats, "from_history", rescan)
+    monkeypatch.setattr(db, "get_income_history", rescan)
+    db.merge_transactions("asha", [19100, 19101], [500.0, 600.0])
+
+    summary = db.get_income_summary("asha")
+    assert summary["days"] == 102
+    assert summary["last_date"] == "2022-04-19"
+    assert db.get_income_stats("asha").overall.count == 102
@@ -0,0 +1,179 @@
+"""
+Intervention optimizer: the DP against brute force, and the greedy fallbacks
+"""
+import itertools
+import math
+import random
+
+import pytest
+
+from app.services.interventions import (
+    COST_WEIGHT,
+    greedy_interventions,
+    optimize_interventions,
+    optimize_interventions_batch,
+)
+
+DEFICIT = 1000.0  # one DP unit = 5.0 at the default INTERVENTION_RESOLUTION (200)
+
+
+def random_pool(rng, size, horizon):
+    """Impacts on the DP grid, so rounding down to units is exact"""
+    return [
+        {
+            'group': rng.randrange(max(1, size // 2)),
+            'impact': 5.0 * rng.randint(1, 120),
+            'feasibility': rng.choice([1.0, 0.95, 0.8, 0.6, 0.4, 0.2]),
+            'cost': float(rng.randint(0, 300)),
+            'days': rng.randint(0, horizon + 3),
+            'action': f"option {i}",
+        }
+        for i in range(size)
+    ]
+
+
+def weight(plan, deficit):
+    return sum(-math.log(c['feasibility']) + COST_WEIGHT * c.get('cost', 0) / deficit for c in plan)
+
+
+def brute_force(pool, deficit, horizon):
+    """Lowest-weight covering plan with at most one option per group (None if none covers)"""
+    usable = [c for c in pool if c['feasibility'] > 0 and c['impact'] > 0 and c['days'] <= horizon]
+    groups = {}
+    for c in usable:
+        groups.setdefault(c['group'], []).append(c)
+    best = None
+    for combo in itertools.product(*[[None] + options for options in groups.values()]):
+        chosen = [c for c in combo if c is not None]
+        if sum(c['impact'] for c in chosen) >= deficit:
+            w = weight(chosen, deficit)
+            if best is None or w < best:
+                best = w
+    return best
+
+
+def assert_valid(plan, deficit, horizon):
+    groups = [c.get('group', id(c)) for c in plan['selected']]
+    assert len(groups) == len(set(groups)), "two options from one group"
+    assert all(c['days'] <= horizon for c in plan['selected'])
+    assert plan['total_impact'] == pytest.approx(sum(c['impact'] for c in plan['selected']))
+    assert plan['covers_deficit'] == (plan['total_impact'] >= deficit)
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_dp_matches_brute_force(seed):
+    rng = random.Random(seed)
+    horizon = 10
+    pool = random_pool(rng, rng.randint(2, 9), horizon)
+    best = brute_force(pool, DEFICIT, horizon)
+
+    plan = optimize_interventions(pool, DEFICIT, horizon, budget_ms=10_000)
+
+    assert_valid(plan, DEFICIT, horizon)
+    if best is None:
+        assert plan['method'] == 'greedy'
+        assert not plan['covers_deficit']
+    else:
+        assert plan['method'] == 'dp'
+        assert plan['covers_deficit']
+        assert weight(plan['selected'], DEFICIT) == pytest.approx(best)
+
+
+def test_dp_off_grid_impacts_still_cover():
+    # Impacts rounded down to units: a DP plan may cost more than the optimum but always covers
+    rng = random.Random(7)
+    for _ in range(30):
+        pool = random_pool(rng, 7, 10)
+        for c in pool:
+            c['impact'] += rng.random() * 4.9
+        best = brute_force(pool, DEFICIT, 10)
+        plan = optimize_interventions(pool, DEFICIT, 10, budget_ms=10_000)
+        assert_valid(plan, DEFICIT, 10)
+        if plan['method'] == 'dp':
+            assert plan['covers_deficit']
+            assert weight(plan['selected'], DEFICIT) >= best - 1e-9
+
+
+def test_batch_matches_single_user_runs():
+    rng = random.Random(3)
+    pools = [random_pool(rng, rng.randint(0, 8), 10) for _ in range(40)]
+    deficits = [rng.choice([0.0, 250.0, 500.0, 1000.0]) for _ in pools]
+    horizons = [rng.randint(1, 12) for _ in pools]
+
+    plans = optimize_interventions_batch(pools, deficits, horizons, budget_ms=10_000)
+
+    for pool, deficit, horizon, plan in zip(pools, deficits, horizons, plans):
+        single = optimize_interventions(pool, deficit, horizon, budget_ms=10_000)
+        assert plan['method'] == single['method']
+        assert plan['selected'] == single['selected']
+
+
+def test_zero_deficit_needs_no_plan():
+    pool = [{'impact': 100.0, 'feasibility': 0.9, 'days': 1}]
+    plan = optimize_interventions(pool, 0.0, 10)
+    assert plan['method'] == 'none'
+    assert plan['selected'] == []
+    assert plan['covers_deficit']
+
+
+def test_out_of_budget_falls_back_to_greedy():
+    pool = [
+        {'group': 'shifts', 'impact': 300.0, 'feasibility': 0.9, 'days': 3},
+        {'group': 'shifts', 'impact': 600.0, 'feasibility': 0.6, 'days': 3},
+        {'impact': 500.0, 'feasibility': 0.8, 'days': 2},
+        {'impact': 400.0, 'feasibility': 0.7, 'days': 5},
+    ]
+    plan = optimize_interventions(pool, DEFICIT, 10, budget_ms=0)
+
+    assert plan['method'] == 'greedy'
+    assert_valid(plan, DEFICIT, 10)
+    assert plan['covers_deficit']
+    assert plan['selected'] == greedy_interventions(pool, DEFICIT, 10)['selected']
+
+
+def test_out_of_budget_batch_keeps_every_user():
+    rng = random.Random(11)
+    pools = [random_pool(rng, 6, 10) for _ in range(20)]
+    plans = optimize_interventions_batch(pools, [DEFICIT] * 20, [10] * 20, budget_ms=0)
+    assert [p['method'] for p in plans] == ['greedy'] * 20
+    for pool, plan in zip(pools, plans):
+        assert plan['selected'] == greedy_interventions(pool, DEFICIT, 10)['selected']
+
+
+def test_uncoverable_deficit_takes_best_option_of_every_group():
+    pool = [
+        {'group': 'shifts', 'impact': 100.0, 'feasibility': 0.9, 'days': 1},
+        {'group': 'shifts', 'impact': 150.0, 'feasibility': 0.5, 'days': 1},
+        {'impact': 200.0, 'feasibility': 0.8, 'days': 2},
+        {'impact': 50.0, 'feasibility': 1.0, 'days': 2},
+    ]
+    plan = optimize_interventions(pool, DEFICIT, 10, budget_ms=10_000)
+
+    assert plan['method'] == 'greedy'
+    assert not plan['covers_deficit']
+    assert_valid(plan, DEFICIT, 10)
+    assert len(plan['selected']) == 3  # one per group
+    assert plan['total_impact'] == pytest.approx(350.0)
+
+
+def test_candidates_past_the_horizon_are_ignored():
+    late = {'impact': 5000.0, 'feasibility': 1.0, 'days': 8, 'action': "late"}
+    pool = [
+        late,
+        {'impact': 600.0, 'feasibility': 0.5, 'days': 2},
+        {'impact': 500.0, 'feasibility': 0.5, 'days': 5},
+    ]
+
+    in_time = optimize_interventions(pool, DEFICIT, 8)
+    assert in_time['method'] == 'dp'
+    assert in_time['selected'] == [late]
+
+    too_late = optimize_interventions(pool, DEFICIT, 5)
+    assert too_late['method'] == 'dp'
+    assert late not in too_late['selected']
+    assert too_late['total_impact'] == pytest.approx(1100.0)
+
+    nothing_in_time = optimize_interventions([late], DEFICIT, 7)
+    assert nothing_in_time['method'] == 'greedy'
+    assert nothing_in_time['selected'] == []
+    assert not nothing_in_time['covers_deficit']
@@ -0,0 +1,73 @@
+"""
+Background crisis monitor: checks triggered by uploads, crisis counts
+"""
+import asyncio
+import threading
+
+import httpx
+
+from app import main
+from app.models.crisis import CrisisAgent
+from app.services.scheduler import CrisisMonitorScheduler
+
+CSV = "date,income\n" + "".join(f"2026-01-{day:02d},{400 + 10 * day}\n" for day in range(1, 29))
+
+
+def test_upload_triggers_a_fresh_analysis(monkeypatch):
+    analyses = []
+    analyse = CrisisAgent.run_scenario_analysis
+
+    def counting(agent):
+        analyses.append(agent.user_id)
+        return analyse(agent)
+
+    monkeypatch.setattr(CrisisAgent, "run_scenario_analysis", counting)
+
+    async def upload_and_check(client):
+        response = await client.post("/api/income/upload", files={"file": ("income.csv", CSV, "text/csv")})
+        assert response.status_code == 200, response.text
+        await main.crisis_monitor.run_due()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await upload_and_check(client)
+            assert analyses.count("demo_user") == 1
+            # Checked moments ago, so only the upload can make the monitor look again
+            assert main.get_agent_system("demo_user").crisis_agent.next_check_in() > 0
+            await upload_and_check(client)
+            assert analyses.count("demo_user") == 2
+
+    asyncio.run(scenario())
+
+
+class StubCrisisAgent:
+    thresholds = {'medium': 0.30}
+    flags_crisis = CrisisAgent.flags_crisis
+
+    def __init__(self, probability):
+        self.probability = probability
+
+    def monitor_continuously(self, force=False):
+        return {'probability': self.probability} if self.probability else None
+
+    def next_check_in(self):
+        return 3600.0
+
+
+class StubSystem:
+    def __init__(self, probability):
+        self.lock = threading.RLock()
+        self.crisis_agent = StubCrisisAgent(probability)
+
+
+def test_only_flagged_crises_are_counted():
+    systems = {"calm": StubSystem(0.0), "watch": StubSystem(0.2), "crisis": StubSystem(2 / 3)}
+    monitor = CrisisMonitorScheduler(systems.__getitem__)
+    for user_id in systems:
+        monitor.schedule(user_id)
+
+    asyncio.run(monitor.run_due())
+
+    assert monitor.checks_run == 3
+    assert monitor.crises_detected == 1  # 0.2 is below the medium threshold